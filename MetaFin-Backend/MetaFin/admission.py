@@ -0,0 +1,251 @@
+"""
+Admission control for the endpoints that pin a worker and spend LLM quota.
+
+Each configured endpoint (a path prefix in ADMISSION_ENDPOINTS) has a cost in
+tokens and a concurrency limit. A request is admitted when:
+
+1. its client's token bucket holds the endpoint's cost. Buckets refill at
+   ADMISSION_RATE tokens per second up to ADMISSION_BURST, or for anonymous
+   clients (keyed by address) ADMISSION_ANON_RATE and ADMISSION_ANON_BURST.
+   Otherwise the answer is 429, with Retry-After set to when the bucket will
+   hold enough.
+2. fewer than `concurrency` requests to the endpoint are running in this
+   worker, or a place in its wait queue frees up within
+   ADMISSION_QUEUE_TIMEOUT seconds. Otherwise the answer is 503, with
+   Retry-After estimated from recent service times. Its tokens are refunded.
+
+Work queued through POST /jobs/ is charged the cost of the endpoint that does
+the same work (ADMISSION_JOB_ENDPOINTS) when the job is created.
+
+Buckets live in Django's cache, so with a shared CACHE_BACKEND they are
+shared by every worker (updates from two workers at the same instant may
+both succeed). Concurrency limits are per worker process.
+"""
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .instrumentation import counter_lines, register_collector
+
+
+class TokenBuckets:
+    """One token bucket per client key, stored in Django's cache."""
+
+    def __init__(self, rate, burst, prefix='admission:bucket'):
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        # Long enough for an idle bucket to refill; after that it is full anyway
+        self.timeout = math.ceil(burst / rate) + 1
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        state = cache.get(key)
+        if state is None:
+            return self.burst
+        tokens, updated = state
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def take(self, client, cost):
+        """(True, 0) if cost tokens were taken, else (False, seconds until they will be there)."""
+        cost = min(cost, self.burst)
+        key = f"{self.prefix}:{client}"
+        with self._lock:
+            now = time.time()
+            tokens = self._tokens(key, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, now), timeout=self.timeout)
+        if allowed:
+            return True, 0.0
+        return False, (cost - tokens) / self.rate
+
+    def refund(self, client, cost):
+        key = f"{self.prefix}:{client}"
+        with self._lock:
+            now = time.time()
+            cache.set(key, (min(self.burst, self._tokens(key, now) + cost), now), timeout=self.timeout)
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at once; up to `queue_size` more callers wait for a
+    slot, the rest are turned away immediately.
+    """
+
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.queued = 0
+        # Smoothed seconds a holder keeps its slot, for Retry-After estimates
+        self.service_time = None
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.active < self.limit, timeout):
+                    return False
+                self.active += 1
+                self.queued += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, seconds=None):
+        with self._condition:
+            self.active -= 1
+            if seconds is not None:
+                previous = self.service_time
+                self.service_time = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+            self._condition.notify()
+
+    def retry_after(self):
+        """Seconds until the queue ahead of a new caller has likely drained."""
+        with self._condition:
+            per_request = self.service_time or 1.0
+            return per_request * (self.waiting + 1) / self.limit
+
+
+class Endpoint:
+    def __init__(self, prefix, cost, concurrency, queue):
+        self.prefix = prefix
+        self.cost = cost
+        self.limiter = ConcurrencyLimiter(concurrency, queue)
+        self.admitted = 0
+        self.rate_limited = 0
+        self.busy = 0
+
+
+class Admission:
+    """
+    admit(path, client) -> (endpoint or None, status, retry_after). A None
+    endpoint means the path is not controlled; status 200 means admitted and
+    the caller must call done(endpoint, seconds) when the request finishes.
+    """
+
+    def __init__(self, endpoints, rate, burst, queue_timeout, anonymous_rate=None, anonymous_burst=None):
+        # Longest prefix first, so /analysis/analyse/ wins over /analysis/
+        self.endpoints = sorted(
+            (Endpoint(prefix, **config) for prefix, config in endpoints.items()),
+            key=lambda e: len(e.prefix), reverse=True,
+        )
+        self.buckets = TokenBuckets(rate, burst)
+        self.anonymous_buckets = TokenBuckets(anonymous_rate or rate, anonymous_burst or burst,
+                                              prefix='admission:anon')
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+
+    def match(self, path):
+        for endpoint in self.endpoints:
+            if path.startswith(endpoint.prefix):
+                return endpoint
+        return None
+
+    def admit(self, path, client):
+        endpoint = self.match(path)
+        if endpoint is None:
+            return None, 200, 0
+
+        buckets = self.buckets_for(client)
+        allowed, wait = buckets.take(client, endpoint.cost)
+        if not allowed:
+            self._count(endpoint, 'rate_limited')
+            return endpoint, 429, wait
+
+        if not endpoint.limiter.acquire(self.queue_timeout):
+            buckets.refund(client, endpoint.cost)
+            self._count(endpoint, 'busy')
+            return endpoint, 503, endpoint.limiter.retry_after()
+
+        self._count(endpoint, 'admitted')
+        return endpoint, 200, 0
+
+    def charge(self, path, client):
+        """
+        Take the cost of path's endpoint from client's bucket without holding
+        a concurrency slot, for work that runs elsewhere (queued jobs).
+        (True, 0) if charged or uncontrolled, else (False, retry_after).
+        """
+        endpoint = self.match(path)
+        if endpoint is None:
+            return True, 0.0
+        allowed, wait = self.buckets_for(client).take(client, endpoint.cost)
+        if not allowed:
+            self._count(endpoint, 'rate_limited')
+        return allowed, wait
+
+    def buckets_for(self, client):
+        # MetaFin.middleware.client_key gives anonymous clients 'addr:' keys
+        return self.anonymous_buckets if client.startswith('addr:') else self.buckets
+
+    def done(self, endpoint, seconds):
+        endpoint.limiter.release(seconds)
+
+    def _count(self, endpoint, stat):
+        with self._lock:
+            setattr(endpoint, stat, getattr(endpoint, stat) + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                e.prefix: {
+                    'admitted': e.admitted, 'queued': e.limiter.queued, 'rate_limited': e.rate_limited,
+                    'busy': e.busy, 'active': e.limiter.active, 'waiting': e.limiter.waiting,
+                }
+                for e in self.endpoints
+            }
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    """The process-wide Admission built from the ADMISSION_* settings."""
+    global _admission
+    if _admission is None:
+        with _admission_lock:
+            if _admission is None:
+                _admission = Admission(
+                    getattr(settings, 'ADMISSION_ENDPOINTS', {}),
+                    rate=getattr(settings, 'ADMISSION_RATE', 1.0),
+                    burst=getattr(settings, 'ADMISSION_BURST', 20.0),
+                    queue_timeout=getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 5.0),
+                    anonymous_rate=getattr(settings, 'ADMISSION_ANON_RATE', None),
+                    anonymous_burst=getattr(settings, 'ADMISSION_ANON_BURST', None),
+                )
+    return _admission
+
+
+def reset_admission():
+    """Rebuild from settings on next use, e.g. after override_settings in benchmarks."""
+    global _admission
+    with _admission_lock:
+        _admission = None
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+@register_collector
+def _collect_metrics():
+    stats = get_admission().stats() if _admission is not None else {}
+    lines = []
+    for stat in ('admitted', 'queued', 'rate_limited', 'busy'):
+        lines.extend(counter_lines(
+            f"metafin_admission_{stat}_total", f"Requests {stat.replace('_', ' ')} by admission control.",
+            {prefix: s[stat] for prefix, s in stats.items()}, 'endpoint',
+        ))
+    return lines
@@ -0,0 +1,130 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; spans range from sub-millisecond math to minute-long LLM/scrape calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by a tuple of label values, rendered in
+    the Prometheus text format. observe() is a bisect plus a few additions under
+    a lock, so it is cheap enough to call on every span.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            base = _labels(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(zip(self.labelnames, labels), le=_number(bound))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_labels(zip(self.labelnames, labels), le='+Inf')} {cumulative}")
+            lines.append(f"{self.name}_sum{base} {total!r}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(pairs, **extra):
+    items = [*pairs, *extra.items()]
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def _number(value):
+    return repr(float(value))
+
+
+STAGE_SECONDS = Histogram(
+    'metafin_stage_duration_seconds',
+    "Time spent in instrumented stages (external calls and hot computations).",
+    ('stage', 'outcome'),
+)
+REQUEST_SECONDS = Histogram(
+    'metafin_request_duration_seconds',
+    "Time to serve HTTP requests, by route pattern.",
+    ('method', 'route', 'status'),
+)
+
+_collectors = []
+
+
+def register_collector(collector):
+    """
+    Add a callable returning extra exposition lines to /metrics, e.g. counters
+    kept elsewhere. Returns the collector so it can be used as a decorator.
+    """
+    _collectors.append(collector)
+    return collector
+
+
+@contextmanager
+def span(stage):
+    """Time a block of code as a stage; exceptions are recorded as outcome="error"."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        STAGE_SECONDS.observe((stage, outcome), time.perf_counter() - start)
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render()
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+def counter_lines(name, documentation, values, label):
+    """Exposition lines for a family of counters given as {label value: count}."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} counter"]
+    lines.extend(f"{name}{_labels([(label, key)])} {value}" for key, value in sorted(values.items()))
+    return lines
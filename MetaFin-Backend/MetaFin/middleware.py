@@ -0,0 +1,113 @@
+import time
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from users.authentication import JWTAuthentication
+from .admission import get_admission, retry_after_header
+from .instrumentation import REQUEST_SECONDS
+
+
+class RequestTimingMiddleware:
+    """
+    Record every request's duration in REQUEST_SECONDS, labelled by the URL
+    pattern rather than the raw path so label cardinality stays bounded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        REQUEST_SECONDS.observe((request.method, route, str(response.status_code)), time.perf_counter() - start)
+        return response
+
+
+_authentication = JWTAuthentication()
+
+
+def client_key(request):
+    """
+    Who a request counts against: the user id in its JWT or session, else
+    the client's address (see client_address). The token is verified but the
+    user not loaded.
+    """
+    header = _authentication.get_header(request)
+    try:
+        raw = _authentication.get_raw_token(header) if header else None
+        if raw is not None:
+            token = _authentication.get_validated_token(raw)
+            return f"user:{token[api_settings.USER_ID_CLAIM]}"
+    except (AuthenticationFailed, KeyError):
+        pass  # the view rejects the request; count it against the address
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"addr:{client_address(request)}"
+
+
+def client_address(request):
+    """
+    The connecting address, or behind a reverse proxy the address it reports
+    in ADMISSION_CLIENT_IP_HEADER. Proxies append to X-Forwarded-For, so the
+    entry ADMISSION_TRUSTED_PROXIES from the right is the one our outermost
+    proxy saw; entries left of it are whatever the client sent.
+    """
+    header = getattr(settings, 'ADMISSION_CLIENT_IP_HEADER', '')
+    forwarded = request.META.get(header, '') if header else ''
+    addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+    if not addresses:
+        return request.META.get('REMOTE_ADDR', '')
+    proxies = max(1, getattr(settings, 'ADMISSION_TRUSTED_PROXIES', 1))
+    return addresses[max(0, len(addresses) - proxies)]
+
+
+class AdmissionMiddleware:
+    """
+    Cost-weighted per-client rate limits and per-endpoint concurrency limits
+    for the ADMISSION_ENDPOINTS (see MetaFin.admission). Rejections are
+    answered immediately with 429 or 503 and a Retry-After header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'ADMISSION_ENABLED', True) or request.method in ('OPTIONS', 'HEAD'):
+            return self.get_response(request)
+
+        admission = get_admission()
+        if admission.match(request.path_info) is None:
+            return self.get_response(request)
+
+        endpoint, status, retry_after = admission.admit(request.path_info, client_key(request))
+        if status != 200:
+            return rejection(status, retry_after)
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            admission.done(endpoint, time.perf_counter() - start)
+
+
+def charge(request, path):
+    """
+    Charge request's client the cost of the admission endpoint for path, for
+    work queued to run elsewhere. A 429 response if its bucket is empty, else None.
+    """
+    if not getattr(settings, 'ADMISSION_ENABLED', True):
+        return None
+    allowed, retry_after = get_admission().charge(path, client_key(request))
+    return None if allowed else rejection(429, retry_after)
+
+
+def rejection(status, retry_after):
+    if status == 429:
+        response = JsonResponse({"error": "Too many requests; please retry later"}, status=429)
+    else:
+        response = JsonResponse({"error": "Server busy; please retry later"}, status=503)
+    response['Retry-After'] = retry_after_header(retry_after)
+    return response
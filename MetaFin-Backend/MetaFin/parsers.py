@@ -0,0 +1,15 @@
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser backed by orjson; request bodies must be UTF-8."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,40 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+def default(obj):
+    """
+    Types orjson doesn't handle natively (Decimal, lazy strings, pandas
+    Timestamps, querysets, ...) are converted the way DRF's encoder does.
+    NumPy arrays and scalars, datetimes and UUIDs never reach this.
+    """
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return _encoder.default(obj)
+
+
+def dumps(data, indent=False):
+    option = OPTIONS | orjson.OPT_INDENT_2 if indent else OPTIONS
+    ret = orjson.dumps(data, default=default, option=option)
+    # Escape U+2028/U+2029 like JSONRenderer, so the output stays a strict javascript subset
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson. NaN and infinity render as null instead of
+    failing, and any requested indent renders as two spaces.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return dumps(data, indent=bool(indent))
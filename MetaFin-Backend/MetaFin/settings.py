@@ -52,15 +52,20 @@ INSTALLED_APPS = [
     'recommendations',
     'compare',
     'sentiment',
+    'marketdata',
+    'jobs',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'MetaFin.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'MetaFin.middleware.AdmissionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,12 +95,191 @@ WSGI_APPLICATION = 'MetaFin.wsgi.application'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 DATABASES = {
+    'default': dj_database_url.config(
+        default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
+        conn_max_age=int(os.getenv('CONN_MAX_AGE', 600)),
+        conn_health_checks=True,
+    )
+}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # WAL, tuned pragmas and BEGIN IMMEDIATE; see MetaFin/sqlite3/base.py
+    DATABASES['default']['ENGINE'] = 'MetaFin.sqlite3'
+    DATABASES['default'].setdefault('OPTIONS', {})
+    DATABASES['default']['OPTIONS'].setdefault('timeout', int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)))
+    # A file-backed test database so tests see the same locking as production
+    DATABASES['default'].setdefault('TEST', {})
+    DATABASES['default']['TEST'].setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Point CACHE_BACKEND at a shared backend (file, database, redis) so caches are
+# visible across gunicorn workers and management commands.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'metafin'),
     }
 }
 
+COMPARE_CACHE_TTL = int(os.getenv('COMPARE_CACHE_TTL', 6 * 60 * 60))
+COMPARE_CACHE_SIZE = int(os.getenv('COMPARE_CACHE_SIZE', 512))
+
+
+# Market data
+# All Yahoo access goes through marketdata.client.get_market_data(). Set
+# MARKETDATA_PROVIDER=marketdata.providers.FixtureProvider to serve recorded
+# data from MARKETDATA_FIXTURES_DIR instead of the network.
+
+MARKETDATA_PROVIDER = os.getenv('MARKETDATA_PROVIDER', 'marketdata.providers.YahooProvider')
+MARKETDATA_FIXTURES_DIR = os.getenv('MARKETDATA_FIXTURES_DIR', str(BASE_DIR / 'marketdata' / 'fixtures'))
+MARKETDATA_CACHE_TTL = {
+    'history': int(os.getenv('MARKETDATA_HISTORY_TTL', 15 * 60)),
+    'fundamentals': int(os.getenv('MARKETDATA_FUNDAMENTALS_TTL', 15 * 60)),
+    'news': int(os.getenv('MARKETDATA_NEWS_TTL', 10 * 60)),
+    'latest': int(os.getenv('LATEST_PRICE_TTL', 5 * 60)),
+}
+# Seconds to wait for other requests to join a batched provider call
+MARKETDATA_BATCH_WINDOW = float(os.getenv('MARKETDATA_BATCH_WINDOW', 0.02))
+
+
+# Shared price matrix
+# Daily closes memory-mapped by every worker from PRICE_MATRIX_DIR (written by
+# `manage.py refresh_price_matrix`, e.g. from cron after the close). Unset, or
+# older than PRICE_MATRIX_MAX_AGE seconds, history comes from the provider.
+
+PRICE_MATRIX_DIR = os.getenv('PRICE_MATRIX_DIR', '')
+PRICE_MATRIX_CHECK_INTERVAL = int(os.getenv('PRICE_MATRIX_CHECK_INTERVAL', 5))
+PRICE_MATRIX_MAX_AGE = int(os.getenv('PRICE_MATRIX_MAX_AGE', 24 * 60 * 60))
+
+
+# Sentiment inference
+# `manage.py serve_sentiment` loads the model once per box and classifies for
+# every worker over SENTIMENT_INFERENCE_SOCKET, batching concurrent requests.
+# Unset or unreachable (retried after SENTIMENT_INFERENCE_RETRY seconds),
+# workers load the model themselves with SENTIMENT_FALLBACK_THREADS torch
+# threads each.
+
+SENTIMENT_INFERENCE_SOCKET = os.getenv('SENTIMENT_INFERENCE_SOCKET', '')
+SENTIMENT_INFERENCE_TIMEOUT = float(os.getenv('SENTIMENT_INFERENCE_TIMEOUT', 30))
+SENTIMENT_INFERENCE_RETRY = int(os.getenv('SENTIMENT_INFERENCE_RETRY', 30))
+SENTIMENT_TORCH_THREADS = int(os.getenv('SENTIMENT_TORCH_THREADS', os.cpu_count() or 1))
+SENTIMENT_FALLBACK_THREADS = int(os.getenv('SENTIMENT_FALLBACK_THREADS', 1))
+SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 32))
+SENTIMENT_BATCH_WAIT = float(os.getenv('SENTIMENT_BATCH_WAIT', 0.01))
+
+
+# Single-flight
+# Concurrent identical analysis/sentiment/compare/recommendation requests share
+# one computation; results are reused for SINGLEFLIGHT_RESULT_TTL seconds.
+# SINGLEFLIGHT_SHARED coordinates workers through the cache above, which only
+# helps with a shared CACHE_BACKEND.
+
+SINGLEFLIGHT_RESULT_TTL = float(os.getenv('SINGLEFLIGHT_RESULT_TTL', 5))
+SINGLEFLIGHT_SHARED = os.getenv('SINGLEFLIGHT_SHARED', 'False').lower() in ('true', '1', 'yes')
+SINGLEFLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLEFLIGHT_LOCK_TIMEOUT', 60))
+
+
+# Admission control
+# Requests to these path prefixes cost `cost` tokens from their client's
+# bucket (user, else address), which refills at ADMISSION_RATE tokens per
+# second up to ADMISSION_BURST; an empty bucket gets a 429. Anonymous
+# clients' buckets use ADMISSION_ANON_RATE and ADMISSION_ANON_BURST. At most
+# `concurrency` requests per endpoint run at once in each worker, `queue`
+# more wait up to ADMISSION_QUEUE_TIMEOUT seconds, the rest get a 503.
+# Buckets are shared between workers only with a shared CACHE_BACKEND.
+# Behind a reverse proxy every anonymous client has the proxy's address and
+# shares one bucket: set ADMISSION_CLIENT_IP_HEADER to the request.META key
+# the proxy sets (e.g. HTTP_X_FORWARDED_FOR) and ADMISSION_TRUSTED_PROXIES to
+# the number of proxies in front of the app. Never set it without a proxy
+# that overwrites or appends to the header; clients could pick their bucket.
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() in ('true', '1', 'yes')
+ADMISSION_RATE = float(os.getenv('ADMISSION_RATE', 1))
+ADMISSION_BURST = float(os.getenv('ADMISSION_BURST', 20))
+ADMISSION_ANON_RATE = float(os.getenv('ADMISSION_ANON_RATE', ADMISSION_RATE))
+ADMISSION_ANON_BURST = float(os.getenv('ADMISSION_ANON_BURST', ADMISSION_BURST))
+ADMISSION_CLIENT_IP_HEADER = os.getenv('ADMISSION_CLIENT_IP_HEADER', '')
+ADMISSION_TRUSTED_PROXIES = int(os.getenv('ADMISSION_TRUSTED_PROXIES', 1))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))
+ADMISSION_ENDPOINTS = {
+    '/sentiment/': {'cost': 8, 'concurrency': 2, 'queue': 4},
+    '/news/': {'cost': 6, 'concurrency': 2, 'queue': 4},
+    '/compare/': {'cost': 5, 'concurrency': 3, 'queue': 6},
+    '/analysis/analyse/': {'cost': 5, 'concurrency': 3, 'queue': 6},
+    # Backtests, portfolio risk and the screener: CPU only, no LLM calls
+    '/analysis/': {'cost': 2, 'concurrency': 4, 'queue': 8},
+}
+# POST /jobs/ is charged the cost of the endpoint that does the same work
+ADMISSION_JOB_ENDPOINTS = {
+    'sentiment': '/sentiment/',
+    'news': '/news/',
+    'backtest': '/analysis/',
+}
+
+
+# Background jobs
+# Slow endpoints can be queued (POST /jobs/) and polled (GET /jobs/<id>/);
+# run workers with `manage.py run_jobs`.
+
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+JOBS_DEFAULT_TIMEOUT = int(os.getenv('JOBS_DEFAULT_TIMEOUT', 120))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 3))
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', 5))
+JOBS_RESULT_TTL = int(os.getenv('JOBS_RESULT_TTL', 60 * 60))
+
+
+# Metrics
+# Stage and request histograms are served at /metrics in the Prometheus text
+# format. They are per process; scrape each worker (or run a single one).
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+
+# Backtests
+# Parameter sweeps are split across BACKTEST_WORKERS processes (1 runs them in
+# the request). Larger sweeps can be queued with "async": true. Every web
+# worker starts its own pool, so the box runs up to (web workers x
+# BACKTEST_WORKERS) sweep processes; keep that product near the core count.
+
+BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', 2))
+BACKTEST_MAX_TICKERS = int(os.getenv('BACKTEST_MAX_TICKERS', 50))
+BACKTEST_MAX_COMBINATIONS = int(os.getenv('BACKTEST_MAX_COMBINATIONS', 500))
+
+
+# Portfolio risk
+# Aligned returns matrices are cached per (tickers, window); after this many
+# seconds the next request appends the days since the last cached one.
+
+RISK_RETURNS_REFRESH = int(os.getenv('RISK_RETURNS_REFRESH', 15 * 60))
+
+
+# Multi-timeframe analysis
+# Daily, weekly and monthly bars and their indicators are cached per (ticker,
+# interval); after this many seconds the next request rebuilds only the last
+# bucket from the new daily bars.
+
+ANALYSIS_BARS_REFRESH = int(os.getenv('ANALYSIS_BARS_REFRESH', 15 * 60))
+
+
+# Screener
+# /analysis/screener/ reads IndicatorSnapshot (refresh it with
+# `manage.py refresh_indicators`) into memory and checks for changes at most
+# every SCREENER_CHECK_INTERVAL seconds.
+
+SCREENER_CHECK_INTERVAL = int(os.getenv('SCREENER_CHECK_INTERVAL', 5))
+
+
+# Import time
+# Views load pandas, sklearn, langchain, transformers etc. on first use so workers
+# and management commands start quickly. benchmarks.tests fails when
+# django.setup() plus URL loading takes longer than this many seconds; profile
+# with `manage.py profile_imports`.
+
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', 2.0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -117,6 +301,31 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# REST framework
+# JWT only: Basic auth ran a full password hash on every request. The token's
+# user is looked up and kept for AUTH_USER_CACHE_TTL seconds, so permission
+# changes reach other workers within that time.
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': ['users.authentication.JWTAuthentication'],
+    # orjson: faster, and handles NumPy values, Decimal and datetime natively
+    'DEFAULT_RENDERER_CLASSES': [
+        'MetaFin.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'MetaFin.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+SIMPLE_JWT = {
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
+}
+
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 30))
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from .instrumentation import counter_lines, register_collector
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time and share its result.
+
+    Callers asking for a key that is already being computed in this process
+    wait for that computation instead of starting their own. Successful results
+    are kept for result_ttl seconds so a burst arriving just after a computation
+    finishes is absorbed too. Error dicts ({"error": ...}, as the views return
+    for e.g. unknown tickers) go to the waiters but are not kept.
+
+    With shared=True a lock in Django's cache extends this across workers: the
+    worker holding the lock computes and publishes the result, the others poll
+    for it. Errors are never cached; every waiter sees the leader's exception.
+    """
+
+    def __init__(self, name, result_ttl=5, shared=False, lock_timeout=60, poll_interval=0.05):
+        self.name = name
+        self.result_ttl = result_ttl
+        self.shared = shared
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.window_hits = 0
+        self.shared_hits = 0
+        self.errors = 0
+
+    def do(self, key, fn):
+        key = make_key(key)
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            result = self._results.get(key)
+            if result is not None:
+                if result[0] > now:
+                    self.window_hits += 1
+                    return result[1]
+                del self._results[key]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = self._run_shared(key, fn) if self.shared else self._execute(fn)
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.result_ttl and cacheable(call.value):
+                    self._results[key] = (time.monotonic() + self.result_ttl, call.value)
+                    self._prune()
+            call.done.set()
+        return call.value
+
+    def _execute(self, fn):
+        with self._lock:
+            self.executions += 1
+        return fn()
+
+    def _run_shared(self, key, fn):
+        result_key = f"singleflight:{self.name}:{key}:result"
+        lock_key = f"singleflight:{self.name}:{key}:lock"
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            published = shared_cache.get(result_key)
+            if published is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                return published['value']
+
+            if shared_cache.add(lock_key, 1, timeout=self.lock_timeout):
+                try:
+                    value = self._execute(fn)
+                    if self.result_ttl and cacheable(value):
+                        shared_cache.set(result_key, {'value': value}, timeout=self.result_ttl)
+                    return value
+                finally:
+                    shared_cache.delete(lock_key)
+
+            if time.monotonic() > deadline:
+                # The lock holder is stuck or gone; stop waiting and compute here
+                return self._execute(fn)
+            time.sleep(self.poll_interval)
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._results.items() if expires <= now]:
+            del self._results[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "window_hits": self.window_hits,
+                "shared_hits": self.shared_hits,
+                "errors": self.errors,
+                "in_flight": len(self._calls),
+            }
+
+
+def cacheable(value):
+    return not (isinstance(value, dict) and 'error' in value)
+
+
+def make_key(key):
+    if isinstance(key, str):
+        return key
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_flight(name):
+    """The process-wide SingleFlight for name, configured from SINGLEFLIGHT_* settings."""
+    with _registry_lock:
+        flight = _registry.get(name)
+        if flight is None:
+            flight = _registry[name] = SingleFlight(
+                name,
+                result_ttl=getattr(settings, 'SINGLEFLIGHT_RESULT_TTL', 5),
+                shared=getattr(settings, 'SINGLEFLIGHT_SHARED', False),
+                lock_timeout=getattr(settings, 'SINGLEFLIGHT_LOCK_TIMEOUT', 60),
+            )
+        return flight
+
+
+def reset_flights():
+    """Forget every flight, its cached results and counters."""
+    with _registry_lock:
+        _registry.clear()
+
+
+def singleflight_stats():
+    with _registry_lock:
+        flights = list(_registry.values())
+    return {flight.name: flight.stats() for flight in flights}
+
+
+@register_collector
+def _collect_metrics():
+    stats = singleflight_stats()
+    lines = []
+    for stat in ('requests', 'executions', 'coalesced', 'window_hits', 'shared_hits', 'errors'):
+        lines.extend(counter_lines(
+            f"metafin_singleflight_{stat}_total", f"Single-flight {stat.replace('_', ' ')} per flight.",
+            {name: s[stat] for name, s in stats.items()}, 'flight',
+        ))
+    return lines
@@ -0,0 +1,41 @@
+"""
+SQLite backend tuned for concurrent writers.
+
+Django 4.2's SQLite backend opens transactions with a deferred BEGIN. Two
+transactions that both read before writing (our trade signal handlers do) then
+deadlock on the lock upgrade and one fails immediately with "database is
+locked", ignoring the busy timeout. Starting write transactions with BEGIN
+IMMEDIATE makes them queue on the busy timeout instead, and WAL lets readers
+carry on while a writer holds the lock.
+
+Pragmas can be overridden with OPTIONS['pragmas'] and the transaction mode
+with OPTIONS['transaction_mode'].
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # 64 MB; negative values are KiB
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.transaction_mode = kwargs.pop('transaction_mode', 'IMMEDIATE')
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            if pragma == 'journal_mode' and self.is_in_memory_db():
+                continue
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -0,0 +1,158 @@
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from jobs.models import Job
+from .admission import reset_admission
+from .middleware import AdmissionMiddleware, client_address
+from .singleflight import SingleFlight
+
+
+class SingleFlightTest(SimpleTestCase):
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.005)
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight('test', result_ttl=0)
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {'value': 42}
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do('AAPL', compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        # Let every caller join the leader's call before it finishes
+        self.wait_for(lambda: flight.stats()['coalesced'] == 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+        self.assertEqual(flight.stats()['executions'], 1)
+
+    def test_waiters_see_the_leaders_exception(self):
+        flight = SingleFlight('test', result_ttl=5)
+        release = threading.Event()
+        errors = []
+
+        def compute():
+            release.wait(5)
+            raise ValueError("provider down")
+
+        def call():
+            try:
+                flight.do('AAPL', compute)
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        self.wait_for(lambda: flight.stats()['coalesced'] == 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, ["provider down"] * 3)
+        # Exceptions are not kept: the next caller computes again
+        self.assertEqual(flight.do('AAPL', lambda: 'ok'), 'ok')
+
+    def test_results_are_kept_for_result_ttl(self):
+        flight = SingleFlight('test', result_ttl=0.5)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(flight.do('AAPL', compute), 1)
+        self.assertEqual(flight.do('AAPL', compute), 1)
+        self.assertEqual(flight.stats()['window_hits'], 1)
+        self.assertEqual(flight.do('MSFT', compute), 2)
+
+        time.sleep(0.6)
+        self.assertEqual(flight.do('AAPL', compute), 3)
+
+    def test_error_results_are_not_kept(self):
+        flight = SingleFlight('test', result_ttl=5)
+        responses = iter([{'error': "No data found for ticker"}, {'ticker': 'AAPL'}])
+
+        self.assertEqual(flight.do('AAPL', lambda: next(responses)), {'error': "No data found for ticker"})
+        self.assertEqual(flight.do('AAPL', lambda: next(responses)), {'ticker': 'AAPL'})
+        self.assertEqual(flight.stats()['window_hits'], 0)
+
+
+@override_settings(ADMISSION_ENABLED=True, ADMISSION_RATE=0.001, ADMISSION_BURST=10,
+                   ADMISSION_ANON_RATE=0.001, ADMISSION_ANON_BURST=10,
+                   ADMISSION_ENDPOINTS={'/analysis/': {'cost': 5, 'concurrency': 2, 'queue': 0}})
+class AdmissionTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        reset_admission()
+        self.addCleanup(reset_admission)
+        self.middleware = AdmissionMiddleware(lambda request: JsonResponse({}))
+        self.factory = RequestFactory()
+
+    def statuses(self, count, **meta):
+        return [self.middleware(self.factory.post('/analysis/risk/', **meta)).status_code for _ in range(count)]
+
+    def test_empty_bucket_gets_429_with_retry_after(self):
+        self.assertEqual(self.statuses(2), [200, 200])
+        response = self.middleware(self.factory.post('/analysis/risk/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Paths outside ADMISSION_ENDPOINTS are not counted
+        self.assertEqual(self.middleware(self.factory.get('/trades/trade/')).status_code, 200)
+
+    @override_settings(ADMISSION_ANON_BURST=5)
+    def test_anonymous_clients_use_their_own_limits(self):
+        self.assertEqual(self.statuses(2), [200, 429])
+
+    def test_anonymous_clients_behind_a_proxy_share_its_address(self):
+        self.assertEqual(self.statuses(2, HTTP_X_FORWARDED_FOR='198.51.100.1'), [200, 200])
+        self.assertEqual(self.statuses(1, HTTP_X_FORWARDED_FOR='198.51.100.2'), [429])
+
+    @override_settings(ADMISSION_CLIENT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_forwarded_header_keys_anonymous_clients(self):
+        self.assertEqual(self.statuses(3, HTTP_X_FORWARDED_FOR='198.51.100.1'), [200, 200, 429])
+        self.assertEqual(self.statuses(2, HTTP_X_FORWARDED_FOR='198.51.100.2'), [200, 200])
+
+    @override_settings(ADMISSION_CLIENT_IP_HEADER='HTTP_X_FORWARDED_FOR', ADMISSION_TRUSTED_PROXIES=2)
+    def test_client_address_ignores_entries_the_client_sent(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='10.0.0.9, 198.51.100.1, 10.0.0.2')
+        self.assertEqual(client_address(request), '198.51.100.1')
+        self.assertEqual(client_address(self.factory.get('/')), '127.0.0.1')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], ADMISSION_ENABLED=True, ADMISSION_RATE=0.001, ADMISSION_BURST=10,
+                   ADMISSION_ENDPOINTS={'/sentiment/': {'cost': 8, 'concurrency': 2, 'queue': 4}})
+class JobAdmissionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_admission()
+        self.addCleanup(reset_admission)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email='jobs@metafin.local', password=None, full_name='Jobs'))
+
+    def queue(self):
+        return self.client.post('/jobs/', {'kind': 'sentiment', 'params': {'ticker': 'AAPL'}}, format='json')
+
+    def test_queued_work_is_charged_like_the_endpoint(self):
+        self.assertEqual(self.queue().status_code, 202)
+        response = self.queue()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(Job.objects.count(), 1)
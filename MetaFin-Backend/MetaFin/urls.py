@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from .views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,4 +11,6 @@ urlpatterns = [
     path('recommendations/', include('recommendations.urls')),
     path('compare/', include('compare.urls')),
     path('sentiment/', include('sentiment.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
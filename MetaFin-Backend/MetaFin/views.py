@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from .instrumentation import render_metrics
+
+
+def metrics(request):
+    """Prometheus scrape endpoint. Set METRICS_TOKEN to require a bearer token."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import IndicatorSnapshot
 
-# Register your models here.
+
+class IndicatorSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'as_of', 'close', 'rsi', 'macd', 'volatility', 'sharpe_ratio', 'updated_at')
+    search_fields = ('symbol',)
+
+admin.site.register(IndicatorSnapshot, IndicatorSnapshotAdmin)
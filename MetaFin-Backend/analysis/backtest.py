@@ -0,0 +1,308 @@
+"""
+Vectorized backtests of indicator rules over a (bars, tickers) close matrix.
+
+A strategy is a list of entry conditions and a list of exit conditions, each
+ANDed together:
+
+    {"entry": [{"left": "rsi", "op": "<", "right": "$rsi_entry"}],
+     "exit": [{"left": "ma_50", "op": "cross_below", "right": "ma_200"}]}
+
+Terms are "close", "rsi", "macd", "macd_signal", "macd_hist", "bb_lower",
+"bb_middle", "bb_upper", "ma_<n>" or "ema_<n>", or a number. "$name" (alone or
+as <n>) refers to a parameter, so one strategy can be swept over a grid;
+indicator settings (rsi_length, bb_length, bb_std, macd_fast, macd_slow,
+macd_signal) are parameters too. Positions are long/flat, entered on the bar
+after a signal. This module only needs NumPy/SciPy so sweeps can run in worker
+processes without Django.
+"""
+import itertools
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import indicators as ind
+
+DEFAULT_STRATEGY = {
+    "entry": [{"left": "rsi", "op": "<", "right": 30}],
+    "exit": [{"left": "ma_50", "op": "cross_below", "right": "ma_200"}],
+}
+DEFAULT_PARAMS = {
+    "rsi_length": 14, "bb_length": 20, "bb_std": 2.0, "macd_fast": 12, "macd_slow": 26, "macd_signal": 9,
+}
+# Parameters that are indicator lengths must be positive integers
+LENGTH_PARAMS = ('rsi_length', 'bb_length', 'macd_fast', 'macd_slow', 'macd_signal')
+MAX_GRID_KEYS = 12
+MAX_GRID_VALUES = 100
+OPERATORS = ('<', '<=', '>', '>=', 'cross_above', 'cross_below')
+INDICATORS = ('close', 'rsi', 'macd', 'macd_signal', 'macd_hist', 'bb_lower', 'bb_middle', 'bb_upper')
+MOVING_AVERAGE = re.compile(r'^(ma|ema)_(\d+|\$\w+)$')
+
+
+class StrategyError(ValueError):
+    pass
+
+
+class ParameterError(StrategyError):
+    """A StrategyError caused by the parameter grid rather than the rules."""
+
+
+def _values(value):
+    return value if isinstance(value, (list, tuple)) else [value]
+
+
+def parameter_grid(grid):
+    """Every combination of a {name: [values]} grid, as dicts generated one at a time."""
+    names = sorted(grid or {})
+    return (dict(zip(names, combo)) for combo in itertools.product(*(_values(grid[name]) for name in names)))
+
+
+def grid_size(grid):
+    """len(parameter_grid(grid)) without building it."""
+    return math.prod(len(_values(values)) for values in (grid or {}).values())
+
+
+def validate_strategy(strategy, grid, max_combinations=None):
+    """
+    Raise StrategyError for unknown terms/operators, undefined parameters, a
+    grid of more than max_combinations combinations, or grid values unusable
+    where the strategy uses them: lengths (indicator settings and ma_/ema_
+    windows) must be positive integers, bb_std a positive number, and
+    thresholds numbers.
+    """
+    grid = grid or {}
+    if len(grid) > MAX_GRID_KEYS:
+        raise ParameterError(f"At most {MAX_GRID_KEYS} parameters per grid")
+    for name, values in grid.items():
+        if len(_values(values)) > MAX_GRID_VALUES:
+            raise ParameterError(f"At most {MAX_GRID_VALUES} values per parameter; '{name}' has {len(values)}")
+        if not _values(values):
+            raise ParameterError(f"Parameter '{name}' has no values")
+    combinations = grid_size(grid)
+    if max_combinations is not None and combinations > max_combinations:
+        raise ParameterError(f"{combinations} combinations; at most {max_combinations} allowed")
+
+    known = set(DEFAULT_PARAMS) | set(grid)
+    lengths = set(LENGTH_PARAMS)
+    for side in ('entry', 'exit'):
+        conditions = strategy.get(side)
+        if not isinstance(conditions, list) or not conditions:
+            raise StrategyError(f"Strategy needs a non-empty '{side}' list of conditions")
+        for condition in conditions:
+            if not isinstance(condition, dict) or condition.get('op') not in OPERATORS:
+                raise StrategyError(f"Each condition needs left, op ({', '.join(OPERATORS)}) and right")
+            for term in (condition.get('left'), condition.get('right')):
+                for name in _parameters(term):
+                    if name not in known:
+                        raise StrategyError(f"Parameter '${name}' is not in the grid")
+                if not _is_term(term):
+                    raise StrategyError(f"Unknown term: {term!r}")
+                match = MOVING_AVERAGE.match(term) if isinstance(term, str) else None
+                if match and match.group(2).startswith('$'):
+                    lengths.add(match.group(2)[1:])
+                elif match and int(match.group(2)) < 1:
+                    raise StrategyError(f"Moving average length must be positive: {term!r}")
+
+    for name, values in grid.items():
+        for value in _values(values):
+            if not _is_number(value):
+                raise ParameterError(f"Parameter '{name}' values must be numbers, got {value!r}")
+            if name in lengths and not (value >= 1 and float(value).is_integer()):
+                raise ParameterError(f"Parameter '{name}' is a length; values must be positive integers")
+            if name == 'bb_std' and not value > 0:
+                raise ParameterError("Parameter 'bb_std' values must be positive")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _parameters(term):
+    return re.findall(r'\$(\w+)', term) if isinstance(term, str) else []
+
+
+def _is_term(term):
+    if isinstance(term, (int, float)) and not isinstance(term, bool):
+        return True
+    return isinstance(term, str) and (term in INDICATORS or term.startswith('$') or bool(MOVING_AVERAGE.match(term)))
+
+
+class Evaluator:
+    """Evaluates terms for one close matrix, caching indicators across parameter sets."""
+
+    def __init__(self, close):
+        self.close = close
+        self._cache = {}
+
+    def term(self, term, params):
+        if not isinstance(term, str):
+            return float(term)
+        if term.startswith('$'):
+            return float(params[term[1:]])
+        match = MOVING_AVERAGE.match(term)
+        if match:
+            kind, length = match.groups()
+            length = int(params[length[1:]] if length.startswith('$') else length)
+            return self._get((kind, length), lambda: (ind.sma if kind == 'ma' else ind.ema)(self.close, length))
+        if term == 'close':
+            return self.close
+        if term == 'rsi':
+            length = int(params['rsi_length'])
+            return self._get(('rsi', length), lambda: ind.rsi(self.close, length))
+        if term.startswith('macd'):
+            key = (int(params['macd_fast']), int(params['macd_slow']), int(params['macd_signal']))
+            line, signal, hist = self._get(('macd',) + key, lambda: ind.macd(self.close, *key))
+            return {'macd': line, 'macd_signal': signal, 'macd_hist': hist}[term]
+        key = (int(params['bb_length']), float(params['bb_std']))
+        lower, middle, upper = self._get(('bbands',) + key, lambda: ind.bbands(self.close, *key))
+        return {'bb_lower': lower, 'bb_middle': middle, 'bb_upper': upper}[term]
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def condition(self, condition, params):
+        left = self.term(condition['left'], params)
+        right = self.term(condition['right'], params)
+        op = condition['op']
+        with np.errstate(invalid='ignore'):
+            if op == '<':
+                return left < right
+            if op == '<=':
+                return left <= right
+            if op == '>':
+                return left > right
+            if op == '>=':
+                return left >= right
+            diff = np.broadcast_to(left - right, self.close.shape)
+            previous = ind.shift(diff)
+            if op == 'cross_above':
+                return (diff > 0) & (previous <= 0)
+            return (diff < 0) & (previous >= 0)
+
+    def signals(self, conditions, params):
+        mask = np.ones(self.close.shape, dtype=bool)
+        for condition in conditions:
+            mask &= self.condition(condition, params)
+        return mask
+
+
+def positions(entries, exits):
+    """
+    Long (1) from the bar after an entry until the bar after an exit, else
+    flat (0). An exit on the same bar as an entry wins.
+    """
+    state = np.full(entries.shape, np.nan)
+    state[entries] = 1
+    state[exits] = 0
+    held = np.nan_to_num(ind.ffill(state))
+    return np.nan_to_num(ind.shift(held))
+
+
+def metrics(returns, periods=ind.TRADING_DAYS):
+    """
+    CAGR, max drawdown, Sharpe, volatility and total return per column of a
+    returns matrix. NaN marks bars before a column has data.
+    """
+    valid = np.isfinite(returns)
+    bars = valid.sum(axis=0)
+    equity = np.cumprod(1 + np.nan_to_num(returns), axis=0)
+    final = equity[-1] if len(equity) else np.ones(returns.shape[1])
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, returns, 0).sum(axis=0) / bars
+        std = np.sqrt((np.where(valid, returns - mean, 0) ** 2).sum(axis=0) / (bars - 1))
+        cagr = np.where(bars > 0, final ** (periods / bars) - 1, np.nan)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods), np.nan)
+    return {
+        'total_return': final - 1,
+        'cagr': cagr,
+        'max_drawdown': drawdown.min(axis=0) if len(drawdown) else np.zeros(returns.shape[1]),
+        'sharpe': sharpe,
+        'volatility': std * np.sqrt(periods),
+    }
+
+
+def evaluate(evaluator, strategy, params, cost=0.0):
+    """Strategy returns matrix plus trade counts and exposure per ticker."""
+    params = {**DEFAULT_PARAMS, **params}
+    close = evaluator.close
+    held = positions(evaluator.signals(strategy['entry'], params), evaluator.signals(strategy['exit'], params))
+    market = ind.pct_change(close)
+    listed = np.isfinite(market)
+    turnover = np.abs(np.diff(held, axis=0, prepend=0))
+    returns = np.where(listed, held * np.nan_to_num(market) - cost * turnover, np.nan)
+    trades = (np.diff(held, axis=0, prepend=0) > 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        exposure = np.where(listed, held, 0).sum(axis=0) / listed.sum(axis=0)
+    return returns, trades, exposure
+
+
+def equal_weight(returns):
+    """Daily returns of an equal-weight portfolio of the tickers listed that day."""
+    listed = np.isfinite(returns).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(listed > 0, np.nansum(returns, axis=1) / listed, np.nan)[:, None]
+
+
+def run_chunk(close, tickers, strategy, combos, cost):
+    """Backtest each parameter set in combos; the unit of work sent to a process."""
+    evaluator = Evaluator(close)
+    results = []
+    for params in combos:
+        returns, trades, exposure = evaluate(evaluator, strategy, params, cost)
+        per_ticker = metrics(returns)
+        portfolio = metrics(equal_weight(returns))
+        results.append({
+            'params': params,
+            'portfolio': _row(portfolio, 0),
+            'tickers': {
+                ticker: {**_row(per_ticker, i), 'trades': int(trades[i]), 'exposure': _number(exposure[i])}
+                for i, ticker in enumerate(tickers)
+            },
+        })
+    return results
+
+
+def buy_and_hold(close, tickers):
+    values = metrics(ind.pct_change(close))
+    return {ticker: _row(values, i) for i, ticker in enumerate(tickers)}
+
+
+def sweep(close, tickers, strategy, grid=None, cost=0.0, pool=None, chunks=1, max_combinations=None):
+    """
+    Backtest strategy for every combination in grid, split into `chunks` tasks
+    on `pool` (a concurrent.futures executor) when given. Results are ordered
+    by portfolio Sharpe, best first.
+    """
+    validate_strategy(strategy, grid, max_combinations)
+    close = ind.ffill(ind.as_matrix(close))
+    combos = parameter_grid(grid)
+    total = grid_size(grid)
+    if pool is None or chunks <= 1 or total <= 1:
+        results = run_chunk(close, tickers, strategy, combos, cost)
+    else:
+        size = -(-total // chunks)
+        futures = [pool.submit(run_chunk, close, tickers, strategy, list(itertools.islice(combos, size)), cost)
+                   for _ in range(0, total, size)]
+        results = [result for future in futures for result in future.result()]
+    results.sort(key=lambda r: r['portfolio']['sharpe'] if r['portfolio']['sharpe'] is not None else -np.inf,
+                 reverse=True)
+    return results
+
+
+def make_pool(workers):
+    # forkserver: workers start from a clean interpreter instead of forking a
+    # threaded web worker, and only import this module and NumPy/SciPy
+    import multiprocessing
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def _number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _row(values, i):
+    return {name: _number(column[i]) for name, column in values.items()}
@@ -0,0 +1,139 @@
+"""
+NumPy versions of the pandas_ta indicators analyze_stock_risk uses.
+
+Every function takes a (bars, tickers) float array, so one call covers a whole
+universe. Columns may start with NaNs (a ticker listed later than the others);
+results are NaN until a column has a full window. No function loops over bars.
+"""
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+def as_matrix(values):
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def first_valid(x):
+    """Row index of each column's first finite value (len(x) if there is none)."""
+    valid = np.isfinite(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+
+def ffill(x):
+    """Carry the last finite value forward down each column."""
+    x = as_matrix(x)
+    rows = np.where(np.isfinite(x), np.arange(len(x))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return x[rows, np.arange(x.shape[1])]
+
+
+def shift(x, periods=1):
+    out = np.full_like(x, np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def pct_change(x):
+    """Bar-to-bar returns, NaN on the first bar and wherever a price is missing."""
+    out = np.full_like(x, np.nan)
+    out[1:] = x[1:] / x[:-1] - 1
+    return out
+
+
+def _window_sums(x, length):
+    valid = np.isfinite(x)
+    zeros = np.zeros((1, x.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, x, 0), axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    window = np.full_like(x, np.nan)
+    full = np.zeros(x.shape, dtype=bool)
+    if length <= len(x):
+        window[length - 1:] = sums[length:] - sums[:-length]
+        full[length - 1:] = (counts[length:] - counts[:-length]) == length
+    return window, full
+
+
+def sma(x, length):
+    total, full = _window_sums(x, length)
+    return np.where(full, total / length, np.nan)
+
+
+def rolling_std(x, length, ddof=0):
+    # Centre each column first; E[x^2] - E[x]^2 loses precision on large prices
+    centre = np.nanmean(x, axis=0) if np.isfinite(x).any() else 0
+    centred = x - np.nan_to_num(centre)
+    total, full = _window_sums(centred, length)
+    squares, _ = _window_sums(centred ** 2, length)
+    variance = (squares - total ** 2 / length) / (length - ddof)
+    return np.where(full, np.sqrt(np.maximum(variance, 0)), np.nan)
+
+
+def ewm_mean(x, alpha, min_periods=0):
+    """pandas .ewm(alpha=alpha, adjust=True, min_periods=min_periods).mean()."""
+    # scipy.signal takes over a second to import; keep it out of URL loading
+    from scipy.signal import lfilter
+
+    valid = np.isfinite(x)
+    decay = [1, alpha - 1]
+    weighted = lfilter([1], decay, np.where(valid, x, 0), axis=0)
+    weights = lfilter([1], decay, valid.astype(float), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = weighted / weights
+    return np.where(np.cumsum(valid, axis=0) >= max(min_periods, 1), out, np.nan)
+
+
+def ema(x, length):
+    """
+    pandas_ta ema(): seeded with the SMA of each column's first `length`
+    values, then y[t] = a * x[t] + (1 - a) * y[t-1] with a = 2 / (length + 1).
+    Assumes no gaps after a column's first value.
+    """
+    from scipy.signal import lfilter
+
+    alpha = 2 / (length + 1)
+    start = first_valid(x)
+    seed_row = start + length - 1
+    cols = np.flatnonzero(seed_row < len(x))
+    out = np.full_like(x, np.nan)
+    if not len(cols):
+        return out
+
+    # Feed the recursion zeros until the seed bar, whose input is chosen so the
+    # filter outputs exactly the seed there
+    inputs = np.where(np.arange(len(x))[:, None] > seed_row, x, 0)[:, cols]
+    seeds = sma(x, length)[seed_row[cols], cols]
+    inputs[seed_row[cols], np.arange(len(cols))] = seeds / alpha
+    filtered = lfilter([alpha], [1, alpha - 1], inputs, axis=0)
+    out[:, cols] = np.where(np.arange(len(x))[:, None] >= seed_row[cols], filtered, np.nan)
+    return out
+
+
+def rsi(close, length=14):
+    """Wilder's RSI as pandas_ta computes it (ewm with alpha=1/length, adjust=True)."""
+    change = np.full_like(close, np.nan)
+    change[1:] = np.diff(close, axis=0)
+    gains = ewm_mean(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0)), 1 / length, length)
+    losses = ewm_mean(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0)), 1 / length, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * gains / (gains + losses)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(macd, signal, histogram) like pandas_ta macd()."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bbands(close, length=20, std=2.0):
+    """(lower, middle, upper) Bollinger Bands with a population standard deviation."""
+    middle = sma(close, length)
+    width = std * rolling_std(close, length)
+    return middle - width, middle, middle + width
+
+
+def annualised_volatility(returns, window=21):
+    return rolling_std(returns, window, ddof=1) * np.sqrt(TRADING_DAYS)
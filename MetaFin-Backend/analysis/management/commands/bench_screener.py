@@ -0,0 +1,68 @@
+import random
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from analysis.models import IndicatorSnapshot
+from analysis.screener import ScreenerTable
+from trades.management.commands._bench import rolled_back
+
+QUERIES = (
+    (None, None),
+    ('rsi < 30', '-volatility'),
+    ('rsi < 30 and close < bb_lower', 'rsi'),
+    ('(ma_50 > ma_200 or macd > 0) and volatility < 0.4', '-sharpe_ratio,rsi'),
+    ('close > ma_200 * 1.1 and daily_return > 0', None),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the screener on synthetic IndicatorSnapshot rows: loading the table and "
+        "filtered, sorted first pages. Rows are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            IndicatorSnapshot.objects.all().delete()
+            IndicatorSnapshot.objects.bulk_create(self.snapshots(options['symbols']), batch_size=5000)
+
+            start = time.perf_counter()
+            table = ScreenerTable.load()
+            self.stdout.write(f"Loaded {len(table)} snapshots in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+            for expression, sort in QUERIES:
+                runs = []
+                for _ in range(options['repeat']):
+                    t0 = time.perf_counter()
+                    count, _ = table.screen(expression, sort, 0, options['page_size'])
+                    runs.append(time.perf_counter() - t0)
+                self.stdout.write(
+                    f"{expression or '(all)':<55} sort={sort or '-':<18} {count:>6} matches, "
+                    f"best {min(runs) * 1000:6.2f} ms"
+                )
+
+    def snapshots(self, count, seed=42):
+        rng = random.Random(seed)
+        today = date.today()
+        rows = []
+        for i in range(count):
+            close = rng.lognormvariate(4, 1)
+            middle = close * rng.uniform(0.9, 1.1)
+            width = middle * rng.uniform(0.02, 0.1)
+            volatility = rng.uniform(0.1, 0.8)
+            daily_return = rng.gauss(0.0004, 0.001)
+            rows.append(IndicatorSnapshot(
+                symbol=f"BENCH{i}", as_of=today, close=close, daily_return=daily_return,
+                volatility=volatility, ma_50=close * rng.uniform(0.85, 1.15),
+                # about one in ten listed too recently for a 200-day average
+                ma_200=close * rng.uniform(0.7, 1.3) if rng.random() > 0.1 else None,
+                rsi=rng.uniform(5, 95), macd=rng.gauss(0, close * 0.02),
+                bb_upper=middle + width, bb_middle=middle, bb_lower=middle - width,
+                sharpe_ratio=daily_return / volatility,
+            ))
+        return rows
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from analysis.models import IndicatorSnapshot
+from analysis.screener import refresh_snapshots, stale_symbols
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the latest indicators behind /analysis/screener/ for every symbol already in "
+        "IndicatorSnapshot plus any given ones. Symbols refreshed since the last close are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', nargs='*', default=[], help="Symbols to add to the universe")
+        parser.add_argument('--file', help="File with one symbol per line to add to the universe")
+        parser.add_argument('--lookback', type=int, default=400, help="Bars of history per symbol")
+        parser.add_argument('--batch-size', type=int, default=200, help="Symbols per history request")
+        parser.add_argument('--force', action='store_true', help="Refresh symbols that are up to date too")
+
+    def handle(self, *args, **options):
+        symbols = set(IndicatorSnapshot.objects.values_list('symbol', flat=True))
+        symbols.update(s.strip().upper() for s in options['symbols'] if s.strip())
+        if options['file']:
+            try:
+                with open(options['file']) as f:
+                    symbols.update(line.strip().upper() for line in f if line.strip())
+            except OSError as e:
+                raise CommandError(f"Could not read {options['file']}: {e}")
+        if not symbols:
+            raise CommandError("No symbols: pass --symbols or --file to build the universe")
+
+        symbols = sorted(symbols)
+        if not options['force']:
+            symbols = stale_symbols(symbols)
+        if not symbols:
+            self.stdout.write("Every symbol is up to date")
+            return
+
+        start = time.perf_counter()
+        updated, missing = refresh_snapshots(symbols, options['lookback'], options['batch_size'])
+        if missing:
+            self.stdout.write(self.style.WARNING(f"No history for: {', '.join(missing)}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {updated} of {len(symbols)} symbols in {time.perf_counter() - start:.1f}s"
+        ))
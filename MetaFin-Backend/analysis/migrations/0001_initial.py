@@ -0,0 +1,34 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20, unique=True)),
+                ('as_of', models.DateField()),
+                ('close', models.FloatField(null=True)),
+                ('daily_return', models.FloatField(null=True)),
+                ('volatility', models.FloatField(null=True)),
+                ('ma_50', models.FloatField(null=True)),
+                ('ma_200', models.FloatField(null=True)),
+                ('rsi', models.FloatField(null=True)),
+                ('macd', models.FloatField(null=True)),
+                ('bb_upper', models.FloatField(null=True)),
+                ('bb_middle', models.FloatField(null=True)),
+                ('bb_lower', models.FloatField(null=True)),
+                ('sharpe_ratio', models.FloatField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
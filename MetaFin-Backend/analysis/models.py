@@ -1,3 +1,26 @@
 from django.db import models
 
-# Create your models here.
+
+class IndicatorSnapshot(models.Model):
+    """
+    Latest indicators for one symbol, as analyze_stock_risk computes them.
+    One row per symbol; kept current by `manage.py refresh_indicators` and
+    read by the screener as NumPy columns.
+    """
+    symbol = models.CharField(max_length=20, unique=True)
+    as_of = models.DateField()
+    close = models.FloatField(null=True)
+    daily_return = models.FloatField(null=True)
+    volatility = models.FloatField(null=True)
+    ma_50 = models.FloatField(null=True)
+    ma_200 = models.FloatField(null=True)
+    rsi = models.FloatField(null=True)
+    macd = models.FloatField(null=True)
+    bb_upper = models.FloatField(null=True)
+    bb_middle = models.FloatField(null=True)
+    bb_lower = models.FloatField(null=True)
+    sharpe_ratio = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.symbol} @ {self.as_of}"
@@ -0,0 +1,84 @@
+"""
+Portfolio risk from an aligned (days, assets) returns matrix, in NumPy.
+
+VaR and CVaR are reported as positive fractions of portfolio value lost over
+one period at the given confidence level.
+"""
+from statistics import NormalDist
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+def normalise_weights(weights):
+    """Scale weights to a gross exposure of 1 (long-only weights then sum to 1)."""
+    weights = np.asarray(weights, dtype=float)
+    gross = np.abs(weights).sum()
+    if not gross:
+        raise ValueError("Weights must not all be zero")
+    return weights / gross
+
+
+def correlation(covariance):
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = covariance / np.outer(std, std)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def historical_var(portfolio_returns, confidence):
+    cutoff = np.quantile(portfolio_returns, 1 - confidence)
+    tail = portfolio_returns[portfolio_returns <= cutoff]
+    return float(-cutoff), float(-tail.mean())
+
+
+def parametric_var(mean, std, confidence):
+    """Gaussian VaR and CVaR (expected shortfall) for the given mean and std."""
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - confidence)
+    var = -(mean + z * std)
+    cvar = -(mean - std * normal.pdf(z) / (1 - confidence))
+    return float(var), float(cvar)
+
+
+def risk_contributions(weights, covariance):
+    """
+    Marginal contribution of each asset to portfolio volatility, its
+    contribution (weight x marginal, summing to the volatility) and share.
+    """
+    volatility = np.sqrt(weights @ covariance @ weights)
+    marginal = covariance @ weights / volatility if volatility else np.zeros_like(weights)
+    contribution = weights * marginal
+    share = contribution / volatility if volatility else np.zeros_like(weights)
+    return marginal, contribution, share
+
+
+def portfolio_risk(returns, weights, confidence=0.95, periods=TRADING_DAYS):
+    """Risk report for weights held over the rows of returns."""
+    returns = np.asarray(returns, dtype=float)
+    weights = normalise_weights(weights)
+    if len(returns) < 2:
+        raise ValueError("Need at least two days of returns")
+
+    covariance = np.cov(returns, rowvar=False, ddof=1).reshape(len(weights), len(weights))
+    portfolio = returns @ weights
+    mean = portfolio.mean()
+    std = float(np.sqrt(weights @ covariance @ weights))
+    marginal, contribution, share = risk_contributions(weights, covariance)
+    historical = historical_var(portfolio, confidence)
+    parametric = parametric_var(mean, std, confidence)
+
+    return {
+        'weights': weights,
+        'mean_return': float(mean),
+        'volatility': std,
+        'annualised_volatility': std * np.sqrt(periods),
+        'var': {'historical': historical[0], 'parametric': parametric[0]},
+        'cvar': {'historical': historical[1], 'parametric': parametric[1]},
+        'covariance': covariance,
+        'correlation': correlation(covariance),
+        'marginal': marginal,
+        'contribution': contribution,
+        'share': share,
+    }
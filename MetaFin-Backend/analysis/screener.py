@@ -0,0 +1,275 @@
+"""
+Screen the whole universe on its latest indicators.
+
+IndicatorSnapshot rows are loaded once into NumPy columns and reused until the
+table changes. Filters are small Python-like expressions over column names,
+
+    rsi < 30 and close < bb_lower
+    (ma_50 > ma_200 or macd > 0) and volatility < 0.4
+
+evaluated as boolean masks over every symbol at once. Missing values (null)
+never satisfy a comparison.
+"""
+import ast
+import logging
+import operator
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from marketdata.prices import close_frame
+from MetaFin.instrumentation import span
+from . import indicators as ind
+from .models import IndicatorSnapshot
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    'close', 'daily_return', 'volatility', 'ma_50', 'ma_200', 'rsi', 'macd',
+    'bb_upper', 'bb_middle', 'bb_lower', 'sharpe_ratio',
+)
+
+COMPARISONS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+MAX_FILTER_LENGTH = 500
+# Nesting of the parsed filter; a chain a + b + c nests one level per operator
+MAX_FILTER_DEPTH = 32
+
+
+class ScreenerError(ValueError):
+    pass
+
+
+class ScreenerTable:
+    def __init__(self, symbols, as_of, columns, version=None):
+        self.symbols = symbols
+        self.as_of = as_of
+        self.columns = columns
+        self.version = version
+
+    @classmethod
+    def load(cls, version=None):
+        rows = list(IndicatorSnapshot.objects.order_by('symbol').values_list('symbol', 'as_of', *COLUMNS))
+        symbols = np.array([row[0] for row in rows], dtype=object)
+        as_of = np.array([row[1] for row in rows], dtype=object)
+        # None -> NaN, so missing values fail every comparison
+        values = np.array([row[2:] for row in rows], dtype=float).reshape(len(rows), len(COLUMNS))
+        columns = {name: np.ascontiguousarray(values[:, i]) for i, name in enumerate(COLUMNS)}
+        return cls(symbols, as_of, columns, version)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def mask(self, expression):
+        if not expression:
+            return np.ones(len(self), dtype=bool)
+        if len(expression) > MAX_FILTER_LENGTH:
+            raise ScreenerError(f"Filters are limited to {MAX_FILTER_LENGTH} characters")
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except (SyntaxError, RecursionError, MemoryError):
+            raise ScreenerError(f"Could not parse filter: {expression}")
+        try:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = self._evaluate(tree.body, 0)
+        except (TypeError, RecursionError):
+            raise ScreenerError(f"Unsupported filter: {expression}")
+        if not isinstance(result, np.ndarray) or result.dtype != bool:
+            raise ScreenerError("Filter must be a comparison, e.g. rsi < 30")
+        return result
+
+    def _evaluate(self, node, depth):
+        depth += 1
+        if depth > MAX_FILTER_DEPTH:
+            raise ScreenerError(f"Filters may nest at most {MAX_FILTER_DEPTH} levels")
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce([self._condition(value, depth) for value in node.values])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self._condition(node.operand, depth)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self._value(node.operand, depth)
+        if isinstance(node, ast.Compare):
+            result = np.ones(len(self), dtype=bool)
+            left = self._value(node.left, depth)
+            for op, comparator in zip(node.ops, node.comparators):
+                if type(op) not in COMPARISONS:
+                    raise ScreenerError("Comparisons must use <, <=, >, >=, == or !=")
+                right = self._value(comparator, depth)
+                result &= COMPARISONS[type(op)](left, right)
+                left = right
+            return result
+        if isinstance(node, ast.BinOp) and type(node.op) in ARITHMETIC:
+            return ARITHMETIC[type(node.op)](self._value(node.left, depth), self._value(node.right, depth))
+        if isinstance(node, ast.Name):
+            if node.id not in self.columns:
+                raise ScreenerError(f"Unknown column '{node.id}'. Choose from: {', '.join(COLUMNS)}")
+            return self.columns[node.id]
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return float(node.value)
+        raise ScreenerError(f"Unsupported filter syntax: {ast.unparse(node)}")
+
+    def _condition(self, node, depth):
+        value = self._evaluate(node, depth)
+        if not isinstance(value, np.ndarray) or value.dtype != bool:
+            raise ScreenerError(f"Expected a comparison: {ast.unparse(node)}")
+        return value
+
+    def _value(self, node, depth):
+        # Columns, numbers and arithmetic on them; never a comparison's mask
+        value = self._evaluate(node, depth)
+        if isinstance(value, np.ndarray) and value.dtype == bool:
+            raise ScreenerError(f"Expected a column or number: {ast.unparse(node)}")
+        return value
+
+    def order(self, indices, sort):
+        """indices ordered by sort fields ('-rsi' for descending), nulls last, then by symbol."""
+        keys = []
+        for field in reversed([f.strip() for f in sort.split(',') if f.strip()] if sort else []):
+            name = field.lstrip('-')
+            if name not in self.columns:
+                raise ScreenerError(f"Cannot sort by '{name}'")
+            values = self.columns[name][indices]
+            missing = np.isnan(values)
+            keys += [-values if field.startswith('-') else values, missing]
+        if not keys:
+            return indices
+        # lexsort is stable and indices are in symbol order, so ties stay alphabetical
+        return indices[np.lexsort(keys)]
+
+    def screen(self, expression=None, sort=None, offset=0, limit=50):
+        """(number of matches, one page of matching rows)."""
+        indices = np.flatnonzero(self.mask(expression))
+        indices = self.order(indices, sort)
+        page = indices[offset:offset + limit]
+        rows = [
+            {
+                'symbol': self.symbols[i],
+                'as_of': self.as_of[i],
+                **{name: _number(column[i]) for name, column in self.columns.items()},
+            }
+            for i in page
+        ]
+        return len(indices), rows
+
+
+def _number(value):
+    return None if np.isnan(value) else float(value)
+
+
+_table = None
+_checked_at = 0.0
+_table_lock = threading.Lock()
+
+
+def get_table():
+    """
+    The loaded ScreenerTable, reloaded when IndicatorSnapshot changes. The
+    table is checked at most every SCREENER_CHECK_INTERVAL seconds, with one
+    MAX/COUNT query.
+    """
+    global _table, _checked_at
+    interval = getattr(settings, 'SCREENER_CHECK_INTERVAL', 5)
+    if _table is not None and time.monotonic() - _checked_at < interval:
+        return _table
+
+    with _table_lock:
+        if _table is not None and time.monotonic() - _checked_at < interval:
+            return _table
+        stats = IndicatorSnapshot.objects.aggregate(updated=Max('updated_at'), rows=Count('id'))
+        version = (stats['updated'], stats['rows'])
+        if _table is None or _table.version != version:
+            _table = ScreenerTable.load(version)
+        _checked_at = time.monotonic()
+        return _table
+
+
+def reset_table():
+    global _table
+    with _table_lock:
+        _table = None
+
+
+def latest_indicators(closes):
+    """
+    (row of each column's last close, {column: values at that row}) for a
+    (bars, symbols) matrix, computed like analyze_stock_risk: return,
+    volatility and Sharpe are means over the whole matrix, the rest are the
+    latest indicator values.
+    """
+    last = len(closes) - 1 - np.isfinite(closes[::-1]).argmax(axis=0)
+    close = ind.ffill(closes)
+    returns = ind.pct_change(close)
+    returns[np.arange(len(closes))[:, None] > last] = np.nan
+    rows, cols = last, np.arange(closes.shape[1])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        listed = np.isfinite(returns)
+        daily_return = np.where(listed, returns, 0).sum(axis=0) / listed.sum(axis=0)
+        rolling_vol = ind.annualised_volatility(returns)
+        has_vol = np.isfinite(rolling_vol)
+        volatility = np.where(has_vol, rolling_vol, 0).sum(axis=0) / has_vol.sum(axis=0)
+        sharpe = np.where(volatility > 0, daily_return / volatility, np.nan)
+
+    lower, middle, upper = ind.bbands(close, 20)
+    return last, {
+        'close': close[rows, cols],
+        'daily_return': daily_return,
+        'volatility': volatility,
+        'ma_50': ind.sma(close, 50)[rows, cols],
+        'ma_200': ind.sma(close, 200)[rows, cols],
+        'rsi': ind.rsi(close, 14)[rows, cols],
+        'macd': ind.macd(close)[0][rows, cols],
+        'bb_upper': upper[rows, cols],
+        'bb_middle': middle[rows, cols],
+        'bb_lower': lower[rows, cols],
+        'sharpe_ratio': sharpe,
+    }
+
+
+def stale_symbols(symbols, today=None):
+    """Symbols without a snapshot of the latest weekday's close."""
+    today = today or date.today()
+    latest = today - timedelta(days=max(0, today.weekday() - 4))
+    fresh = set(IndicatorSnapshot.objects.filter(symbol__in=symbols, as_of__gte=latest)
+                .values_list('symbol', flat=True))
+    return [s for s in symbols if s not in fresh]
+
+
+def refresh_snapshots(symbols, lookback=400, batch_size=200, today=None):
+    """
+    Recompute and upsert snapshots for symbols from their last `lookback`
+    bars, batch_size symbols per history request. Returns (updated, missing).
+    """
+    today = today or date.today()
+    start = today - timedelta(days=int(lookback * 1.5) + 10)
+    updated, missing = 0, []
+    for offset in range(0, len(symbols), batch_size):
+        batch = symbols[offset:offset + batch_size]
+        frame, absent = close_frame(batch, start=start.isoformat(), end=(today + timedelta(days=1)).isoformat())
+        missing += absent
+        if frame.empty:
+            continue
+
+        found = list(frame.columns)
+        frame = frame.tail(lookback)
+        with span('analysis.screener.refresh'):
+            last, values = latest_indicators(frame.to_numpy(dtype=float))
+        dates = frame.index[last]
+        snapshots = [
+            IndicatorSnapshot(symbol=symbol, as_of=dates[j].date(),
+                              **{name: _number(column[j]) for name, column in values.items()})
+            for j, symbol in enumerate(found)
+        ]
+        IndicatorSnapshot.objects.bulk_create(
+            snapshots, update_conflicts=True, unique_fields=['symbol'],
+            update_fields=['as_of', *COLUMNS, 'updated_at'],
+        )
+        updated += len(snapshots)
+        logger.info(f"Refreshed indicators for {updated} of {len(symbols)} symbols")
+    return updated, missing
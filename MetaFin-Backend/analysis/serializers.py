@@ -0,0 +1,56 @@
+from django.conf import settings
+from rest_framework import serializers
+from .backtest import DEFAULT_STRATEGY, ParameterError, StrategyError, validate_strategy
+
+
+class BacktestRequestSerializer(serializers.Serializer):
+    tickers = serializers.ListField(child=serializers.CharField(max_length=10), min_length=1)
+    start = serializers.DateField(default='2020-01-01')
+    end = serializers.DateField(required=False)
+    strategy = serializers.JSONField(default=DEFAULT_STRATEGY)
+    params = serializers.DictField(default=dict)
+    cost_bps = serializers.FloatField(default=0, min_value=0)
+    top = serializers.IntegerField(default=10, min_value=1, max_value=100)
+
+    def validate_tickers(self, value):
+        tickers = list(dict.fromkeys(t.strip().upper() for t in value if t.strip()))
+        limit = getattr(settings, 'BACKTEST_MAX_TICKERS', 50)
+        if len(tickers) > limit:
+            raise serializers.ValidationError(f"At most {limit} tickers per backtest")
+        return tickers
+
+    def validate(self, data):
+        if not isinstance(data['strategy'], dict):
+            raise serializers.ValidationError({"strategy": "Expected an object with entry and exit lists"})
+        try:
+            validate_strategy(data['strategy'], data['params'], getattr(settings, 'BACKTEST_MAX_COMBINATIONS', 500))
+        except ParameterError as e:
+            raise serializers.ValidationError({"params": str(e)})
+        except StrategyError as e:
+            raise serializers.ValidationError({"strategy": str(e)})
+        return data
+
+
+class RiskRequestSerializer(serializers.Serializer):
+    tickers = serializers.ListField(child=serializers.CharField(max_length=10), required=False, min_length=1)
+    weights = serializers.ListField(child=serializers.FloatField(), required=False)
+    window = serializers.IntegerField(default=252, min_value=20, max_value=2520)
+    confidence = serializers.FloatField(default=0.95, min_value=0.5, max_value=0.999)
+    value = serializers.FloatField(required=False, min_value=0)
+
+    def validate(self, data):
+        tickers = data.get('tickers')
+        weights = data.get('weights')
+        if weights is not None and not tickers:
+            raise serializers.ValidationError({"tickers": "Weights need a matching list of tickers"})
+        if tickers:
+            tickers = [t.strip().upper() for t in tickers]
+            if len(set(tickers)) != len(tickers):
+                raise serializers.ValidationError({"tickers": "Tickers must be unique"})
+            weights = weights if weights is not None else [1.0] * len(tickers)
+            if len(weights) != len(tickers):
+                raise serializers.ValidationError({"weights": "weights must have the same length as tickers"})
+            if not any(weights):
+                raise serializers.ValidationError({"weights": "Weights must not all be zero"})
+            data['tickers'], data['weights'] = tickers, weights
+        return data
@@ -0,0 +1,7 @@
+from jobs.registry import register
+
+
+@register('backtest', serializer='analysis.serializers.BacktestRequestSerializer')
+def backtest(tickers, start='2020-01-01', end=None, strategy=None, params=None, cost_bps=0, top=10):
+    from .views import run_backtest
+    return run_backtest(tickers, start, end, strategy, params, cost_bps, top)
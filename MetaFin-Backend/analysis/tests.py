@@ -1,3 +1,75 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from jobs.models import Job
+from . import backtest as bt
+from .screener import COLUMNS, ScreenerError, ScreenerTable
+from .views import run_backtest, run_portfolio_risk
 
-# Create your tests here.
+# 12 parameters of 100 values: 10**24 combinations
+HUGE_GRID = {f'p{i}': list(range(1, 101)) for i in range(12)}
+
+
+class ScreenerFilterTest(SimpleTestCase):
+    def setUp(self):
+        self.table = ScreenerTable(np.array(['AAA', 'BBB'], dtype=object), np.array([None, None]),
+                                   {column: np.array([20.0, 60.0]) for column in COLUMNS})
+
+    def test_comparisons_select_rows(self):
+        self.assertEqual(self.table.mask('rsi < 30').tolist(), [True, False])
+        self.assertEqual(self.table.mask('-rsi < -30 and not macd > 100').tolist(), [False, True])
+
+    def test_unsupported_filters_are_rejected(self):
+        for expression in ('-(rsi < 30)', '(rsi < 30) + 1 > 0', 'rsi < (rsi < 30)',
+                           ' + '.join(['rsi'] * 40) + ' > 0', 'rsi < 30 or ' * 50 + 'rsi < 30',
+                           '__import__("os")', 'rsi.real < 30'):
+            with self.assertRaises(ScreenerError, msg=expression):
+                self.table.mask(expression)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], ADMISSION_ENABLED=False,
+                   BACKTEST_MAX_TICKERS=50, BACKTEST_MAX_COMBINATIONS=500)
+class BacktestLimitsTest(TestCase):
+    def test_queued_backtests_are_validated_like_requests(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            email='backtest@metafin.local', password=None, full_name='Backtest'))
+        for params, field in (({'tickers': [f'T{i}' for i in range(500)]}, 'tickers'),
+                              ({'tickers': ['AAA'], 'params': HUGE_GRID}, 'params')):
+            response = client.post('/jobs/', {'kind': 'backtest', 'params': params}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.json()['params'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_sweep_and_run_backtest_enforce_the_limits(self):
+        strategy = {'entry': [{'left': 'close', 'op': '>', 'right': 0}],
+                    'exit': [{'left': 'close', 'op': '<', 'right': 0}]}
+        with self.assertRaisesRegex(bt.ParameterError, "at most 500 allowed"):
+            bt.sweep(np.ones((5, 1)), ['AAA'], strategy, HUGE_GRID, max_combinations=500)
+        with self.assertRaisesRegex(bt.ParameterError, "At most 50 tickers"):
+            run_backtest([f'T{i}' for i in range(51)])
+
+    def test_parameter_grid_is_lazy(self):
+        self.assertEqual(next(bt.parameter_grid(HUGE_GRID)), {f'p{i}': 1 for i in range(12)})
+        self.assertEqual(list(bt.parameter_grid({})), [{}])
+
+
+class PortfolioRiskTest(SimpleTestCase):
+    def close_frame(self, symbols, start, end):
+        days = pd.date_range(date.today() - timedelta(days=99), periods=100)
+        rng = np.random.default_rng(7)
+        closes = np.cumprod(1 + rng.normal(0, 0.01, (len(days), len(symbols))), axis=0)
+        return pd.DataFrame(closes, index=days, columns=symbols), []
+
+    def test_mixed_case_holdings_are_merged(self):
+        with mock.patch('marketdata.returns.close_frame', self.close_frame), \
+                mock.patch('marketdata.returns.cache.get', return_value=None):
+            result = run_portfolio_risk(['aapl', ' MSFT', 'AAPL'], [100.0, 200.0, 300.0], window=60,
+                                        weights_are_values=True)
+        self.assertEqual(result['tickers'], ['AAPL', 'MSFT'])
+        self.assertEqual([round(a['weight'], 6) for a in result['assets']], [round(400 / 600, 6), round(200 / 600, 6)])
+        self.assertEqual(result['value'], 600.0)
@@ -0,0 +1,187 @@
+"""
+Daily, weekly and monthly bars with their indicators, cached per timeframe.
+
+Weekly and monthly OHLCV bars are resampled from the daily history, and each
+bar is labelled with the last trading day in it. The bars and their
+indicators are cached per (ticker, interval) in Django's cache. Once an entry
+is older than ANALYSIS_BARS_REFRESH seconds, the next call fetches only the
+daily bars of its last, possibly partial, bucket. It rebuilds that bucket
+and appends any new ones. Indicators are recomputed only when the bars
+changed, so every request in between reuses them.
+
+Indicator windows (21, 50, 200, 14, ...) are counted in bars of the
+timeframe; volatility is annualised with the timeframe's bars per year.
+"""
+import logging
+import time
+from datetime import date, timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from marketdata.prices import close_history
+from MetaFin.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# Without a lookback, analyses cover the history since this day
+DEFAULT_START = date(2020, 1, 1)
+# Bars needed before the lookback for the longest window (MA_200) to fill
+WARMUP_BARS = 200
+CACHE_TTL = 7 * 24 * 60 * 60
+
+# pandas period of a bucket, bars per year and calendar days per bar
+INTERVALS = {
+    'daily': {'period': None, 'per_year': 252, 'days': 1.5},
+    'weekly': {'period': 'W-FRI', 'per_year': 52, 'days': 7},
+    'monthly': {'period': 'M', 'per_year': 12, 'days': 31},
+}
+AGGREGATES = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def resample(daily, interval):
+    """OHLCV bars of daily bars per interval bucket, labelled by each bucket's last day."""
+    period = INTERVALS[interval]['period']
+    daily = daily[[c for c in AGGREGATES if c in daily.columns]].dropna(subset=['Close'])
+    if period is None or daily.empty:
+        return daily.copy()
+    keys = daily.index.to_period(period)
+    bars = daily.groupby(keys).agg({c: AGGREGATES[c] for c in daily.columns})
+    bars.index = daily.index.to_series().groupby(keys).max().rename(daily.index.name)
+    return bars
+
+
+def bucket_start(label, interval):
+    """First calendar day of the bucket a bar labelled `label` belongs to."""
+    period = INTERVALS[interval]['period']
+    if period is None:
+        return label.date()
+    return label.to_period(period).start_time.date()
+
+
+def compute_indicators(df, per_year=252):
+    """
+    Daily_Return, Volatility, MA_50, MA_200, RSI, MACD and Bollinger Band
+    columns added to a copy of a bar frame, with analyze_stock_risk's defaults
+    wherever an indicator cannot be computed.
+    """
+    import pandas as pd
+
+    try:
+        import pandas_ta  # noqa: F401  registers the df.ta accessor
+    except ImportError:
+        logger.warning("pandas_ta is not installed; indicators fall back to defaults")
+
+    df = df.copy()
+    df['Daily_Return'] = df['Close'].pct_change().fillna(0)
+
+    df['Volatility'] = df['Daily_Return'].rolling(window=21).std().fillna(0) * np.sqrt(per_year)
+
+    df['MA_50'] = df['Close'].rolling(window=50).mean().fillna(df['Close'])
+    df['MA_200'] = df['Close'].rolling(window=200).mean().fillna(df['Close'])
+
+    try:
+        df['RSI'] = df.ta.rsi(close=df['Close'], length=14).fillna(50)
+    except Exception as e:
+        logger.warning(f"Error calculating RSI: {str(e)}. Using default values.")
+        df['RSI'] = pd.Series([50] * len(df), index=df.index)
+
+    try:
+        macd_result = df.ta.macd(close=df['Close'], fast=12, slow=26, signal=9)
+        if isinstance(macd_result, pd.DataFrame):
+            df['MACD'] = macd_result.iloc[:, 0].fillna(0)  # First column should be MACD
+        else:
+            col_name = 'MACD_12_26_9'
+            df['MACD'] = macd_result[col_name] if col_name in macd_result else pd.Series([0] * len(df),
+                                                                                         index=df.index)
+    except Exception as e:
+        logger.warning(f"Error calculating MACD: {str(e)}. Using default values.")
+        df['MACD'] = pd.Series([0] * len(df), index=df.index)
+
+    try:
+        bb_bands = df.ta.bbands(close=df['Close'], length=20)
+        if isinstance(bb_bands, pd.DataFrame):
+            df['BB_upper'] = bb_bands.iloc[:, 0].fillna(df['Close'] * 1.1)  # Default to 10% above price
+            df['BB_middle'] = bb_bands.iloc[:, 1].fillna(df['Close'])
+            df['BB_lower'] = bb_bands.iloc[:, 2].fillna(df['Close'] * 0.9)  # Default to 10% below price
+        else:
+            df['BB_upper'] = bb_bands.get('BBU_20_2.0',
+                                          pd.Series([df['Close'].iloc[-1] * 1.1] * len(df), index=df.index))
+            df['BB_middle'] = bb_bands.get('BBM_20_2.0',
+                                           pd.Series([df['Close'].iloc[-1]] * len(df), index=df.index))
+            df['BB_lower'] = bb_bands.get('BBL_20_2.0',
+                                          pd.Series([df['Close'].iloc[-1] * 0.9] * len(df), index=df.index))
+    except Exception as e:
+        logger.warning(f"Error calculating Bollinger Bands: {str(e)}. Using default values.")
+        df['BB_upper'] = df['Close'] * 1.1
+        df['BB_middle'] = df['Close']
+        df['BB_lower'] = df['Close'] * 0.9
+
+    return df
+
+
+def history_start(interval, lookback=None, today=None):
+    """
+    First day of daily history needed for the last lookback bars (or the bars
+    since DEFAULT_START) plus WARMUP_BARS before them.
+    """
+    days = INTERVALS[interval]['days']
+    start = DEFAULT_START if not lookback else (today or date.today()) - timedelta(days=int(lookback * days))
+    return start - timedelta(days=int(WARMUP_BARS * days) + 10)
+
+
+def _load(ticker, interval, since, end):
+    """Bars of ticker from since to end, or None if there is no history."""
+    daily = close_history(ticker, start=since.isoformat(), end=end.isoformat())
+    if daily is None or daily.empty:
+        return None
+    return resample(daily, interval)
+
+
+def _update(entry, ticker, interval, end):
+    """entry's bars with their last bucket rebuilt and newer buckets appended."""
+    import pandas as pd
+
+    bars = entry['bars']
+    start = bucket_start(bars.index[-1], interval)
+    fresh = _load(ticker, interval, start, end)
+    if fresh is None:
+        return bars
+    kept = bars[bars.index.date < start]
+    if len(kept) + len(fresh) == len(bars) and fresh.equals(bars.iloc[len(kept):]):
+        return bars
+    return pd.concat([kept, fresh])
+
+
+def get_indicators(ticker, interval='daily', lookback=None, today=None):
+    """
+    Bars of ticker per interval with their indicator columns, from at least
+    history_start(interval, lookback), or None if the ticker has no history.
+    """
+    today = today or date.today()
+    since = history_start(interval, lookback, today)
+    key = f"bars:{ticker}:{interval}"
+    entry = cache.get(key)
+    refresh = getattr(settings, 'ANALYSIS_BARS_REFRESH', 15 * 60)
+
+    if entry is not None and entry['since'] <= since and time.time() - entry['fetched_at'] < refresh:
+        return entry['indicators']
+
+    # yfinance treats end as exclusive; ask for tomorrow to include today's bar
+    end = today + timedelta(days=1)
+    cached = entry is not None and entry['since'] <= since
+    if cached:
+        since = entry['since']
+        bars = _update(entry, ticker, interval, end)
+    else:
+        bars = _load(ticker, interval, since, end)
+        if bars is None:
+            return None
+
+    if cached and bars is entry['bars']:
+        indicators = entry['indicators']
+    else:
+        with span('analysis.indicators'):
+            indicators = compute_indicators(bars, INTERVALS[interval]['per_year'])
+    cache.set(key, {'bars': bars, 'indicators': indicators, 'since': since, 'fetched_at': time.time()},
+              timeout=CACHE_TTL)
+    return indicators
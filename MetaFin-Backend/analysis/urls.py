@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import analyse
+from .views import analyse, backtest, portfolio_risk, screener
 
 urlpatterns = [
     path('analyse/', analyse.as_view(), name='chat'),
+    path('backtest/', backtest.as_view(), name='backtest'),
+    path('risk/', portfolio_risk.as_view(), name='portfolio-risk'),
+    path('screener/', screener.as_view(), name='screener'),
 ]
\ No newline at end of file
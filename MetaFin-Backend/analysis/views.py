@@ -1,14 +1,25 @@
-import pandas as pd
 import numpy as np
 import time
 import re
-from langchain_community.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
 import json
+from functools import lru_cache
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-import yfinance as yf
+from rest_framework.utils.urls import replace_query_param
+from marketdata.prices import close_frame
+from marketdata.returns import get_returns_matrix
+from trades.models import Position
+from trades.positions import get_latest_prices
+from MetaFin.singleflight import get_flight
+from MetaFin.instrumentation import span
+from jobs.views import enqueue_for, wants_async
+from . import backtest as bt
+from .risk import portfolio_risk as compute_risk
+from .screener import ScreenerError, get_table
+from .timeframes import DEFAULT_START, INTERVALS, get_indicators
+from .serializers import BacktestRequestSerializer, RiskRequestSerializer
 import os
 import logging
 import traceback
@@ -17,7 +28,225 @@ from dotenv import load_dotenv
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+
+def get_chat_model():
+    # langchain is slow to import, so it is loaded on the first LLM call
+    from langchain_community.chat_models import ChatOpenAI
+    return ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.7)
+
+
+@lru_cache(maxsize=None)
+def get_backtest_pool():
+    """Process pool for parameter sweeps, or None to run them in the request process."""
+    workers = getattr(settings, 'BACKTEST_WORKERS', 1)
+    return bt.make_pool(workers) if workers > 1 else None
+
+
+def run_backtest(tickers, start='2020-01-01', end=None, strategy=None, params=None, cost_bps=0, top=10):
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers))
+    # Limits hold for queued jobs too, not only requests the serializer checked
+    limit = getattr(settings, 'BACKTEST_MAX_TICKERS', 50)
+    if len(tickers) > limit:
+        raise bt.ParameterError(f"At most {limit} tickers per backtest")
+    end = end or time.strftime("%Y-%m-%d")
+    closes, missing = close_frame(tickers, start=str(start), end=str(end))
+    if closes.empty:
+        return {"error": "No price history found for these tickers"}
+
+    found = list(closes.columns)
+    strategy = strategy or bt.DEFAULT_STRATEGY
+    pool = get_backtest_pool()
+
+    with span('analysis.backtest'):
+        results = bt.sweep(closes.to_numpy(dtype=float), found, strategy, params, cost=cost_bps / 10_000,
+                           pool=pool, chunks=getattr(settings, 'BACKTEST_WORKERS', 1),
+                           max_combinations=getattr(settings, 'BACKTEST_MAX_COMBINATIONS', 500))
+
+    return {
+        "tickers": found,
+        "missing": missing,
+        "start": closes.index[0].strftime("%Y-%m-%d"),
+        "end": closes.index[-1].strftime("%Y-%m-%d"),
+        "bars": len(closes),
+        "strategy": strategy,
+        "combinations": len(results),
+        "buy_and_hold": bt.buy_and_hold(closes.to_numpy(dtype=float), found),
+        "results": results[:top],
+    }
+
+
+class backtest(APIView):
+    def post(self, request):
+        serializer = BacktestRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Dates as strings so the parameters can be stored on a job
+        params = {**serializer.validated_data, 'start': str(serializer.validated_data['start'])}
+        if params.get('end'):
+            params['end'] = str(params['end'])
+
+        if wants_async(request.data.get('async')):
+            return enqueue_for(request, 'backtest', params)
+
+        try:
+            result = run_backtest(**params)
+        except Exception as e:
+            logger.error(f"Error running backtest: {str(e)}")
+            logger.error(traceback.format_exc())
+            return Response({"error": "Could not run the backtest"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if "error" in result:
+            return Response(result, status=status.HTTP_404_NOT_FOUND)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+def get_position_values(user):
+    """{asset_name: market value} of a user's open positions (shorts negative), at cost if unpriced."""
+    positions = list(Position.objects.filter(user=user).exclude(quantity=0)
+                     .values_list('asset_name', 'quantity', 'average_cost'))
+    prices = get_latest_prices([name for name, _, _ in positions])
+    return {
+        name: float(quantity) * prices.get(name, float(average_cost))
+        for name, quantity, average_cost in positions
+    }
+
+
+def run_portfolio_risk(tickers, weights, window=252, confidence=0.95, value=None, weights_are_values=False):
+    # Keyed like get_returns_matrix's symbols; holdings differing only in case are one asset
+    totals = {}
+    for ticker, weight in zip(tickers, weights):
+        key = ticker.strip().upper()
+        totals[key] = totals.get(key, 0.0) + weight
+    matrix = get_returns_matrix(list(totals), window)
+    found = {t: totals[t] for t in matrix.symbols}
+    if len(matrix) < 3 or not any(found.values()):
+        return {"error": "Not enough price history for these holdings", "missing": matrix.missing}
+    if value is None and weights_are_values:
+        value = sum(abs(v) for v in found.values())
+
+    with span('analysis.risk'):
+        risk = compute_risk(matrix.returns, list(found.values()), confidence)
+
+    assets = [
+        {
+            "ticker": ticker,
+            "weight": float(risk['weights'][i]),
+            "volatility": float(np.sqrt(risk['covariance'][i, i])),
+            "marginal": float(risk['marginal'][i]),
+            "contribution": float(risk['contribution'][i]),
+            "share": float(risk['share'][i]),
+        }
+        for i, ticker in enumerate(matrix.symbols)
+    ]
+    result = {
+        "tickers": matrix.symbols,
+        "missing": matrix.missing,
+        "window": window,
+        "observations": len(matrix) - 1,
+        "start": matrix.dates[0].isoformat(),
+        "end": matrix.dates[-1].isoformat(),
+        "confidence": confidence,
+        "mean_return": risk['mean_return'],
+        "volatility": risk['volatility'],
+        "annualised_volatility": risk['annualised_volatility'],
+        "var": risk['var'],
+        "cvar": risk['cvar'],
+        "assets": assets,
+        "covariance": risk['covariance'],
+        "correlation": risk['correlation'],
+    }
+    if value:
+        result["value"] = value
+        result["var_amount"] = {k: v * value for k, v in risk['var'].items()}
+        result["cvar_amount"] = {k: v * value for k, v in risk['cvar'].items()}
+    return result
+
+
+class portfolio_risk(APIView):
+    """
+    GET: risk of the user's open positions, weighted by market value.
+    POST: risk of explicit tickers and weights (equal weights if omitted).
+    """
+
+    def get(self, request):
+        return self.respond(request, request.query_params)
+
+    def post(self, request):
+        return self.respond(request, request.data)
+
+    def respond(self, request, data):
+        serializer = RiskRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+
+        try:
+            if params.get('tickers'):
+                tickers, weights, source = params['tickers'], params['weights'], 'user_specified'
+            elif not request.user.is_authenticated:
+                return Response({"error": "Log in to analyse your positions, or pass tickers"},
+                                status=status.HTTP_401_UNAUTHORIZED)
+            else:
+                holdings = get_position_values(request.user)
+                if not holdings:
+                    return Response({"error": "No open positions to analyse"}, status=status.HTTP_404_NOT_FOUND)
+                tickers, weights, source = list(holdings), list(holdings.values()), 'trade_history'
+
+            result = run_portfolio_risk(tickers, weights, params['window'], params['confidence'], params.get('value'),
+                                        weights_are_values=source == 'trade_history')
+        except Exception as e:
+            logger.error(f"Error computing portfolio risk: {str(e)}")
+            logger.error(traceback.format_exc())
+            return Response({"error": "Could not compute portfolio risk"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if "error" in result:
+            return Response(result, status=status.HTTP_404_NOT_FOUND)
+        return Response({"source": source, **result}, status=status.HTTP_200_OK)
+
+
+class screener(APIView):
+    """
+    GET ?filter=rsi < 30 and close < bb_lower&sort=-volatility&page=1&page_size=50
+    over the latest indicators of every symbol in IndicatorSnapshot.
+    """
+    max_page_size = 500
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            page = max(int(params.get('page', 1)), 1)
+            page_size = min(max(int(params.get('page_size', 50)), 1), self.max_page_size)
+        except ValueError:
+            return Response({"error": "page and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        table = get_table()
+        try:
+            with span('analysis.screener'):
+                count, results = table.screen(params.get('filter'), params.get('sort'),
+                                              (page - 1) * page_size, page_size)
+        except ScreenerError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        url = request.build_absolute_uri()
+        return Response({
+            "count": count,
+            "universe": len(table),
+            "page": page,
+            "page_size": page_size,
+            "next": replace_query_param(url, 'page', page + 1) if page * page_size < count else None,
+            "previous": replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
 class analyse(APIView):
+    """
+    POST {"ticker": "AAPL", "interval": "weekly", "lookback": 104}: risk
+    metrics over the last `lookback` bars of the interval (daily, weekly or
+    monthly), or over the bars since 2020 without one.
+    """
+    max_lookback = 5000
+
     def post(self, request):
         try:
             data = request.data
@@ -29,7 +258,30 @@ class analyse(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            risk_metrics = self.analyze_stock_risk(ticker)
+            interval = data.get('interval') or 'daily'
+            if interval not in INTERVALS:
+                return Response(
+                    {"error": f"interval must be one of: {', '.join(INTERVALS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            lookback = data.get('lookback')
+            if lookback is not None:
+                try:
+                    lookback = int(lookback)
+                except (TypeError, ValueError):
+                    lookback = 0
+                if not 2 <= lookback <= self.max_lookback:
+                    return Response(
+                        {"error": f"lookback must be a number of bars between 2 and {self.max_lookback}"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            ticker = ticker.strip().upper()
+            # Identical requests for a trending ticker share one analysis
+            risk_metrics = get_flight('analysis').do(
+                f"{ticker}:{interval}:{lookback}", lambda: self.analyze_stock_risk(ticker, interval, lookback)
+            )
 
             return Response(risk_metrics, status=status.HTTP_200_OK)
 
@@ -46,7 +298,9 @@ class analyse(APIView):
         if not api_key:
             raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
 
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.7)
+        from langchain.prompts import PromptTemplate
+
+        llm = get_chat_model()
 
         template = """
         You are a financial analyst specializing in stock risk assessment.
@@ -73,10 +327,13 @@ class analyse(APIView):
 
         prompt = PromptTemplate.from_template(template)
         final_prompt = prompt.format(**metrics)
-        response = llm.predict(final_prompt)
+        with span('analysis.llm'):
+            response = llm.predict(final_prompt)
         return response
 
     def _safe_float(self, value):
+        import pandas as pd
+
         if pd.isna(value) or value is None:
             return 0.0
         try:
@@ -84,64 +341,20 @@ class analyse(APIView):
         except (TypeError, ValueError):
             return 0.0
 
-    def analyze_stock_risk(self, ticker):
-        today = time.strftime("%Y-%m-%d")
-
+    def analyze_stock_risk(self, ticker, interval='daily', lookback=None):
         try:
-            df = yf.download(ticker, start='2020-01-01', end=today)
+            df = get_indicators(ticker, interval, lookback)
 
-            if df.empty:
+            if df is None or df.empty:
                 return {
                     "ticker": ticker,
                     "error": "No data found for this ticker. Please verify the ticker symbol."
                 }
 
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = [col[0] for col in df.columns]
-
-            df['Daily_Return'] = df['Close'].pct_change().fillna(0)
-
-            df['Volatility'] = df['Daily_Return'].rolling(window=21).std().fillna(0) * np.sqrt(252)
-
-            df['MA_50'] = df['Close'].rolling(window=50).mean().fillna(df['Close'])
-            df['MA_200'] = df['Close'].rolling(window=200).mean().fillna(df['Close'])
-
-            try:
-                df['RSI'] = df.ta.rsi(close=df['Close'], length=14).fillna(50)
-            except Exception as e:
-                logger.warning(f"Error calculating RSI: {str(e)}. Using default values.")
-                df['RSI'] = pd.Series([50] * len(df), index=df.index)
-
-            try:
-                macd_result = df.ta.macd(close=df['Close'], fast=12, slow=26, signal=9)
-                if isinstance(macd_result, pd.DataFrame):
-                    df['MACD'] = macd_result.iloc[:, 0].fillna(0)  # First column should be MACD
-                else:
-                    col_name = 'MACD_12_26_9'
-                    df['MACD'] = macd_result[col_name] if col_name in macd_result else pd.Series([0] * len(df),
-                                                                                                 index=df.index)
-            except Exception as e:
-                logger.warning(f"Error calculating MACD: {str(e)}. Using default values.")
-                df['MACD'] = pd.Series([0] * len(df), index=df.index)
-
-            try:
-                bb_bands = df.ta.bbands(close=df['Close'], length=20)
-                if isinstance(bb_bands, pd.DataFrame):
-                    df['BB_upper'] = bb_bands.iloc[:, 0].fillna(df['Close'] * 1.1)  # Default to 10% above price
-                    df['BB_middle'] = bb_bands.iloc[:, 1].fillna(df['Close'])
-                    df['BB_lower'] = bb_bands.iloc[:, 2].fillna(df['Close'] * 0.9)  # Default to 10% below price
-                else:
-                    df['BB_upper'] = bb_bands.get('BBU_20_2.0',
-                                                  pd.Series([df['Close'].iloc[-1] * 1.1] * len(df), index=df.index))
-                    df['BB_middle'] = bb_bands.get('BBM_20_2.0',
-                                                   pd.Series([df['Close'].iloc[-1]] * len(df), index=df.index))
-                    df['BB_lower'] = bb_bands.get('BBL_20_2.0',
-                                                  pd.Series([df['Close'].iloc[-1] * 0.9] * len(df), index=df.index))
-            except Exception as e:
-                logger.warning(f"Error calculating Bollinger Bands: {str(e)}. Using default values.")
-                df['BB_upper'] = df['Close'] * 1.1
-                df['BB_middle'] = df['Close']
-                df['BB_lower'] = df['Close'] * 0.9
+            # Indicators cover the warm-up bars too; summarise the requested window
+            df = df.tail(lookback) if lookback else df[df.index >= str(DEFAULT_START)]
+            if df.empty:
+                return {"ticker": ticker, "error": f"No {interval} bars since {DEFAULT_START}."}
 
             mean_return = df['Daily_Return'].mean()
             volatility = df['Volatility'].mean()
@@ -155,6 +368,10 @@ class analyse(APIView):
 
             latest_data = {
                 'ticker': ticker,
+                'interval': interval,
+                'bars': len(df),
+                'start': df.index[0].strftime("%Y-%m-%d"),
+                'end': df.index[-1].strftime("%Y-%m-%d"),
                 'latest_close': self._safe_float(latest_row['Close']),
                 'daily_return': self._safe_float(mean_return),
                 'volatility': self._safe_float(volatility),
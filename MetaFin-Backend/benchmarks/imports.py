@@ -0,0 +1,66 @@
+"""
+Measure what the project imports at startup, in a fresh interpreter.
+"""
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+
+# What a worker does before serving its first request
+STARTUP = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+# Loaded by views on first use; none of these should be imported at startup
+HEAVY_MODULES = (
+    'pandas', 'pandas_ta', 'scipy', 'sklearn', 'transformers', 'torch', 'langchain', 'langchain_community',
+    'langchain_openai', 'google.genai', 'yfinance', 'yahooquery', 'newspaper', 'praw',
+)
+
+
+def run_python(args, code):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'MetaFin.settings')}
+    result = subprocess.run([sys.executable, *args, '-c', code], cwd=settings.BASE_DIR, env=env,
+                            capture_output=True, text=True, timeout=300)
+    if result.returncode:
+        raise RuntimeError(f"Import failed:\n{result.stderr[-2000:]}")
+    return result
+
+
+def import_times(code=STARTUP):
+    """
+    [(module, self_us, cumulative_us)] from `python -X importtime`, in import
+    order. Cumulative time includes everything the module imported first.
+    """
+    stderr = run_python(['-X', 'importtime'], code).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header row
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def package_totals(rows):
+    """Self time summed per top-level package, in microseconds."""
+    totals = {}
+    for module, self_us, _ in rows:
+        package = module.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def measure_startup(code=STARTUP):
+    """Wall time of code in a fresh interpreter and which HEAVY_MODULES it loaded."""
+    probe = (
+        "import json, sys, time; start = time.perf_counter()\n"
+        f"{code}\n"
+        "print(json.dumps({'seconds': time.perf_counter() - start, "
+        f"'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))"
+    )
+    return json.loads(run_python([], probe).stdout.strip().splitlines()[-1])
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import Counter
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from MetaFin.admission import reset_admission
+from MetaFin.middleware import AdmissionMiddleware
+
+
+def run_load(path, workers, service_time, duration, abusers, abuser_threads, clients, interval, seed=42):
+    """
+    Drive AdmissionMiddleware in front of a view that holds a worker for
+    service_time seconds. `workers` threads stand in for the server's worker
+    pool: requests queue for one before reaching the middleware. Abusive users
+    send back-to-back requests from many threads; well-behaved clients send
+    one every `interval` seconds. Returns {'abusive'|'well-behaved': (latencies, statuses)}.
+    """
+    def view(request):
+        time.sleep(service_time)
+        return JsonResponse({})
+
+    middleware = AdmissionMiddleware(view)
+    pool = threading.BoundedSemaphore(workers)
+    factory = RequestFactory()
+    User = get_user_model()
+    results = {'abusive': ([], Counter()), 'well-behaved': ([], Counter())}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def send(kind, token):
+        request = factory.post(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+        start = time.perf_counter()
+        with pool:
+            response = middleware(request)
+        elapsed = time.perf_counter() - start
+        with lock:
+            results[kind][0].append(elapsed)
+            results[kind][1][response.status_code] += 1
+        return response
+
+    def abuser(token):
+        while time.monotonic() < deadline:
+            send('abusive', token)
+            # Stand-in for the client's round trip; without it the simulated
+            # clients would take the CPU from the simulated server
+            time.sleep(0.01)
+
+    def client(token, offset):
+        time.sleep(offset)
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            send('well-behaved', token)
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    rng = np.random.default_rng(seed)
+    threads = [
+        threading.Thread(target=abuser, args=(str(AccessToken.for_user(User(pk=1_000_000 + i % abusers))),))
+        for i in range(abusers * abuser_threads)
+    ] + [
+        threading.Thread(target=client, args=(str(AccessToken.for_user(User(pk=2_000_000 + i))),
+                                              float(rng.uniform(0, interval))))
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(latencies, statuses):
+    latencies = np.array(latencies or [0.0]) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        'requests': sum(statuses.values()),
+        'p50_ms': round(float(p50), 1),
+        'p99_ms': round(float(p99), 1),
+        'max_ms': round(float(latencies.max()), 1),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test admission control: well-behaved clients' latency while abusive users flood an "
+        "expensive endpoint, with ADMISSION_ENABLED off and on. The endpoint's view is simulated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/analysis/analyse/', help="Endpoint path (picks the cost and limits)")
+        parser.add_argument('--workers', type=int, default=8, help="Server worker threads")
+        parser.add_argument('--service-time', type=float, default=0.5, help="Seconds each request holds a worker")
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--abusers', type=int, default=1, help="Abusive users")
+        parser.add_argument('--abuser-threads', type=int, default=32, help="Concurrent requests per abusive user")
+        parser.add_argument('--clients', type=int, default=6, help="Well-behaved users")
+        parser.add_argument('--interval', type=float, default=6, help="Seconds between a well-behaved user's requests")
+        parser.add_argument('--max-p99-ms', type=float, default=None,
+                            help="Fail unless, with admission on, abusers get 429s and well-behaved users "
+                                 "only 200s within this p99")
+
+    def handle(self, *args, **options):
+        for enabled in (False, True):
+            cache.clear()
+            with override_settings(ADMISSION_ENABLED=enabled):
+                reset_admission()
+                results = run_load(options['path'], options['workers'], options['service_time'],
+                                   options['duration'], options['abusers'], options['abuser_threads'],
+                                   options['clients'], options['interval'])
+            reset_admission()
+
+            self.stdout.write(f"Admission control {'on' if enabled else 'off'}:")
+            for kind, (latencies, statuses) in results.items():
+                s = summarize(latencies, statuses)
+                self.stdout.write(
+                    f"  {kind:>12}: {s['requests']:5d} requests, p50 {s['p50_ms']:8.1f} ms, "
+                    f"p99 {s['p99_ms']:8.1f} ms, max {s['max_ms']:8.1f} ms, statuses {s['statuses']}"
+                )
+
+        if options['max_p99_ms'] is not None:
+            self.check(results, options['max_p99_ms'])
+
+    def check(self, results, max_p99_ms):
+        abusive = summarize(*results['abusive'])
+        well_behaved = summarize(*results['well-behaved'])
+        problems = []
+        if not abusive['statuses'].get('429'):
+            problems.append("abusive users were never rate limited")
+        if list(well_behaved['statuses']) != ['200']:
+            problems.append(f"well-behaved users got {well_behaved['statuses']}")
+        if well_behaved['p99_ms'] > max_p99_ms:
+            problems.append(f"well-behaved p99 {well_behaved['p99_ms']} ms is over {max_p99_ms} ms")
+        if problems:
+            raise CommandError("Admission control check failed:\n  " + "\n  ".join(problems))
@@ -0,0 +1,125 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from benchmarks.replay import SERVICES, replay_services
+from benchmarks.runner import ENDPOINTS, run_endpoint, environment, regressions
+from trades.management.commands._bench import rolled_back, make_users, make_trades
+
+BENCHMARKS_DIR = Path(settings.BASE_DIR) / 'benchmarks'
+
+
+def parse_latency(values):
+    """'0.2' sets every service; 'openai=1.5' sets one. Later values win."""
+    latency = {}
+    for value in values or []:
+        service, _, seconds = value.rpartition('=')
+        service = service or '*'
+        if service != '*' and service not in SERVICES:
+            raise CommandError(f"Unknown service '{service}'. Choose from: {', '.join(SERVICES)}")
+        try:
+            latency[service] = float(seconds)
+        except ValueError:
+            raise CommandError(f"Invalid latency: {value}")
+    return latency
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive each API endpoint in-process against recorded external services and report "
+        "p50/p95/p99 latency and CPU time. Run once with --record (live network) to capture fixtures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', default=str(BENCHMARKS_DIR / 'fixtures'),
+                            help="Directory holding cassette.json and marketdata/")
+        parser.add_argument('--record', action='store_true',
+                            help="Call the real services once per endpoint and save their responses")
+        parser.add_argument('--endpoints', default=','.join(e.name for e in ENDPOINTS),
+                            help="Comma separated endpoints to run")
+        parser.add_argument('--symbols', default='AAPL,MSFT', help="Comma separated symbols used in requests")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--latency', action='append', metavar='[SERVICE=]SECONDS',
+                            help=f"Synthetic latency per replayed call; services: {', '.join(SERVICES)}")
+        parser.add_argument('--warm', action='store_true',
+                            help="Keep caches between iterations instead of starting each one cold")
+        parser.add_argument('--strict', action='store_true',
+                            help="Fail on requests with no exact recording instead of reusing the latest one")
+        parser.add_argument('--trades', type=int, default=5000, help="Synthetic trades for the benchmark user")
+        parser.add_argument('--output', help="Results JSON path (default: benchmarks/results/<timestamp>.json)")
+        parser.add_argument('--baseline', help="Previous results JSON to compare against")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Fractional slowdown versus the baseline that counts as a regression")
+
+    def handle(self, *args, **options):
+        names = [n.strip() for n in options['endpoints'].split(',') if n.strip()]
+        unknown = set(names) - {e.name for e in ENDPOINTS}
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        endpoints = [e for e in ENDPOINTS if e.name in names]
+        symbols = [s.strip().upper() for s in options['symbols'].split(',') if s.strip()]
+        if len(symbols) < 2:
+            raise CommandError("At least two symbols are needed (compare uses a pair)")
+
+        record = options['record']
+        latency = parse_latency(options['latency'])
+        iterations = 1 if record else options['iterations']
+
+        results = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': environment(),
+            'config': {
+                'mode': 'record' if record else 'replay',
+                'iterations': iterations,
+                'cache': 'warm' if options['warm'] else 'cold',
+                'latency': latency,
+                'symbols': symbols,
+                'trades': options['trades'],
+            },
+            'endpoints': {},
+        }
+
+        # The test client sends Host: testserver; admission control is off because
+        # one user drives every request and rate limits would turn timings into 429s
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], ADMISSION_ENABLED=False), \
+                rolled_back():
+            user = make_users(1, prefix='bench-endpoints')[0]
+            make_trades([user], options['trades'])
+
+            with replay_services(options['fixtures'], record=record, latency=latency,
+                                 strict=options['strict']) as cassette:
+                for endpoint in endpoints:
+                    self.stdout.write(f"{endpoint.name}...", ending='')
+                    self.stdout.flush()
+                    try:
+                        stats = run_endpoint(endpoint, user, symbols, iterations,
+                                             warmup=0 if record else 1, cold=not options['warm'])
+                    except Exception as e:
+                        stats = {'error': f"{type(e).__name__}: {str(e)}"}
+                    results['endpoints'][endpoint.name] = stats
+                    self.stdout.write(' ' + self.format(stats))
+                results['service_calls'] = dict(cassette.calls)
+
+        if record:
+            self.stdout.write(self.style.SUCCESS(f"Recorded fixtures in {options['fixtures']}"))
+
+        output = Path(options['output'] or BENCHMARKS_DIR / 'results' / f"{datetime.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(f"Results written to {output}")
+
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            found = regressions(results, baseline, options['threshold'])
+            if found:
+                raise CommandError("Regressions against baseline:\n  " + "\n  ".join(found))
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def format(self, stats):
+        if 'error' in stats:
+            return self.style.ERROR(stats['error'])
+        line = (f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, "
+                f"cpu p50 {stats['cpu_p50_ms']:.1f} ms, statuses {stats['statuses']}")
+        return self.style.WARNING(line) if stats['errors'] else line
@@ -0,0 +1,53 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.imports import STARTUP, HEAVY_MODULES, import_times, package_totals, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile imports with `python -X importtime` in a fresh interpreter and report the modules "
+        "with the largest cumulative import cost. Defaults to django.setup() plus URL loading."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', help="Profile `import MODULE` instead of project startup")
+        parser.add_argument('--top', type=int, default=25, help="Number of modules to list")
+        parser.add_argument('--packages', action='store_true', help="Also list self time per top-level package")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        code = STARTUP if not options['module'] else f"import django; django.setup(); import {options['module']}"
+        try:
+            rows = import_times(code)
+            startup = measure_startup(code)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        top = sorted(rows, key=lambda row: row[2], reverse=True)[:options['top']]
+        totals = sorted(package_totals(rows).items(), key=lambda item: item[1], reverse=True)[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'seconds': startup['seconds'],
+                'modules': len(rows),
+                'heavy': startup['heavy'],
+                'top': [{'module': m, 'self_us': s, 'cumulative_us': c} for m, s, c in top],
+                'packages': dict(totals) if options['packages'] else None,
+            }, indent=2))
+            return
+
+        self.stdout.write(f"{len(rows)} modules imported in {startup['seconds'] * 1000:.0f} ms")
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for module, self_us, cumulative_us in top:
+            self.stdout.write(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+        if options['packages']:
+            self.stdout.write(f"\n{'self ms':>14}  package")
+            for package, self_us in totals:
+                self.stdout.write(f"{self_us / 1000:>14.1f}  {package}")
+
+        if startup['heavy']:
+            self.stdout.write(self.style.WARNING(
+                f"Heavy modules loaded: {', '.join(startup['heavy'])} "
+                f"(expected on first use only: {', '.join(HEAVY_MODULES)})"
+            ))
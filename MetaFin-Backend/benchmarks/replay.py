@@ -0,0 +1,261 @@
+"""
+Record external service responses once, then replay them with synthetic latency.
+
+Market data (yfinance/yahooquery) is stored in the marketdata fixture layout so
+FixtureProvider can serve it; Reddit, newspaper, OpenAI and Gemini responses are
+stored in a single cassette.json keyed by service and request.
+"""
+import hashlib
+import json
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+import pandas as pd
+from django.conf import settings
+from marketdata.client import MarketData, reset_market_data
+from marketdata.providers import MarketDataProvider, FixtureProvider, YahooProvider
+
+SERVICES = ('yfinance', 'yahooquery', 'reddit', 'newspaper', 'openai', 'gemini')
+
+
+class MissingRecording(LookupError):
+    pass
+
+
+def digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class Cassette:
+    """
+    Service responses keyed by (service, request key).
+
+    In record mode call() runs the real request and stores its JSON-able
+    result; in replay mode it sleeps for the service's latency and returns the
+    stored result. Replay falls back to the service's most recently recorded
+    response when a key is missing (prompts embed live numbers), unless strict.
+    """
+
+    def __init__(self, path, record=False, latency=None, strict=False):
+        self.path = Path(path)
+        self.record = record
+        self.latency = latency or {}
+        self.strict = strict
+        self._lock = threading.Lock()
+        self.entries = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.calls = {service: 0 for service in SERVICES}
+
+    def delay(self, service):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+        seconds = self.latency.get(service, self.latency.get('*', 0))
+        if seconds and not self.record:
+            time.sleep(seconds)
+
+    def call(self, service, key, fetch):
+        if self.record:
+            value = fetch()
+            with self._lock:
+                self.entries.setdefault(service, {})[key] = value
+            self.delay(service)
+            return value
+
+        self.delay(service)
+        recorded = self.entries.get(service, {})
+        if key in recorded:
+            return recorded[key]
+        if recorded and not self.strict:
+            return recorded[next(reversed(recorded))]
+        raise MissingRecording(f"No recorded {service} response for {key}")
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.entries, indent=2, sort_keys=True, default=str))
+
+
+class RecordingProvider(MarketDataProvider):
+    """Wrap a live provider and write everything it returns in the fixture layout."""
+
+    def __init__(self, inner, path, cassette):
+        self.inner = inner
+        self.path = Path(path)
+        self.cassette = cassette
+        self._lock = threading.Lock()
+        (self.path / 'history').mkdir(parents=True, exist_ok=True)
+
+    def history(self, symbols, start=None, end=None, interval='1d'):
+        frames = self.inner.history(symbols, start, end, interval)
+        self.cassette.delay('yfinance')
+        with self._lock:
+            for symbol, df in frames.items():
+                file = self.path / 'history' / f"{symbol}.csv"
+                if file.exists():
+                    # latest_prices records a short window; keep the longer history too
+                    existing = pd.read_csv(file, index_col=0, parse_dates=True)
+                    df = pd.concat([existing, df])
+                    df = df[~df.index.duplicated(keep='last')].sort_index()
+                df.to_csv(file, index_label='Date')
+        return frames
+
+    def fundamentals(self, symbols):
+        data = self.inner.fundamentals(symbols)
+        self.cassette.delay('yahooquery')
+        self._merge('fundamentals.json', data)
+        return data
+
+    def news_links(self, symbols, limit=10):
+        data = self.inner.news_links(symbols, limit)
+        self.cassette.delay('yfinance')
+        self._merge('news.json', data)
+        return data
+
+    def _merge(self, name, data):
+        with self._lock:
+            file = self.path / name
+            existing = json.loads(file.read_text()) if file.exists() else {}
+            existing.update(data)
+            file.write_text(json.dumps(existing, indent=2, sort_keys=True, default=str))
+
+
+class ReplayProvider(FixtureProvider):
+    """FixtureProvider that waits like the real services would."""
+
+    def __init__(self, path, cassette):
+        super().__init__(path)
+        self.cassette = cassette
+
+    def history(self, symbols, start=None, end=None, interval='1d'):
+        self.cassette.delay('yfinance')
+        return super().history(symbols, start, end, interval)
+
+    def latest_prices(self, symbols):
+        self.cassette.delay('yfinance')
+        return super().latest_prices(symbols)
+
+    def fundamentals(self, symbols):
+        self.cassette.delay('yahooquery')
+        return super().fundamentals(symbols)
+
+    def news_links(self, symbols, limit=10):
+        self.cassette.delay('yfinance')
+        return super().news_links(symbols, limit)
+
+
+def replay_fetch_article(cassette, real_fetch):
+    """A fetch_article() whose downloads go through the cassette."""
+
+    def fetch_article(url):
+        def fetch():
+            article = real_fetch(url)
+            return {'title': article.title, 'text': article.text}
+
+        return SimpleNamespace(**cassette.call('newspaper', url, fetch))
+
+    return fetch_article
+
+
+class ReplayChat:
+    """Stands in for a langchain chat model; only predict() is used."""
+
+    def __init__(self, cassette, real):
+        self.cassette = cassette
+        self.real = real
+
+    def predict(self, prompt, **kwargs):
+        return self.cassette.call('openai', digest(prompt), lambda: self.real().predict(prompt, **kwargs))
+
+
+def replay_genai_client(cassette, real_client):
+    """A get_genai_client() whose generate_content() goes through the cassette."""
+
+    def get_genai_client(api_key):
+        def generate_content(model, contents):
+            def fetch():
+                return real_client(api_key).models.generate_content(model=model, contents=contents).text
+
+            return SimpleNamespace(text=cassette.call('gemini', digest([model, contents]), fetch))
+
+        return SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+
+    return get_genai_client
+
+
+class ReplayReddit:
+    """Stands in for praw.Reddit; records submissions as plain dicts."""
+
+    def __init__(self, cassette, real):
+        self.cassette = cassette
+        self.real = real
+
+    def subreddit(self, name):
+        cassette, real = self.cassette, self.real
+
+        def listing(method, *args, **kwargs):
+            def fetch():
+                submissions = getattr(real().subreddit(name), method)(*args, **kwargs)
+                return [{'id': s.id, 'title': s.title, 'selftext': s.selftext} for s in submissions]
+
+            rows = cassette.call('reddit', digest([name, method, args, kwargs]), fetch)
+            return [SimpleNamespace(**row) for row in rows]
+
+        return SimpleNamespace(
+            new=lambda **kwargs: listing('new', **kwargs),
+            search=lambda query, **kwargs: listing('search', query, **kwargs),
+        )
+
+
+@contextmanager
+def replay_services(fixtures_dir, record=False, latency=None, strict=False):
+    """
+    Route every external call made by the views through recordings.
+
+    Yields the Cassette; in record mode it is saved on exit.
+    """
+    fixtures_dir = Path(fixtures_dir)
+    cassette = Cassette(fixtures_dir / 'cassette.json', record=record, latency=latency, strict=strict)
+    marketdata_dir = fixtures_dir / 'marketdata'
+    if record:
+        provider = RecordingProvider(YahooProvider(), marketdata_dir, cassette)
+    else:
+        provider = ReplayProvider(marketdata_dir, cassette)
+
+    previous = reset_market_data(MarketData(
+        provider,
+        ttls=getattr(settings, 'MARKETDATA_CACHE_TTL', None),
+        batch_window=getattr(settings, 'MARKETDATA_BATCH_WINDOW', 0.02),
+    ))
+    try:
+        with ExitStack() as stack:
+            for patch in _patches(cassette):
+                stack.enter_context(patch)
+            yield cassette
+    finally:
+        reset_market_data(previous)
+        if record:
+            cassette.save()
+
+
+def _patches(cassette):
+    from analysis import views as analysis_views
+    from compare import views as compare_views
+    from news import views as news_views
+    from sentiment import views as sentiment_views
+
+    env = {} if cassette.record else {'OPENAI_API_KEY': 'replay', 'GEMINI_API_KEY': 'replay'}
+    # Bind the real factories now; the module attributes are patched below
+    chat_model, llm = analysis_views.get_chat_model, compare_views.get_llm
+    reddit = ReplayReddit(cassette, sentiment_views.get_reddit)
+    return [
+        mock.patch.dict('os.environ', env),
+        mock.patch.object(analysis_views, 'get_chat_model', lambda: ReplayChat(cassette, chat_model)),
+        mock.patch.object(compare_views, 'get_llm', lambda: ReplayChat(cassette, llm)),
+        mock.patch.object(news_views, 'fetch_article', replay_fetch_article(cassette, news_views.fetch_article)),
+        mock.patch.object(news_views, 'get_genai_client',
+                          replay_genai_client(cassette, news_views.get_genai_client)),
+        mock.patch.object(sentiment_views, 'fetch_article',
+                          replay_fetch_article(cassette, sentiment_views.fetch_article)),
+        mock.patch.object(sentiment_views, 'get_reddit', lambda: reddit),
+    ]
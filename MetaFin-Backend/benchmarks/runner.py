@@ -0,0 +1,112 @@
+import platform
+import subprocess
+import time
+from collections import Counter
+import django
+import numpy as np
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from compare.cache import comparison_cache
+from MetaFin.singleflight import reset_flights
+
+
+class Endpoint:
+    def __init__(self, name, method, path, payload):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.payload = payload
+
+    def request(self, client, symbols):
+        data = self.payload(symbols)
+        if self.method == 'get':
+            return client.get(self.path, data)
+        return client.post(self.path, data, format='json')
+
+
+ENDPOINTS = [
+    Endpoint('analysis', 'post', '/analysis/analyse/', lambda s: {'ticker': s[0]}),
+    Endpoint('sentiment', 'post', '/sentiment/sentiment/', lambda s: {'ticker': s[0]}),
+    Endpoint('news', 'get', '/news/news/', lambda s: {'tickers': ','.join(s)}),
+    Endpoint('compare', 'post', '/compare/compare/', lambda s: {'stock1': s[0], 'stock2': s[1]}),
+    Endpoint('recommendations', 'post', '/recommendations/recommendations/', lambda s: {'ticker': s[0]}),
+    Endpoint('trades', 'get', '/trades/trade/', lambda s: {'page_size': 50}),
+]
+
+
+def reset_caches():
+    """Start an iteration cold: no market data, comparison or single-flight results."""
+    cache.clear()
+    comparison_cache.clear()
+    reset_flights()
+
+
+def run_endpoint(endpoint, user, symbols, iterations, warmup=1, cold=True):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    for _ in range(warmup):
+        if cold:
+            reset_caches()
+        endpoint.request(client, symbols)
+
+    wall, cpu, statuses = [], [], Counter()
+    for _ in range(iterations):
+        if cold:
+            reset_caches()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        response = endpoint.request(client, symbols)
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+        statuses[response.status_code] += 1
+
+    return summarize(wall, cpu, statuses)
+
+
+def summarize(wall, cpu, statuses):
+    wall_ms = np.array(wall) * 1000
+    cpu_ms = np.array(cpu) * 1000
+    p50, p95, p99 = np.percentile(wall_ms, [50, 95, 99])
+    return {
+        'iterations': len(wall),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(wall_ms.mean()), 3),
+        'cpu_p50_ms': round(float(np.percentile(cpu_ms, 50)), 3),
+        'cpu_total_ms': round(float(cpu_ms.sum()), 3),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'errors': sum(count for code, count in statuses.items() if code >= 500),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+
+
+def regressions(results, baseline, threshold):
+    """
+    Endpoints whose p50/p95 latency or median CPU grew by more than threshold
+    (a fraction) relative to a previous results file.
+    """
+    found = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'cpu_p50_ms'):
+            before, after = previous.get(metric), current.get(metric)
+            if before and after and after > before * (1 + threshold):
+                found.append(f"{name} {metric}: {before:.1f} -> {after:.1f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return found
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+from .imports import measure_startup
+
+
+class ImportTimeTest(SimpleTestCase):
+    """django.setup() plus URL loading, in a fresh interpreter, stays within IMPORT_TIME_BUDGET."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Best of three; the first run also pays for cold .pyc and disk caches
+        runs = [measure_startup() for _ in range(3)]
+        cls.startup = min(runs, key=lambda run: run['seconds'])
+
+    def test_startup_within_budget(self):
+        budget = settings.IMPORT_TIME_BUDGET
+        self.assertLess(self.startup['seconds'], budget,
+                        f"Startup took {self.startup['seconds']:.2f}s (budget {budget}s); "
+                        f"run `manage.py profile_imports` to see where")
+
+    def test_heavy_modules_load_lazily(self):
+        self.assertEqual(self.startup['heavy'], [])
+
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from MetaFin.instrumentation import counter_lines, register_collector
+
+
+def _round_sig(value, digits=3):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value == 0:
+        return value
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def comparison_key(metrics: dict) -> str:
+    """
+    Cache key for a comparison, independent of the order the symbols were requested in.
+
+    The key embeds the sorted symbol pair plus a digest of the metrics rounded to
+    three significant figures, so an entry is invalidated once fundamentals move.
+    """
+    symbols = sorted(metrics)
+    snapshot = [[symbol, sorted((m, _round_sig(v)) for m, v in metrics[symbol].items())] for symbol in symbols]
+    digest = hashlib.sha1(json.dumps(snapshot, default=str).encode()).hexdigest()[:16]
+    return f"compare:{':'.join(symbols)}:{digest}"
+
+
+class ComparisonCache:
+    """
+    In-process LRU with TTL, backed by Django's cache so entries written by one
+    worker (or the warm_compare_cache command) are visible to the others.
+    """
+
+    def __init__(self, maxsize=512, ttl=6 * 60 * 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry['expires_at'] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry['value']
+                del self._entries[key]
+                self.expirations += 1
+
+        entry = shared_cache.get(key)
+        if entry is not None and entry['expires_at'] > now:
+            with self._lock:
+                self._store(key, entry)
+                self.shared_hits += 1
+            return entry['value']
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        entry = {'value': value, 'expires_at': time.time() + self.ttl}
+        with self._lock:
+            self._store(key, entry)
+        shared_cache.set(key, entry, timeout=self.ttl)
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+comparison_cache = ComparisonCache(
+    maxsize=getattr(settings, 'COMPARE_CACHE_SIZE', 512),
+    ttl=getattr(settings, 'COMPARE_CACHE_TTL', 6 * 60 * 60),
+)
+
+
+@register_collector
+def _collect_metrics():
+    stats = comparison_cache.stats()
+    return counter_lines(
+        'metafin_compare_cache_events_total', "Comparison cache lookups and removals by event.",
+        {event: stats[event] for event in ('hits', 'shared_hits', 'misses', 'evictions', 'expirations')}, 'event',
+    )
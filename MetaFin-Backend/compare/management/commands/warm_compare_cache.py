@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from compare.cache import comparison_cache, comparison_key
+from compare.models import ComparisonPair
+from compare.views import get_bulk_metrics, cached_compare_stock
+
+
+class Command(BaseCommand):
+    help = "Precompute comparisons for the most frequently requested stock pairs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=50, help="Number of most requested pairs to warm")
+
+    def handle(self, *args, **options):
+        pairs = list(ComparisonPair.objects.order_by('-request_count')[:options['top']])
+        if not pairs:
+            self.stdout.write("No comparison requests recorded yet")
+            return
+
+        symbols = sorted({p.symbol_a for p in pairs} | {p.symbol_b for p in pairs})
+        try:
+            all_metrics = get_bulk_metrics(symbols)
+        except ValueError:
+            # One bad symbol fails the bulk call; fall back to per-pair fetches
+            all_metrics = None
+
+        warmed = skipped = failed = 0
+        for pair in pairs:
+            try:
+                if all_metrics is not None:
+                    metrics = {s: all_metrics[s] for s in (pair.symbol_a, pair.symbol_b)}
+                else:
+                    metrics = get_bulk_metrics([pair.symbol_a, pair.symbol_b])
+
+                if comparison_cache.get(comparison_key(metrics)) is not None:
+                    skipped += 1
+                    continue
+
+                cached_compare_stock(metrics)
+                warmed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to warm {pair.symbol_a}/{pair.symbol_b}: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {warmed} pairs, {skipped} already cached, {failed} failed"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComparisonPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol_a', models.CharField(max_length=20)),
+                ('symbol_b', models.CharField(max_length=20)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('last_requested_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-request_count'], name='comparison_pair_count_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='comparisonpair',
+            constraint=models.UniqueConstraint(fields=('symbol_a', 'symbol_b'), name='unique_comparison_pair'),
+        ),
+    ]
@@ -1,3 +1,19 @@
 from django.db import models
 
-# Create your models here.
+
+class ComparisonPair(models.Model):
+    symbol_a = models.CharField(max_length=20)
+    symbol_b = models.CharField(max_length=20)
+    request_count = models.PositiveIntegerField(default=0)
+    last_requested_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['symbol_a', 'symbol_b'], name='unique_comparison_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['-request_count'], name='comparison_pair_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol_a}/{self.symbol_b} ({self.request_count})"
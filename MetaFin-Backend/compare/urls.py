@@ -1,6 +1,7 @@
 from django.urls import path, include
-from .views import compare
+from .views import compare, compare_many
 
 urlpatterns = [
     path('compare/', compare.as_view(), name='compare'),
+    path('multi/', compare_many.as_view(), name='compare-many'),
 ]
\ No newline at end of file
@@ -1,20 +1,49 @@
 from django.http import JsonResponse
 from django.views import View
 import json
-from yahooquery import Ticker
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+from marketdata.client import get_market_data
+from MetaFin.singleflight import get_flight
+from MetaFin.instrumentation import span, timed
 from dotenv import load_dotenv
+import logging
 import os
 import re
+import numpy as np
+from django.db.models import F
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from .cache import comparison_cache, comparison_key
+from .models import ComparisonPair
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
-# Initialize LLM
-llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.7)
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """The shared chat model, built (and langchain imported) on first use."""
+    if not os.getenv("OPENAI_API_KEY"):
+        raise RuntimeError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.7)
+
+METRICS = ['forwardPE', 'trailingPE', 'dividendYield', 'beta', 'marketCap']
+
+# +1 when a higher value is better, -1 when a lower value is better
+METRIC_DIRECTION = {
+    'forwardPE': -1,
+    'trailingPE': -1,
+    'dividendYield': 1,
+    'beta': -1,
+    'marketCap': 1,
+}
+
+MAX_SYMBOLS = 20
 
 
 def compare_stock(metrics: dict) -> dict:
@@ -42,7 +71,8 @@ def compare_stock(metrics: dict) -> dict:
     - reasoning: A clear, simple explanation for your decision
     """
 
-    response = llm.predict(prompt)
+    with span('compare.llm'):
+        response = get_llm().predict(prompt)
 
     # Try to extract valid JSON from response
     match = re.search(r'{\s*"better_stock":\s*".+?",\s*"reasoning":\s*".+?"\s*}', response, re.DOTALL)
@@ -57,26 +87,156 @@ def compare_stock(metrics: dict) -> dict:
         }
 
 
-def get_stock_metrics(stock1: str, stock2: str) -> dict:
-    ticker1 = Ticker(stock1)
-    ticker2 = Ticker(stock2)
+def get_bulk_metrics(symbols: list) -> dict:
+    """
+    Fetch the comparison metrics for every symbol in one market-data round trip.
+
+    Args:
+        symbols: Ticker symbols to fetch.
+
+    Returns:
+        A dict of symbol -> {metric: value}, with 'N/A' for missing values.
+    """
+    summary = get_market_data().fundamentals(symbols)
+
+    invalid = [s for s in symbols if s not in summary]
+    if invalid:
+        raise ValueError(f"Invalid symbols or missing data: {', '.join(invalid)}")
+
+    return {
+        symbol: {metric: summary[symbol].get(metric, 'N/A') for metric in METRICS}
+        for symbol in symbols
+    }
+
+
+def cached_compare_stock(metrics: dict) -> dict:
+    """
+    compare_stock with a pair cache shared by (A, B) and (B, A).
 
-    metrics = ['forwardPE', 'trailingPE', 'dividendYield', 'beta', 'marketCap']
+    The LLM always sees the pair in sorted order so both orders share one entry;
+    unparseable responses are not cached.
+    """
+    key = comparison_key(metrics)
+    comparison = comparison_cache.get(key)
+    if comparison is None:
+        comparison = compare_stock({symbol: metrics[symbol] for symbol in sorted(metrics)})
+        if comparison.get("better_stock"):
+            comparison_cache.set(key, comparison)
+    return comparison
+
+
+def record_pair_request(stock1: str, stock2: str):
+    symbol_a, symbol_b = sorted([stock1, stock2])
+    updated = ComparisonPair.objects.filter(symbol_a=symbol_a, symbol_b=symbol_b).update(
+        request_count=F('request_count') + 1, last_requested_at=timezone.now()
+    )
+    if not updated:
+        pair, created = ComparisonPair.objects.get_or_create(
+            symbol_a=symbol_a, symbol_b=symbol_b, defaults={'request_count': 1}
+        )
+        if not created:
+            ComparisonPair.objects.filter(pk=pair.pk).update(request_count=F('request_count') + 1)
 
-    summary1 = ticker1.summary_detail.get(stock1, {})
-    summary2 = ticker2.summary_detail.get(stock2, {})
 
-    if not summary1 or not summary2:
+def get_stock_metrics(stock1: str, stock2: str) -> dict:
+    try:
+        return get_bulk_metrics([stock1, stock2])
+    except ValueError:
         raise ValueError("One or both stock symbols are invalid or missing data.")
 
+
+@timed('compare.rank')
+def rank_metrics(metrics: dict) -> dict:
+    """
+    Rank symbols and compute z-scores for each metric, vectorised per column.
+
+    Ranks start at 1 for the best value given the metric's direction; missing
+    values get no rank or z-score. The composite score is the mean of the
+    direction-adjusted z-scores.
+    """
+    symbols = list(metrics.keys())
+    values = np.array([
+        [metrics[s][m] if isinstance(metrics[s][m], (int, float)) else np.nan for m in METRICS]
+        for s in symbols
+    ], dtype=float).reshape(len(symbols), len(METRICS))
+    direction = np.array([METRIC_DIRECTION[m] for m in METRICS], dtype=float)
+    missing = np.isnan(values)
+
+    counts = (~missing).sum(axis=0)
+    safe = np.where(missing, 0.0, values)
+    mean = np.divide(safe.sum(axis=0), counts, out=np.zeros(len(METRICS)), where=counts > 0)
+    var = np.divide(np.where(missing, 0.0, (values - mean) ** 2).sum(axis=0), counts,
+                    out=np.zeros(len(METRICS)), where=counts > 0)
+    std = np.sqrt(var)
+    z = np.divide(values - mean, std, out=np.zeros_like(values), where=std > 0)
+    z[missing] = np.nan
+
+    adjusted = np.where(missing, np.inf, -direction * values)
+    ranks = np.empty_like(values)
+    ranks[np.argsort(adjusted, axis=0, kind='stable'), np.arange(len(METRICS))] = np.arange(1, len(symbols) + 1)[:, None]
+    ranks[missing] = np.nan
+
+    scored = (~missing).sum(axis=1)
+    composite = np.divide(np.where(missing, 0.0, z * direction).sum(axis=1), scored,
+                          out=np.zeros(len(symbols)), where=scored > 0)
+
+    def _clean(value, cast=float):
+        return None if np.isnan(value) else cast(value)
+
     return {
-        stock1: {metric: summary1.get(metric, 'N/A') for metric in metrics},
-        stock2: {metric: summary2.get(metric, 'N/A') for metric in metrics}
+        symbol: {
+            "ranks": {m: _clean(ranks[i, j], int) for j, m in enumerate(METRICS)},
+            "z_scores": {m: _clean(round(z[i, j], 4)) for j, m in enumerate(METRICS)},
+            "composite_score": round(float(composite[i]), 4),
+        }
+        for i, symbol in enumerate(symbols)
+    }
+
+
+def compare_many_stocks(metrics: dict, rankings: dict) -> dict:
+    symbols = list(metrics.keys())
+
+    stock_lines = []
+    for symbol in symbols:
+        values = ", ".join(f"{m} = {metrics[symbol].get(m, 'N/A')}" for m in METRICS)
+        stock_lines.append(f"- {symbol}: {values} (composite score {rankings[symbol]['composite_score']})")
+    stock_text = "\n".join(stock_lines)
+
+    prompt = f"""
+    You are a financial analyst specializing in comparing stocks.
+    Based on the following financial metrics, compare these stocks: {', '.join(symbols)}.
+    The composite score is the average direction-adjusted z-score across metrics; higher is better.
+    Your response should help a non-technical person understand which stock is better and why. Assume the user doesn't know anything about the metrics.
+
+    Metrics:
+    {stock_text}
+
+    Respond in JSON format with:
+    - better_stock: The stock symbol that is best based on the analysis
+    - reasoning: A clear, simple explanation for your decision
+    """
+
+    with span('compare.llm'):
+        response = get_llm().predict(prompt)
+
+    match = re.search(r'{\s*"better_stock":\s*".+?",\s*"reasoning":\s*".+?"\s*}', response, re.DOTALL)
+    if match:
+        return json.loads(match.group())
+    return {
+        "better_stock": None,
+        "reasoning": "Could not extract JSON from LLM response.",
+        "raw_response": response
     }
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class compare(View):
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            "cache": comparison_cache.stats(),
+            "singleflight": {name: get_flight(name).stats() for name in ('compare', 'compare_many')},
+        })
+
     def post(self, request, *args, **kwargs):
         try:
             data = json.loads(request.body)
@@ -86,8 +246,13 @@ class compare(View):
             if not stock1 or not stock2:
                 return JsonResponse({"error": "Both stock1 and stock2 are required"}, status=400)
 
-            metrics = get_stock_metrics(stock1, stock2)
-            comparison = compare_stock(metrics)
+            record_pair_request(stock1, stock2)
+
+            def run():
+                metrics = get_stock_metrics(stock1, stock2)
+                return metrics, cached_compare_stock(metrics)
+
+            metrics, comparison = get_flight('compare').do(sorted([stock1, stock2]), run)
 
             response_data = {
                 "stock1": stock1,
@@ -105,4 +270,62 @@ class compare(View):
             import traceback
             error_detail = f"Internal server error: {str(e)}\n{traceback.format_exc()}"
             print(error_detail)
-            return JsonResponse({"error": error_detail}, status=500)
\ No newline at end of file
+            return JsonResponse({"error": error_detail}, status=500)
+
+
+def parse_flag(value):
+    """True or False for a JSON boolean or its usual string forms, None for anything else."""
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    return None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class compare_many(View):
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            symbols = data.get('symbols') or []
+            narrative = parse_flag(data.get('narrative', True))
+
+            if narrative is None:
+                return JsonResponse({"error": "narrative must be true or false"}, status=400)
+            if not isinstance(symbols, list):
+                return JsonResponse({"error": "symbols must be a list"}, status=400)
+
+            symbols = list(dict.fromkeys(str(s).strip().upper() for s in symbols if str(s).strip()))
+            if len(symbols) < 2:
+                return JsonResponse({"error": "At least two symbols are required"}, status=400)
+            if len(symbols) > MAX_SYMBOLS:
+                return JsonResponse({"error": f"At most {MAX_SYMBOLS} symbols can be compared"}, status=400)
+
+            def run():
+                metrics = get_bulk_metrics(symbols)
+                rankings = rank_metrics(metrics)
+                best = max(symbols, key=lambda s: rankings[s]['composite_score'])
+
+                response_data = {
+                    "symbols": symbols,
+                    "metrics": metrics,
+                    "rankings": rankings,
+                    "best_by_score": best,
+                }
+
+                if narrative:
+                    comparison = compare_many_stocks(metrics, rankings)
+                    response_data["better_stock"] = comparison.get("better_stock")
+                    response_data["reasoning"] = comparison.get("reasoning")
+                return response_data
+
+            return JsonResponse(get_flight('compare_many').do([symbols, narrative], run))
+
+        except ValueError as ve:
+            return JsonResponse({"error": str(ve)}, status=400)
+        except Exception:
+            logger.exception("Error comparing stocks")
+            return JsonResponse({"error": "Internal server error"}, status=500)
\ No newline at end of file
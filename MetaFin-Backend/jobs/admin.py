@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'user', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = [f.name for f in Job._meta.fields]
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from django import db
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.queue import claim, run, requeue_stale, purge_expired
+
+# How often (seconds) a worker looks for dead leases and expired results
+MAINTENANCE_INTERVAL = 60
+
+
+def work(name, poll_interval, stop, burst=False):
+    """Claim and run jobs until stop is set (or, in burst mode, the queue is empty)."""
+    last_maintenance = 0
+    processed = 0
+    while not stop.is_set():
+        if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+            requeue_stale()
+            purge_expired()
+            last_maintenance = time.monotonic()
+
+        job = claim(name)
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run(job)
+        processed += 1
+    return processed
+
+
+def _worker_main(name, poll_interval, stop):
+    # The parent handles Ctrl-C and tells workers to stop after their current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    work(name, poll_interval, stop)
+    db.connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue with a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOBS_WORKERS,
+                            help="Number of worker processes")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds an idle worker waits before polling again")
+        parser.add_argument('--burst', action='store_true',
+                            help="Run queued jobs in this process and exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        host = f"{socket.gethostname()}:{os.getpid()}"
+
+        if options['burst']:
+            processed = work(host, options['poll_interval'], multiprocessing.Event(), burst=True)
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
+            return
+
+        # Forked children must not share the parent's database connection
+        db.connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+
+        def spawn(i):
+            process = context.Process(target=_worker_main, args=(f"{host}/{i}", options['poll_interval'], stop),
+                                      daemon=False)
+            process.start()
+            return process
+
+        workers = [spawn(i) for i in range(options['workers'])]
+        self.stdout.write(f"Started {len(workers)} job workers; Ctrl-C to stop")
+
+        # Only flip a flag in the handler: setting the shared Event from a signal
+        # handler can deadlock against a wait() already holding its lock
+        stopping = []
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        try:
+            while not stopping:
+                for i, process in enumerate(workers):
+                    if not process.is_alive():
+                        # Replace crashed workers; their job is requeued once its lease expires
+                        self.stderr.write(f"Worker {process.name} exited with {process.exitcode}, restarting")
+                        workers[i] = spawn(i)
+                time.sleep(1)
+        finally:
+            stop.set()
+            for process in workers:
+                process.join()
+        self.stdout.write(self.style.SUCCESS("Job workers stopped"))
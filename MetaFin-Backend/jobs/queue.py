@@ -0,0 +1,170 @@
+import logging
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from MetaFin.instrumentation import span
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+# Extra time a worker gets past the job timeout before its lease is considered lost
+LEASE_GRACE = 30
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def enqueue(kind, params=None, user=None, timeout=None, max_attempts=None, result_ttl=None):
+    """Queue a job of a registered kind and return it; a worker picks it up."""
+    get_task(kind)
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        user=user if user is not None and user.is_authenticated else None,
+        timeout=timeout or settings.JOBS_DEFAULT_TIMEOUT,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        result_ttl=result_ttl or settings.JOBS_RESULT_TTL,
+        run_after=timezone.now(),
+    )
+
+
+def claim(worker, batch=10):
+    """
+    Atomically take the next runnable job for this worker, or return None.
+
+    The claim is a conditional UPDATE on the queued row, so any number of
+    workers (and processes) can poll the same table without a broker; the
+    loser of a race simply tries the next candidate.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'created_at')
+        .values_list('id', 'timeout')[:batch]
+    )
+    for job_id, timeout in candidates:
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            worker=worker,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=timeout + LEASE_GRACE),
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run(job):
+    """Execute a claimed job, then record its result or schedule a retry."""
+    job.attempts += 1
+    Job.objects.filter(id=job.id).update(attempts=job.attempts)
+    try:
+        with time_limit(job.timeout), span(f"jobs.{job.kind}"):
+            result = get_task(job.kind)(**job.params)
+    except Exception as e:
+        if isinstance(e, JobTimeout):
+            error = f"Timed out after {job.timeout} seconds"
+        else:
+            error = f"{type(e).__name__}: {str(e)}"
+        logger.error(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+        logger.error(traceback.format_exc())
+        fail(job, error)
+        return job
+
+    finished = timezone.now()
+    finish(job, {
+        'status': Job.SUCCEEDED,
+        'result': result,
+        'error': '',
+        'finished_at': finished,
+        'expires_at': finished + timedelta(seconds=job.result_ttl),
+        'lease_expires_at': None,
+    })
+    return job
+
+
+def failure_fields(job, error):
+    """Field updates for a failed attempt: retry with backoff, or fail for good."""
+    now = timezone.now()
+    fields = {'error': error, 'lease_expires_at': None}
+    if job.attempts < job.max_attempts:
+        # Exponential backoff between attempts
+        fields['status'] = Job.QUEUED
+        fields['run_after'] = now + timedelta(seconds=settings.JOBS_RETRY_BACKOFF * 2 ** (job.attempts - 1))
+    else:
+        fields['status'] = Job.FAILED
+        fields['finished_at'] = now
+        fields['expires_at'] = now + timedelta(seconds=job.result_ttl)
+    return fields
+
+
+def fail(job, error):
+    finish(job, failure_fields(job, error))
+
+
+def finish(job, fields):
+    """
+    Record the outcome of an attempt if this worker still holds the job's lease.
+    A job whose lease expired may have been requeued and claimed by another
+    worker; its outcome is then left to that worker. Returns whether it was written.
+    """
+    written = Job.objects.filter(
+        id=job.id, status=Job.RUNNING, worker=job.worker, lease_expires_at=job.lease_expires_at
+    ).update(**fields)
+    if not written:
+        logger.warning(f"Job {job.id} ({job.kind}) lost its lease; discarding the outcome of attempt {job.attempts}")
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def requeue_stale():
+    """Give jobs whose worker died (lease expired while running) back to the queue."""
+    count = 0
+    for job in Job.objects.filter(status=Job.RUNNING, lease_expires_at__lt=timezone.now()):
+        # Conditional on the lease we saw, so two workers cannot both requeue it
+        count += Job.objects.filter(
+            id=job.id, status=Job.RUNNING, lease_expires_at=job.lease_expires_at
+        ).update(**failure_fields(job, "Worker stopped before the job finished"))
+    return count
+
+
+def purge_expired():
+    """Delete finished jobs whose result TTL has passed."""
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.SUCCEEDED, Job.FAILED], expires_at__lt=timezone.now()
+    ).delete()
+    return deleted
+
+
+def visible_jobs(user):
+    """Jobs a user may poll: their own, excluding expired results."""
+    if not user.is_authenticated:
+        return Job.objects.none()
+    return Job.objects.filter(user=user).exclude(expires_at__lt=timezone.now())
+
+
+@contextmanager
+def time_limit(seconds):
+    # SIGALRM only works in the main thread; elsewhere rely on the lease instead
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _timeout(signum, frame):
+        raise JobTimeout()
+
+    previous = signal.signal(signal.SIGALRM, _timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
@@ -0,0 +1,24 @@
+tasks = {}
+# Dotted paths of the serializers that check a kind's params before it is queued
+serializers = {}
+
+
+def register(name, serializer=None):
+    """
+    Register a function as a background task that jobs of this kind run.
+    `serializer` (a dotted path, imported on first use) validates the params
+    the same way the kind's synchronous endpoint does.
+    """
+    def decorator(func):
+        tasks[name] = func
+        if serializer:
+            serializers[name] = serializer
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return tasks[name]
+    except KeyError:
+        raise ValueError(f"Unknown job kind: {name}")
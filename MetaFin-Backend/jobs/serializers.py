@@ -0,0 +1,33 @@
+import inspect
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from .models import Job
+from .registry import serializers as param_serializers, tasks
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'attempts', 'max_attempts', 'result', 'error',
+                  'created_at', 'started_at', 'finished_at', 'expires_at']
+        read_only_fields = fields
+
+
+class JobCreateSerializer(serializers.Serializer):
+    kind = serializers.CharField(max_length=50)
+    params = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        task = tasks.get(attrs['kind'])
+        if task is None:
+            raise serializers.ValidationError({"kind": [f"Unknown job kind. Choose from: {', '.join(sorted(tasks))}"]})
+        try:
+            inspect.signature(task).bind(**attrs['params'])
+        except TypeError as e:
+            raise serializers.ValidationError({"params": [str(e)]})
+        path = param_serializers.get(attrs['kind'])
+        if path:
+            params = import_string(path)(data=attrs['params'])
+            if not params.is_valid():
+                raise serializers.ValidationError({"params": params.errors})
+        return attrs
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import JobCreateView, JobDetailView
+
+urlpatterns = [
+    path('', JobCreateView.as_view(), name='job-create'),
+    path('<uuid:job_id>/', JobDetailView.as_view(), name='job-detail'),
+]
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from MetaFin.middleware import charge
+from .models import Job
+from .queue import enqueue, visible_jobs
+from .serializers import JobSerializer, JobCreateSerializer
+
+
+def wants_async(value):
+    """True for the `async` flag as sent in JSON bodies or query strings."""
+    return value is True or str(value).lower() in ('true', '1', 'yes')
+
+
+def accepted(job, request):
+    """202 response pointing the client at the job's status URL."""
+    data = JobSerializer(job).data
+    data['url'] = request.build_absolute_uri(reverse('job-detail', args=[job.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+def enqueue_for(request, kind, params):
+    """
+    Queue a job for the requesting user and answer 202, or 401 for anonymous
+    requests: a job's result is only readable by the user who queued it.
+    """
+    if not request.user.is_authenticated:
+        return Response({"error": "Log in to run requests in the background"},
+                        status=status.HTTP_401_UNAUTHORIZED)
+    return accepted(enqueue(kind, params, user=request.user), request)
+
+
+class JobCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = JobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        kind = serializer.validated_data['kind']
+        path = getattr(settings, 'ADMISSION_JOB_ENDPOINTS', {}).get(kind)
+        rejected = charge(request, path) if path else None
+        if rejected is not None:
+            return rejected
+        return enqueue_for(request, kind, serializer.validated_data['params'])
+
+
+class JobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        try:
+            job = visible_jobs(request.user).get(id=job_id)
+        except Job.DoesNotExist:
+            return Response({"error": "Job not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(JobSerializer(job).data)
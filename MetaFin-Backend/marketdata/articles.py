@@ -0,0 +1,9 @@
+def fetch_article(url):
+    """Download and parse a news article, returning the newspaper Article."""
+    # newspaper pulls in lxml, nltk and friends; only import it once a page is fetched
+    from newspaper import Article
+
+    article = Article(url)
+    article.download()
+    article.parse()
+    return article
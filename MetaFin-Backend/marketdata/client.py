@@ -0,0 +1,168 @@
+import copy
+import hashlib
+import threading
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from MetaFin.instrumentation import span
+
+DEFAULT_TTLS = {
+    'history': 15 * 60,
+    'fundamentals': 15 * 60,
+    'news': 10 * 60,
+    'latest': 5 * 60,
+}
+
+
+class _Batch:
+    def __init__(self):
+        self.symbols = set()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batcher:
+    """
+    Merge concurrent requests for the same kind of data into one provider call.
+
+    The first caller for a key becomes the leader: it waits `window` seconds for
+    other threads to add their symbols, then fetches them all at once. Followers
+    block until the leader finishes and take their symbols from its result.
+    Every caller gets its own copies, so one caller mutating a DataFrame cannot
+    change what another sees.
+    """
+
+    def __init__(self, fetch, window=0.02):
+        self.fetch = fetch
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def submit(self, key, symbols):
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.symbols.update(symbols)
+
+        if leader:
+            if self.window:
+                time.sleep(self.window)
+            with self._lock:
+                del self._pending[key]
+            try:
+                batch.result = self.fetch(key, sorted(batch.symbols))
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return {s: copy.deepcopy(batch.result[s]) for s in symbols if s in batch.result}
+
+
+class MarketData:
+    """
+    Cached, batched access to a MarketDataProvider.
+
+    Results are cached per symbol in Django's cache, so every app (and every
+    worker, with a shared cache backend) reuses the same fetches. Only the
+    symbols missing from the cache go to the provider, and concurrent requests
+    for the same data are merged by a Batcher.
+    """
+
+    def __init__(self, provider, ttls=None, batch_window=0.02):
+        self.provider = provider
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.batcher = Batcher(self._load, batch_window)
+
+    def history(self, symbols, start=None, end=None, interval='1d'):
+        """{symbol: OHLCV DataFrame}; symbols without data are omitted."""
+        return self._get('history', symbols, (_iso(start), _iso(end), interval))
+
+    def fundamentals(self, symbols):
+        """{symbol: summary_detail dict}; invalid symbols are omitted."""
+        return self._get('fundamentals', symbols, ())
+
+    def news_links(self, symbols, limit=10):
+        """{symbol: [{'title', 'link', 'publisher', 'published_at'}]}."""
+        return self._get('news', symbols, (limit,))
+
+    def latest_prices(self, symbols):
+        """{symbol: latest close as float}."""
+        return self._get('latest', symbols, (date.today().isoformat(),))
+
+    def _get(self, kind, symbols, params):
+        symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+        if not symbols:
+            return {}
+
+        digest = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+        keys = {f"md:{kind}:{s}:{digest}": s for s in symbols}
+        result = {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+
+        missing = [s for s in symbols if s not in result]
+        if missing:
+            fetched = self.batcher.submit((kind, params), missing)
+            cache.set_many({f"md:{kind}:{s}:{digest}": v for s, v in fetched.items()},
+                           timeout=self.ttls[kind])
+            result.update(fetched)
+
+        return {s: result[s] for s in symbols if s in result}
+
+    def _load(self, key, symbols):
+        kind, params = key
+        with span(f"marketdata.{kind}"):
+            return self._fetch(kind, params, symbols)
+
+    def _fetch(self, kind, params, symbols):
+        if kind == 'history':
+            return self.provider.history(symbols, *params)
+        if kind == 'fundamentals':
+            return self.provider.fundamentals(symbols)
+        if kind == 'news':
+            return self.provider.news_links(symbols, *params)
+        if kind == 'latest':
+            return self.provider.latest_prices(symbols)
+        raise ValueError(f"Unknown market data kind: {kind}")
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+_market_data = None
+_market_data_lock = threading.Lock()
+
+
+def get_market_data():
+    """The process-wide MarketData built from the MARKETDATA_* settings."""
+    global _market_data
+    if _market_data is None:
+        with _market_data_lock:
+            if _market_data is None:
+                provider = import_string(settings.MARKETDATA_PROVIDER)()
+                _market_data = MarketData(
+                    provider,
+                    ttls=getattr(settings, 'MARKETDATA_CACHE_TTL', None),
+                    batch_window=getattr(settings, 'MARKETDATA_BATCH_WINDOW', 0.02),
+                )
+    return _market_data
+
+
+def reset_market_data(market_data=None):
+    """
+    Replace the shared instance, e.g. with one wrapping a replay provider in
+    benchmarks. With no argument it is rebuilt from MARKETDATA_* settings on
+    next use. Returns the previous instance.
+    """
+    global _market_data
+    previous, _market_data = _market_data, market_data
+    return previous
@@ -0,0 +1,105 @@
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from marketdata.prices import PriceMatrix, write_price_matrix
+
+MODES = ('baseline', 'private', 'mapped')
+
+
+def memory():
+    """Resident, proportional and private memory of this process in MiB."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0]) / 1024
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def worker(mode, path, barrier, results):
+    """
+    Hold every ticker's closes the way a worker's price cache would, wait for
+    all workers to get there (shared pages only split between live mappers),
+    then report memory.
+    """
+    import pandas as pd
+
+    matrix = PriceMatrix(path)
+    cache = {}
+    if mode == 'private':
+        # What each worker does today: its own DataFrame per ticker
+        closes = np.load(matrix.path / 'closes.npy')
+        index = pd.DatetimeIndex(np.asarray(matrix.dates))
+        for i, symbol in enumerate(matrix.symbols):
+            cache[symbol] = pd.DataFrame({'Close': closes[:, i]}, index=index)
+        del closes
+    elif mode == 'mapped':
+        for symbol in matrix.symbols:
+            cache[symbol] = matrix.frame(symbol)
+    for frame in cache.values():
+        frame['Close'].sum()
+
+    barrier.wait()
+    results.put(memory())
+    barrier.wait()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare worker memory holding every ticker's closes as private DataFrames vs. views into "
+        "the shared memory-mapped price matrix, with several workers alive at once (Linux only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--tickers', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=1700, help="Trading days of history per ticker")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            path = self.write_matrix(directory, options['tickers'], options['days'])
+            size = (path / 'closes.npy').stat().st_size / 2 ** 20
+            self.stdout.write(
+                f"Wrote {options['days']} days x {options['tickers']} tickers ({size:.1f} MiB) "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+
+            for mode in MODES:
+                workers = self.run(mode, path, options['workers'])
+                rss = np.mean([w['rss'] for w in workers])
+                pss = np.mean([w['pss'] for w in workers])
+                private = np.mean([w['private'] for w in workers])
+                self.stdout.write(
+                    f"{mode:>8}: per worker RSS {rss:7.1f} MiB, PSS {pss:7.1f} MiB, private {private:7.1f} MiB; "
+                    f"{len(workers)} workers PSS total {pss * len(workers):7.1f} MiB"
+                )
+
+    def write_matrix(self, directory, tickers, days, seed=42):
+        rng = np.random.default_rng(seed)
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (days, tickers)), axis=0))
+        # Later listings start with NaNs, like real universes
+        listed = rng.integers(0, days // 2, tickers) * (rng.random(tickers) < 0.2)
+        closes[np.arange(days)[:, None] < listed] = np.nan
+        dates = np.busday_offset('2020-01-01', np.arange(days), roll='forward')
+        return write_price_matrix(directory, [f"BENCH{i}" for i in range(tickers)], dates, closes)
+
+    def run(self, mode, path, workers):
+        # spawn: workers start without the parent's memory, like separate gunicorn workers
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(mode, path, barrier, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        measured = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return measured
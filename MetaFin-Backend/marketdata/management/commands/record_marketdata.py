@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from marketdata.providers import YahooProvider
+
+
+class Command(BaseCommand):
+    help = "Record live Yahoo data into a directory FixtureProvider can serve."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='+', help="Ticker symbols to record")
+        parser.add_argument('--output', default=settings.MARKETDATA_FIXTURES_DIR, help="Fixture directory")
+        parser.add_argument('--start', default='2020-01-01', help="First day of history to record")
+        parser.add_argument('--news-limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        symbols = sorted(set(options['symbols']))
+        output = Path(options['output'])
+        (output / 'history').mkdir(parents=True, exist_ok=True)
+        provider = YahooProvider()
+
+        history = provider.history(symbols, start=options['start'])
+        for symbol, df in history.items():
+            df.to_csv(output / 'history' / f"{symbol}.csv", index_label='Date')
+
+        self._merge_json(output / 'fundamentals.json', provider.fundamentals(symbols))
+        self._merge_json(output / 'news.json', provider.news_links(symbols, limit=options['news_limit']))
+
+        missing = [s for s in symbols if s not in history]
+        if missing:
+            self.stderr.write(f"No history for: {', '.join(missing)}")
+        self.stdout.write(self.style.SUCCESS(f"Recorded {len(history)} of {len(symbols)} symbols to {output}"))
+
+    def _merge_json(self, path, data):
+        # Keep symbols recorded by earlier runs
+        existing = json.loads(path.read_text()) if path.exists() else {}
+        existing.update(data)
+        path.write_text(json.dumps(existing, indent=2, sort_keys=True, default=str))
@@ -0,0 +1,54 @@
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from marketdata.prices import PriceMatrix, build_price_matrix, write_price_matrix
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the shared price matrix workers map from PRICE_MATRIX_DIR: the symbols already in it "
+        "plus any given ones. Symbols already in it only fetch their latest bars."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', nargs='*', default=[], help="Symbols to add to the matrix")
+        parser.add_argument('--file', help="File with one symbol per line to add to the matrix")
+        parser.add_argument('--start', default='2020-01-01', help="First day of history for new symbols")
+        parser.add_argument('--batch-size', type=int, default=200, help="Symbols per history request")
+        parser.add_argument('--full', action='store_true', help="Refetch every symbol's history from --start")
+        parser.add_argument('--output', default=settings.PRICE_MATRIX_DIR, help="Matrix directory")
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError("Set PRICE_MATRIX_DIR or pass --output")
+        output = Path(options['output'])
+        current = None
+        if (output / 'current').exists():
+            current = PriceMatrix(output / 'current')
+
+        symbols = set(current.symbols if current is not None else [])
+        symbols.update(s.strip().upper() for s in options['symbols'] if s.strip())
+        if options['file']:
+            try:
+                with open(options['file']) as f:
+                    symbols.update(line.strip().upper() for line in f if line.strip())
+            except OSError as e:
+                raise CommandError(f"Could not read {options['file']}: {e}")
+        if not symbols:
+            raise CommandError("No symbols: pass --symbols or --file to build the matrix")
+
+        start = time.perf_counter()
+        found, dates, closes = build_price_matrix(sorted(symbols), options['start'], batch_size=options['batch_size'],
+                                                  current=None if options['full'] else current)
+        if not found:
+            raise CommandError("No history found for any symbol")
+        path = write_price_matrix(output, found, dates, closes)
+
+        missing = sorted(symbols - set(found))
+        if missing:
+            self.stdout.write(self.style.WARNING(f"No history for: {', '.join(missing)}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(dates)} days x {len(found)} symbols ({closes.nbytes / 2 ** 20:.1f} MiB) to {path} "
+            f"in {time.perf_counter() - start:.1f}s"
+        ))
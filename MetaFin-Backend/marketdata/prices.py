@@ -0,0 +1,264 @@
+"""
+Daily closes shared by every worker through one memory-mapped file.
+
+A refresh process (`manage.py refresh_price_matrix`) writes a dates x tickers
+float64 matrix into a new version directory under PRICE_MATRIX_DIR:
+
+    versions/<version>/closes.npy    closes, column-major so each ticker is contiguous
+    versions/<version>/dates.npy     datetime64[D] row labels
+    versions/<version>/symbols.json  column labels and build time
+
+and then atomically repoints the `current` symlink at it. Workers map the
+files read-only, so the pages live once in the OS page cache however many
+workers read them, and a ticker's closes are a NumPy view into the map.
+Workers notice a new version within PRICE_MATRIX_CHECK_INTERVAL seconds; a
+matrix already mapped stays valid after its files are removed.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+from functools import cached_property
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from .client import get_market_data
+
+logger = logging.getLogger(__name__)
+
+# Older versions are removed by the next refresh; keep the one before the
+# current so a worker between readlink and open never finds it gone
+KEEP_VERSIONS = 2
+
+
+def _day(value):
+    return np.datetime64(value.isoformat() if hasattr(value, 'isoformat') else value, 'D')
+
+
+class PriceMatrix:
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / 'symbols.json').read_text())
+        self.version = self.path.name
+        self.symbols = meta['symbols']
+        self.built_at = meta['built_at']
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.dates = np.load(self.path / 'dates.npy', mmap_mode='r')
+        self.closes = np.load(self.path / 'closes.npy', mmap_mode='r')
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def __len__(self):
+        return len(self.dates)
+
+    def rows(self, start=None, end=None):
+        """Row slice for dates in [start, end)."""
+        first = 0 if start is None else int(np.searchsorted(self.dates, _day(start)))
+        last = len(self.dates) if end is None else int(np.searchsorted(self.dates, _day(end)))
+        return slice(first, last)
+
+    @cached_property
+    def date_index(self):
+        """self.dates as one DatetimeIndex, sliced (not copied) by every frame()."""
+        import pandas as pd
+        return pd.DatetimeIndex(np.asarray(self.dates, dtype='datetime64[ns]'), name='Date')
+
+    def _locate(self, symbol, start=None, end=None):
+        """(rows, closes) of one symbol in [start, end), trimmed to the days it has closes."""
+        rows = self.rows(start, end)
+        closes = self.closes[rows, self.index[symbol]]
+        valid = np.isfinite(closes)
+        if not valid.any():
+            return slice(0, 0), closes[0:0]
+        first, last = valid.argmax(), len(valid) - valid[::-1].argmax()
+        if not valid[first:last].all():
+            # A halted ticker; drop its empty days like a provider frame would
+            keep = np.flatnonzero(valid)
+            return rows.start + keep, closes[keep]
+        return slice(rows.start + first, rows.start + last), closes[first:last]
+
+    def column(self, symbol, start=None, end=None):
+        """
+        (dates, closes) of one symbol in [start, end), trimmed to the days it
+        has closes. Both are views into the map unless the column has gaps.
+        """
+        rows, closes = self._locate(symbol, start, end)
+        return self.dates[rows], closes
+
+    def frame(self, symbol, start=None, end=None):
+        """DataFrame with a Close column backed by the map, like MarketData.history() frames."""
+        import pandas as pd
+
+        rows, closes = self._locate(symbol, start, end)
+        return pd.Series(closes, index=self.date_index[rows], name='Close', copy=False).to_frame()
+
+    def matrix(self, symbols, start=None, end=None):
+        """
+        (dates, closes, found, missing) for several symbols in [start, end).
+        Rows are every day in the range, NaN where a symbol has no close;
+        picking columns copies them, one contiguous block per symbol.
+        """
+        found = [s for s in symbols if s in self.index]
+        rows = self.rows(start, end)
+        closes = self.closes[rows][:, [self.index[s] for s in found]]
+        return self.dates[rows], closes, found, [s for s in symbols if s not in self.index]
+
+
+def _current_link(directory):
+    return Path(directory) / 'current'
+
+
+def write_price_matrix(directory, symbols, dates, closes):
+    """
+    Write a new version of the matrix and make it current atomically.
+    Returns the new version's directory.
+    """
+    directory = Path(directory)
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{time.time_ns() % 10 ** 9:09d}"
+    path = directory / 'versions' / version
+    path.mkdir(parents=True)
+
+    np.save(path / 'closes.npy', np.asfortranarray(closes, dtype=np.float64))
+    np.save(path / 'dates.npy', np.asarray(dates, dtype='datetime64[D]'))
+    (path / 'symbols.json').write_text(json.dumps({'symbols': list(symbols), 'built_at': time.time()}))
+    for name in ('closes.npy', 'dates.npy', 'symbols.json'):
+        with open(path / name, 'rb') as f:
+            os.fsync(f.fileno())
+
+    # Renaming a symlink over `current` is atomic: readers see the old or the new version
+    link = _current_link(directory)
+    temporary = directory / f".current-{version}"
+    os.symlink(Path('versions') / version, temporary)
+    os.replace(temporary, link)
+
+    # Version names sort by creation time
+    versions = sorted((directory / 'versions').iterdir(), reverse=True)
+    for old in versions[KEEP_VERSIONS:]:
+        shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+_matrix = None
+_checked_at = 0.0
+_matrix_lock = threading.Lock()
+
+
+def get_price_matrix():
+    """
+    The current PriceMatrix, or None if PRICE_MATRIX_DIR is unset, has not
+    been written yet or is older than PRICE_MATRIX_MAX_AGE seconds.
+    """
+    global _matrix, _checked_at
+    directory = getattr(settings, 'PRICE_MATRIX_DIR', '')
+    if not directory:
+        return None
+    interval = getattr(settings, 'PRICE_MATRIX_CHECK_INTERVAL', 5)
+    if time.monotonic() - _checked_at >= interval:
+        with _matrix_lock:
+            if time.monotonic() - _checked_at >= interval:
+                _matrix = _load_current(directory, _matrix)
+                _checked_at = time.monotonic()
+
+    matrix = _matrix
+    max_age = getattr(settings, 'PRICE_MATRIX_MAX_AGE', 24 * 60 * 60)
+    if matrix is None or time.time() - matrix.built_at > max_age:
+        return None
+    return matrix
+
+
+def _load_current(directory, matrix):
+    try:
+        version = os.path.basename(os.readlink(_current_link(directory)))
+    except OSError:
+        return None
+    if matrix is not None and matrix.version == version:
+        return matrix
+    try:
+        return PriceMatrix(Path(directory) / 'versions' / version)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not map price matrix {version}: {str(e)}")
+        return matrix
+
+
+def reset_price_matrix():
+    global _matrix, _checked_at
+    with _matrix_lock:
+        _matrix, _checked_at = None, 0.0
+
+
+def close_history(symbol, start=None, end=None):
+    """
+    DataFrame with the Close column of symbol in [start, end), served from the
+    shared matrix when it has the symbol, else from MarketData.history().
+    """
+    matrix = get_price_matrix()
+    if matrix is not None and symbol in matrix:
+        return matrix.frame(symbol, start, end)
+    return get_market_data().history([symbol], start=start, end=end).get(symbol)
+
+
+def close_frame(symbols, start=None, end=None):
+    """
+    (DataFrame of closes with a column per symbol found, missing symbols) in
+    [start, end), from the shared matrix when it has every symbol, else from
+    MarketData.history(). Days none of the symbols traded are dropped.
+    """
+    import pandas as pd
+
+    matrix = get_price_matrix()
+    if matrix is not None and all(s in matrix for s in symbols):
+        dates, closes, found, missing = matrix.matrix(symbols, start, end)
+        frame = pd.DataFrame(closes, index=pd.DatetimeIndex(dates, name='Date'), columns=found, copy=False)
+        return frame.dropna(how='all'), missing
+
+    history = get_market_data().history(symbols, start=start, end=end)
+    found = [s for s in symbols if history.get(s) is not None and not history[s].empty]
+    if not found:
+        return pd.DataFrame(), list(symbols)
+    frame = pd.concat({s: history[s]['Close'] for s in found}, axis=1).sort_index()
+    return frame, [s for s in symbols if s not in found]
+
+
+def build_price_matrix(symbols, start, end=None, batch_size=200, current=None):
+    """
+    (symbols, dates, closes) for a new matrix. Symbols already in `current`
+    only fetch the bars from its last day on (which may have been partial);
+    the others fetch their history from start.
+    """
+    import pandas as pd
+
+    # yfinance treats end as exclusive; ask for tomorrow to include today's bar
+    end = end or date.today() + timedelta(days=1)
+    series = {}
+    if current is not None and len(current):
+        since = str(current.dates[-1])
+        known = [s for s in symbols if s in current]
+        for s in known:
+            dates, closes = current.column(s)
+            series[s] = pd.Series(np.array(closes), index=pd.DatetimeIndex(dates))
+    else:
+        since, known = None, []
+
+    for offset in range(0, len(symbols), batch_size):
+        batch = symbols[offset:offset + batch_size]
+        for fetch_start, group in ((since, [s for s in batch if s in known]),
+                                   (start, [s for s in batch if s not in known])):
+            if not group:
+                continue
+            history = get_market_data().history(group, start=str(fetch_start), end=str(end))
+            for s in group:
+                df = history.get(s)
+                if df is None or df.empty:
+                    continue
+                fresh = df['Close'].astype(float)
+                fresh.index = pd.DatetimeIndex(fresh.index).normalize()
+                series[s] = fresh if s not in series else fresh.combine_first(series[s])
+        logger.info(f"Fetched closes for {min(offset + batch_size, len(symbols))} of {len(symbols)} symbols")
+
+    found = [s for s in symbols if s in series]
+    frame = pd.concat({s: series[s] for s in found}, axis=1).sort_index() if found else pd.DataFrame()
+    return found, frame.index.to_numpy(dtype='datetime64[D]'), frame.to_numpy(dtype=float)
@@ -0,0 +1,158 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class MarketDataProvider:
+    """
+    Source of market data. Every call takes a list of symbols and returns a
+    dict keyed by symbol, so implementations can fetch in bulk.
+    """
+
+    def history(self, symbols, start=None, end=None, interval='1d'):
+        """Daily (or interval) OHLCV bars: {symbol: DataFrame indexed by date}."""
+        raise NotImplementedError
+
+    def fundamentals(self, symbols):
+        """Yahoo summary_detail style fields: {symbol: dict}."""
+        raise NotImplementedError
+
+    def news_links(self, symbols, limit=10):
+        """Recent news: {symbol: [{'title', 'link', 'publisher', 'published_at'}]}."""
+        raise NotImplementedError
+
+    def latest_prices(self, symbols):
+        """Last close per symbol: {symbol: float}."""
+        start = date.today() - timedelta(days=7)
+        return last_closes(self.history(symbols, start=start.isoformat()))
+
+
+def last_closes(frames):
+    prices = {}
+    for symbol, df in frames.items():
+        closes = df['Close'].dropna()
+        if not closes.empty and np.isfinite(closes.iloc[-1]):
+            prices[symbol] = float(closes.iloc[-1])
+    return prices
+
+
+def split_download(df, symbols):
+    """Split a yf.download frame into one OHLCV frame per symbol."""
+    frames = {}
+    if df is None or df.empty:
+        return frames
+
+    if isinstance(df.columns, pd.MultiIndex):
+        level = 0 if symbols[0] in df.columns.get_level_values(0) else 1
+        for symbol in symbols:
+            if symbol not in df.columns.get_level_values(level):
+                continue
+            frame = df.xs(symbol, axis=1, level=level).dropna(how='all')
+            if not frame.empty:
+                frames[symbol] = frame[[c for c in HISTORY_COLUMNS if c in frame.columns]]
+    elif len(symbols) == 1:
+        frames[symbols[0]] = df[[c for c in HISTORY_COLUMNS if c in df.columns]].dropna(how='all')
+    return frames
+
+
+def normalise_news(item):
+    # yf.Search returns flat items; newer yf.Ticker.news nests them under 'content'
+    content = item.get('content', item)
+    link = content.get('link') or (content.get('canonicalUrl') or {}).get('url')
+    return {
+        'title': content.get('title'),
+        'link': link,
+        'publisher': content.get('publisher') or (content.get('provider') or {}).get('displayName'),
+        'published_at': content.get('providerPublishTime') or content.get('pubDate'),
+    }
+
+
+class YahooProvider(MarketDataProvider):
+    # yfinance and yahooquery are imported per call (cached by Python after the
+    # first) so FixtureProvider users and URL loading never pay for them
+
+    def history(self, symbols, start=None, end=None, interval='1d'):
+        import yfinance as yf
+        # auto_adjust=True is yfinance's default, which the views were built on:
+        # closes adjusted for splits and dividends
+        df = yf.download(symbols, start=start, end=end, interval=interval, group_by='ticker',
+                         auto_adjust=True, progress=False, threads=True)
+        return split_download(df, symbols)
+
+    def fundamentals(self, symbols):
+        from yahooquery import Ticker
+        summary = Ticker(symbols).summary_detail
+        return {s: summary[s] for s in symbols if isinstance(summary.get(s), dict) and summary.get(s)}
+
+    def news_links(self, symbols, limit=10):
+        import yfinance as yf
+
+        # Yahoo has no bulk news endpoint; fan the searches out instead
+        def search(symbol):
+            try:
+                news = yf.Search(symbol, max_results=limit, news_count=limit, include_research=True).news
+                return [normalise_news(n) for n in news or []][:limit]
+            except Exception as e:
+                logger.error(f"Error fetching news for {symbol}: {str(e)}")
+                return []
+
+        with ThreadPoolExecutor(max_workers=min(8, len(symbols)) or 1) as pool:
+            return dict(zip(symbols, pool.map(search, symbols)))
+
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Serves recorded data from a directory, for tests and benchmarks:
+
+        history/<SYMBOL>.csv   OHLCV with a Date index
+        fundamentals.json      {symbol: summary_detail}
+        news.json              {symbol: [news link dicts]}
+
+    Record one with `manage.py record_marketdata`.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or settings.MARKETDATA_FIXTURES_DIR)
+        self._json = {}
+
+    def _load_json(self, name):
+        if name not in self._json:
+            file = self.path / name
+            self._json[name] = json.loads(file.read_text()) if file.exists() else {}
+        return self._json[name]
+
+    def history(self, symbols, start=None, end=None, interval='1d'):
+        frames = {}
+        for symbol in symbols:
+            file = self.path / 'history' / f"{symbol}.csv"
+            if not file.exists():
+                continue
+            df = pd.read_csv(file, index_col=0, parse_dates=True)
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df.index < pd.Timestamp(end)]
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+    def latest_prices(self, symbols):
+        # Recorded history ends when it was recorded, so use its last bar
+        return last_closes(self.history(symbols))
+
+    def fundamentals(self, symbols):
+        data = self._load_json('fundamentals.json')
+        return {s: data[s] for s in symbols if s in data}
+
+    def news_links(self, symbols, limit=10):
+        data = self._load_json('news.json')
+        return {s: data.get(s, [])[:limit] for s in symbols}
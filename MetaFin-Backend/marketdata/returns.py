@@ -0,0 +1,90 @@
+"""
+Aligned daily closes and returns for a set of symbols over a trailing window.
+
+Matrices are cached per (universe, window) in Django's cache. Once a matrix is
+older than RISK_RETURNS_REFRESH seconds, the next call fetches only the bars
+from its last cached day onwards and appends them. The last day is fetched
+again because it may have been a partial bar.
+"""
+import hashlib
+import time
+from datetime import date, timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from .prices import close_frame
+
+CACHE_TTL = 7 * 24 * 60 * 60
+
+
+class ReturnsMatrix:
+    def __init__(self, symbols, dates, closes, missing=()):
+        self.symbols = list(symbols)
+        self.dates = list(dates)
+        self.closes = closes
+        self.missing = list(missing)
+
+    @property
+    def returns(self):
+        """(days - 1, symbols) simple returns; only days every symbol traded are kept."""
+        return self.closes[1:] / self.closes[:-1] - 1
+
+    def __len__(self):
+        return len(self.dates)
+
+
+def _cache_key(symbols, window):
+    digest = hashlib.sha1(','.join(symbols).encode()).hexdigest()[:16]
+    return f"returns:{digest}:{window}"
+
+
+def _fetch_closes(symbols, start, end):
+    """(dates, closes matrix, missing symbols), keeping only days every found symbol has a close."""
+    frame, missing = close_frame(symbols, start=start.isoformat(), end=end.isoformat())
+    if frame.empty:
+        return [], np.empty((0, 0)), list(symbols)
+    frame = frame.dropna()
+    dates = [d.date() if hasattr(d, 'date') else d for d in frame.index]
+    return dates, frame.to_numpy(dtype=float), missing
+
+
+def _append(matrix, end):
+    """matrix extended with the bars since its last day, or None if a symbol lost its history."""
+    since = matrix.dates[-1]
+    dates, closes, missing = _fetch_closes(matrix.symbols, since, end)
+    if missing:
+        return None
+    if not dates:
+        return matrix
+    keep = sum(1 for d in matrix.dates if d < since)
+    return ReturnsMatrix(matrix.symbols, matrix.dates[:keep] + dates, np.concatenate([matrix.closes[:keep], closes]))
+
+
+def get_returns_matrix(symbols, window=252, today=None):
+    """
+    ReturnsMatrix of the last window + 1 aligned closes of symbols (so window
+    returns). Symbols without any history are listed in .missing and left out.
+    """
+    symbols = sorted(set(s.strip().upper() for s in symbols if s and s.strip()))
+    today = today or date.today()
+    key = _cache_key(symbols, window)
+    entry = cache.get(key)
+    refresh = getattr(settings, 'RISK_RETURNS_REFRESH', 15 * 60)
+
+    if entry is not None and time.time() - entry['fetched_at'] < refresh:
+        return entry['matrix']
+
+    # yfinance treats end as exclusive; ask for tomorrow to include today's bar
+    end = today + timedelta(days=1)
+    matrix = entry['matrix'] if entry is not None else None
+    if matrix is not None and len(matrix) and not matrix.missing:
+        matrix = _append(matrix, end)
+    if matrix is None:
+        # About 1.5 calendar days per trading day covers weekends and holidays
+        dates, closes, missing = _fetch_closes(symbols, today - timedelta(days=int(window * 1.5) + 10), end)
+        matrix = ReturnsMatrix([s for s in symbols if s not in missing], dates, closes, missing)
+
+    matrix.dates = matrix.dates[-(window + 1):]
+    matrix.closes = matrix.closes[-(window + 1):]
+    cache.set(key, {'matrix': matrix, 'fetched_at': time.time()}, timeout=CACHE_TTL)
+    return matrix
@@ -0,0 +1,8 @@
+from jobs.registry import register
+
+
+@register('news')
+def news_summaries(tickers):
+    # Imported here so registering tasks does not load the LLM clients
+    from .views import news
+    return news().get_news(tickers)
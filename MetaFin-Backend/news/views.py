@@ -1,19 +1,26 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from newspaper import Article
-import yfinance as yf
+from marketdata.client import get_market_data
+from marketdata.articles import fetch_article
 import os
 import logging
 import traceback
-from google import genai
 from dotenv import load_dotenv
 from trades.views import TopTradedAssetsView
+from jobs.views import enqueue_for, wants_async
+from MetaFin.instrumentation import span
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+def get_genai_client(api_key):
+    # google.genai is heavy to import; only load it when a summary is requested
+    from google import genai
+    return genai.Client(api_key=api_key)
+
+
 class news(APIView):
     def get(self, request):
         try:
@@ -42,6 +49,9 @@ class news(APIView):
 
             tickers = tickers[:5]
 
+            if wants_async(request.query_params.get('async')):
+                return enqueue_for(request, 'news', {'tickers': tickers})
+
             news_data = self.get_news(tickers)
 
             return Response({
@@ -65,14 +75,15 @@ class news(APIView):
             if not GEMINI_API_KEY:
                 return "API key not found. Please set the GEMINI_API_KEY environment variable."
 
-            client = genai.Client(api_key=GEMINI_API_KEY)
+            client = get_genai_client(GEMINI_API_KEY)
 
             prompt = f"You are a finance expert. Please provide a summary of following news: {text} generate summary give complete text only"
 
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[prompt]
-            )
+            with span('news.llm_summary'):
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=[prompt]
+                )
 
             return response.text
 
@@ -83,18 +94,22 @@ class news(APIView):
     def get_news(self, tickers):
         articles = {}
 
+        try:
+            news_links = get_market_data().news_links(tickers, limit=10)
+        except Exception as e:
+            logger.error(f"Error fetching news: {str(e)}")
+            return {ticker: [{"error": f"Failed to fetch news: {str(e)}"}] for ticker in tickers}
+
         for ticker in tickers:
             try:
                 art = {}
-                search_result = yf.Search(ticker, max_results=10, news_count=10, include_research=True)
-                news_data = search_result.news
+                news_data = news_links.get(ticker, [])
 
                 for article_info in news_data:
                     try:
 
-                        article = Article(article_info['link'])
-                        article.download()
-                        article.parse()
+                        with span('news.article_download'):
+                            article = fetch_article(article_info['link'])
 
                         if len(article.text.strip()) >= 500:
                             summary = self.generate_text(article.text[:4000])
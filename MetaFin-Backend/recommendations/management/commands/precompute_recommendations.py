@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recommendations.models import PortfolioRecommendation
+from recommendations.views import get_holdings, score_portfolios
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute portfolio recommendations for every active user with holdings, and delete those of "
+        "users who no longer hold anything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=3)
+        parser.add_argument('--alpha', type=float, default=0.7)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = list(
+            get_user_model().objects
+            .filter(is_active=True)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        # Inactive users are not served; drop what was computed for them
+        deleted, _ = PortfolioRecommendation.objects.filter(user__is_active=False).delete()
+        written = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch_ids = user_ids[start:start + batch_size]
+            holdings = get_holdings(batch_ids)
+            stale, _ = (PortfolioRecommendation.objects
+                        .filter(user_id__in=batch_ids).exclude(user_id__in=list(holdings)).delete())
+            deleted += stale
+            if not holdings:
+                continue
+
+            batch_users = list(holdings)
+            results = score_portfolios([holdings[u] for u in batch_users], options['top_n'], options['alpha'])
+
+            now = timezone.now()
+            PortfolioRecommendation.objects.bulk_create(
+                [
+                    PortfolioRecommendation(
+                        user_id=user_id,
+                        holdings=sorted(holdings[user_id]),
+                        recommendations=result,
+                        alpha=options['alpha'],
+                        computed_at=now,
+                    )
+                    for user_id, result in zip(batch_users, results)
+                ],
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['holdings', 'recommendations', 'alpha', 'computed_at'],
+            )
+            written += len(batch_users)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Precomputed recommendations for {written} users; deleted {deleted} without holdings"
+        ))
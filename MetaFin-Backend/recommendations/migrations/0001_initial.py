@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('holdings', models.JSONField(default=list)),
+                ('recommendations', models.JSONField(default=list)),
+                ('alpha', models.FloatField(default=0.7)),
+                ('computed_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_recommendation', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -1,3 +1,14 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class PortfolioRecommendation(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                related_name='portfolio_recommendation')
+    holdings = models.JSONField(default=list)
+    recommendations = models.JSONField(default=list)
+    alpha = models.FloatField(default=0.7)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user} - {len(self.recommendations)} recommendations at {self.computed_at}"
@@ -1,3 +1,64 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from trades.models import Position
+from .models import PortfolioRecommendation
 
-# Create your tests here.
+RECOMMENDATION = {'ticker': 'MSFT', 'score': 0.9}
+
+
+def fake_scores(portfolios, top_n=3, alpha=0.7):
+    return [[RECOMMENDATION] for _ in portfolios]
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], ADMISSION_ENABLED=False)
+class PortfolioRecommendationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.holder = User.objects.create_user(email='holder@metafin.local', password=None, full_name='Holder')
+        cls.seller = User.objects.create_user(email='seller@metafin.local', password=None, full_name='Seller')
+        Position.objects.create(user=cls.holder, asset_name='AAPL', asset_type='STOCK',
+                                quantity=Decimal(2), average_cost=Decimal(100))
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def precompute(self):
+        with mock.patch('recommendations.management.commands.precompute_recommendations.score_portfolios',
+                        fake_scores):
+            call_command('precompute_recommendations', skip_checks=True, stdout=mock.Mock())
+
+    def test_get_serves_precomputed_rows(self):
+        client = self.client_for(self.holder)
+        self.assertEqual(client.get('/recommendations/portfolio/').status_code, 404)
+        self.precompute()
+        response = client.get('/recommendations/portfolio/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['holdings'], ['AAPL'])
+        self.assertEqual(response.json()['recommendations'], [RECOMMENDATION])
+
+    def test_precompute_deletes_rows_of_users_without_holdings(self):
+        PortfolioRecommendation.objects.create(user=self.seller, holdings=['TSLA'], recommendations=[RECOMMENDATION],
+                                               computed_at=timezone.now())
+        self.precompute()
+        self.assertEqual(list(PortfolioRecommendation.objects.values_list('user', flat=True)), [self.holder.id])
+        self.assertEqual(self.client_for(self.seller).get('/recommendations/portfolio/').status_code, 404)
+
+    def test_errors_are_not_echoed(self):
+        client = self.client_for(self.holder)
+        response = client.post('/recommendations/portfolio/?top_n=many', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('many', response.json()['message'])
+
+        with mock.patch('recommendations.views.score_portfolios', side_effect=RuntimeError("db password")), \
+                self.assertLogs('recommendations.views', 'ERROR'):
+            response = client.post('/recommendations/portfolio/', {'tickers': ['AAPL']}, format='json')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['message'], "Could not compute recommendations")
@@ -1,6 +1,7 @@
 from django.urls import path, include
-from .views import recommendations
+from .views import recommendations, portfolio_recommendations
 
 urlpatterns = [
     path('recommendations/', recommendations.as_view(), name='news'),
+    path('portfolio/', portfolio_recommendations.as_view(), name='portfolio-recommendations'),
 ]
\ No newline at end of file
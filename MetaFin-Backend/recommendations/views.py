@@ -1,13 +1,16 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
-from yahooquery import Ticker
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+import numpy as np
 import logging
 import traceback
 from dotenv import load_dotenv
+from marketdata.client import get_market_data
+from MetaFin.singleflight import get_flight
+from MetaFin.instrumentation import timed
+from trades.models import Position
+from .models import PortfolioRecommendation
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -71,7 +74,9 @@ class recommendations(APIView):
                     "message": f"Ticker {ticker} not found in our database"
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            recommendations = self.get_recommendations(ticker, top_n, alpha)
+            recommendations = get_flight('recommendations').do(
+                [ticker, top_n, alpha], lambda: self.get_recommendations(ticker, top_n, alpha)
+            )
 
             return Response({
                 "status": "success",
@@ -90,8 +95,7 @@ class recommendations(APIView):
     def get_yahooquery_data(self, stock_list):
         details = {}
         try:
-            ticker = Ticker(stock_list)
-            summary = ticker.summary_detail
+            summary = get_market_data().fundamentals(stock_list)
 
             for symbol in summary:
                 try:
@@ -103,11 +107,17 @@ class recommendations(APIView):
                     logger.warning(f"Error getting details for {symbol}: {str(inner_e)}")
                     details[symbol] = [0, 0, 0]
         except Exception as e:
-            logger.error(f"Error in yahooquery: {str(e)}")
+            logger.error(f"Error fetching fundamentals: {str(e)}")
 
         return details
 
-    def get_recommendations(self, stock_ticker, top_n=3, alpha=0.7):
+    @timed('recommendations.similarity')
+    def build_similarity(self, alpha=0.7):
+        # sklearn takes a while to import; only load it when similarities are built
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        from sklearn.preprocessing import MinMaxScaler
+
         tickers = list(self.stocks.keys())
         descriptions = list(self.stocks.values())
 
@@ -124,24 +134,190 @@ class recommendations(APIView):
 
         combined_sim = alpha * content_sim + (1 - alpha) * feature_sim
 
+        return tickers, combined_sim, realtime_data
+
+    def format_recommendation(self, ticker_symbol, score, realtime_data):
+        return {
+            "ticker": ticker_symbol,
+            "description": self.stocks[ticker_symbol],
+            "similarity_score": round(float(score), 3),
+            "features": {
+                "beta": realtime_data.get(ticker_symbol, [0, 0, 0])[0],
+                "market_cap": realtime_data.get(ticker_symbol, [0, 0, 0])[1],
+                "payout_ratio": realtime_data.get(ticker_symbol, [0, 0, 0])[2],
+            }
+        }
+
+    def get_recommendations(self, stock_ticker, top_n=3, alpha=0.7):
+        tickers, combined_sim, realtime_data = self.build_similarity(alpha)
+
         stock_idx = tickers.index(stock_ticker)
         sim_scores = list(enumerate(combined_sim[stock_idx]))
 
         sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
         top_matches = [x for x in sim_scores if x[0] != stock_idx][:top_n]
 
-        recommendations = []
-        for i, score in top_matches:
-            ticker_symbol = tickers[i]
-            recommendations.append({
-                "ticker": ticker_symbol,
-                "description": self.stocks[ticker_symbol],
-                "similarity_score": round(float(score), 3),
-                "features": {
-                    "beta": realtime_data.get(ticker_symbol, [0, 0, 0])[0],
-                    "market_cap": realtime_data.get(ticker_symbol, [0, 0, 0])[1],
-                    "payout_ratio": realtime_data.get(ticker_symbol, [0, 0, 0])[2],
-                }
-            })
-
-        return recommendations
\ No newline at end of file
+        return [self.format_recommendation(tickers[i], score, realtime_data) for i, score in top_matches]
+
+
+def get_holdings(user_ids):
+    """
+    Cost basis per held asset for each user, from their open long positions.
+
+    Args:
+        user_ids: Iterable of user ids to look up.
+
+    Returns:
+        A dict of user id -> {asset_name: cost_basis}.
+    """
+    rows = (
+        Position.objects
+        .filter(user_id__in=user_ids, quantity__gt=0)
+        .values_list('user_id', 'asset_name', 'quantity', 'average_cost')
+    )
+
+    holdings = {}
+    for user_id, asset_name, quantity, average_cost in rows:
+        holdings.setdefault(user_id, {})[asset_name] = float(quantity * average_cost)
+    return holdings
+
+
+def build_profile_matrix(portfolios, tickers):
+    """
+    Stack portfolios into a row-normalised (users x tickers) weight matrix.
+
+    Assets outside the recommendation universe are ignored.
+    """
+    index = {t: i for i, t in enumerate(tickers)}
+    weights = np.zeros((len(portfolios), len(tickers)))
+    for row, portfolio in enumerate(portfolios):
+        for asset, weight in portfolio.items():
+            if asset in index and weight > 0:
+                weights[row, index[asset]] += weight
+
+    totals = weights.sum(axis=1, keepdims=True)
+    np.divide(weights, totals, out=weights, where=totals > 0)
+    return weights
+
+
+def top_unheld(scores, held_mask, top_n):
+    """Indices of the top_n highest scores per row, skipping held assets."""
+    scores = np.where(held_mask, -np.inf, scores)
+    k = min(top_n, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=int)
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+@timed('recommendations.score_portfolios')
+def score_portfolios(portfolios, top_n=3, alpha=0.7):
+    """
+    Recommend unheld assets for many portfolios at once.
+
+    The similarity matrix is built once and every portfolio is scored with a
+    single (users x tickers) @ (tickers x tickers) product.
+
+    Args:
+        portfolios: List of {ticker: weight} dicts.
+        top_n: Number of recommendations per portfolio.
+        alpha: Weight of description similarity versus fundamentals similarity.
+
+    Returns:
+        A list of recommendation lists, aligned with ``portfolios``.
+    """
+    engine = recommendations()
+    tickers, combined_sim, realtime_data = engine.build_similarity(alpha)
+
+    weights = build_profile_matrix(portfolios, tickers)
+    scores = weights @ combined_sim
+    top = top_unheld(scores, weights > 0, top_n)
+
+    results = []
+    for row, indices in enumerate(top):
+        if not weights[row].any():
+            results.append([])
+            continue
+        results.append([
+            engine.format_recommendation(tickers[i], scores[row, i], realtime_data)
+            for i in indices if np.isfinite(scores[row, i])
+        ])
+    return results
+
+
+class portfolio_recommendations(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            precomputed = PortfolioRecommendation.objects.get(user=request.user)
+        except PortfolioRecommendation.DoesNotExist:
+            return Response({
+                "status": "error",
+                "message": "No precomputed recommendations yet. POST to compute them now."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "status": "success",
+            "source": "precomputed",
+            "holdings": precomputed.holdings,
+            "recommendations": precomputed.recommendations,
+            "computed_at": precomputed.computed_at,
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        data = request.data
+        tickers = data.get('tickers')
+        weights = data.get('weights')
+        try:
+            top_n = int(request.query_params.get('top_n', 3))
+            alpha = float(request.query_params.get('alpha', 0.7))
+            if tickers:
+                if weights is None:
+                    weights = [1.0] * len(tickers)
+                if len(weights) != len(tickers):
+                    return Response({
+                        "status": "error",
+                        "message": "weights must have the same length as tickers"
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                portfolio = {str(t): float(w) for t, w in zip(tickers, weights)}
+        except (TypeError, ValueError):
+            return Response({
+                "status": "error",
+                "message": "top_n must be an integer, alpha a number, tickers a list and weights numbers"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if tickers:
+                source = 'user_specified'
+            else:
+                portfolio = get_holdings([request.user.id]).get(request.user.id, {})
+                source = 'trade_history'
+
+            known = {t: w for t, w in portfolio.items() if t in recommendations.stocks}
+            if not known:
+                return Response({
+                    "status": "error",
+                    "message": "None of the portfolio assets are in our database"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            result = get_flight('portfolio_recommendations').do(
+                [sorted(known.items()), top_n, alpha], lambda: score_portfolios([known], top_n, alpha)[0]
+            )
+
+            return Response({
+                "status": "success",
+                "source": source,
+                "holdings": sorted(known),
+                "recommendations": result
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error in PortfolioRecommendation API: {str(e)}")
+            logger.error(traceback.format_exc())
+            return Response({
+                "status": "error",
+                "message": "Could not compute recommendations"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,286 @@
+"""
+Sentiment classification, served by one sidecar process for all workers.
+
+`manage.py serve_sentiment` loads the model once and listens on the Unix
+socket SENTIMENT_INFERENCE_SOCKET. Requests from every worker go into one
+queue and are classified in batches of up to SENTIMENT_BATCH_SIZE texts, so
+the box runs one copy of the model with one torch thread pool.
+
+classify() sends texts to the sidecar when the socket is configured and falls
+back to a model in the calling process when it is unset or unreachable.
+
+Messages on the socket are a 4-byte big-endian length followed by JSON:
+{"texts": [...]} in, {"results": [{"label", "score"}, ...]} or {"error"} out.
+"""
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+from MetaFin.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+MODEL = "mrm8488/distilroberta-finetuned-financial-news-sentiment-analysis"
+HEADER = struct.Struct('>I')
+MAX_MESSAGE = 64 * 1024 * 1024
+
+
+class InferenceError(Exception):
+    pass
+
+
+class ClassificationError(InferenceError):
+    """The sidecar is up but could not classify these particular texts."""
+
+
+def set_torch_threads(threads):
+    """Size torch's thread pools; must run before the model does any work."""
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(max(1, min(threads, 2)))
+    except RuntimeError:
+        # Only allowed once, before any parallel work; keep whatever is set
+        pass
+
+
+@lru_cache(maxsize=None)
+def get_pipeline(threads=None):
+    # transformers is slow to import and the model slow to load; both happen
+    # on first use, never at URL loading time
+    if threads:
+        set_torch_threads(threads)
+    from transformers import pipeline
+    return pipeline("text-classification", model=MODEL)
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """The next message on sock, or None if the peer closed the connection."""
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE:
+        raise InferenceError(f"Message of {length} bytes is too large")
+    data = _recv_exactly(sock, length)
+    if data is None:
+        raise InferenceError("Connection closed mid-message")
+    return json.loads(data)
+
+
+def _recv_exactly(sock, size):
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise InferenceError("Connection closed mid-message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+class _Request:
+    def __init__(self, texts):
+        self.texts = texts
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batcher:
+    """
+    Runs `pipe` on one thread over batches gathered from a queue. The first
+    request of a batch waits up to max_wait seconds for others to join, up to
+    max_batch texts in total.
+    """
+
+    def __init__(self, pipe, max_batch=32, max_wait=0.01):
+        self.pipe = pipe
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+
+    def submit(self, texts):
+        request = _Request(texts)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def run(self, stop):
+        while not stop.is_set():
+            try:
+                first = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch, size = [first], len(first.texts)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    request = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._classify(batch)
+
+    def _classify(self, batch):
+        texts = [t for request in batch for t in request.texts]
+        try:
+            with span('sentiment.inference.batch'):
+                results = self._run(texts)
+        except Exception as e:
+            logger.error(f"Error classifying a batch of {len(texts)} texts: {str(e)}")
+            # Retry each request alone so one caller's bad input fails only that caller
+            if len(batch) > 1:
+                for request in batch:
+                    self._classify([request])
+                return
+            batch[0].error = e
+            batch[0].done.set()
+            return
+        offset = 0
+        for request in batch:
+            request.results = results[offset:offset + len(request.texts)]
+            offset += len(request.texts)
+            request.done.set()
+
+    def _run(self, texts):
+        if not texts:
+            return []
+        # Long texts (e.g. Reddit selftext) are cut to the model's 512 tokens
+        results = self.pipe(texts, batch_size=self.max_batch, truncation=True)
+        self.batches += 1
+        self.texts += len(texts)
+        return [{'label': r['label'], 'score': float(r['score'])} for r in results]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    # One thread per connection; clients keep theirs open across requests
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (InferenceError, ValueError, OSError) as e:
+                logger.warning(f"Dropping sentiment client: {str(e)}")
+                return
+            if message is None:
+                return
+            texts = message.get('texts') if isinstance(message, dict) else None
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                send_message(self.request, {'error': "Expected {\"texts\": [str, ...]}"})
+                continue
+            try:
+                response = {'results': self.server.batcher.submit(texts)}
+            except Exception as e:
+                response = {'error': str(e)}
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, batcher):
+        self.batcher = batcher
+        if os.path.exists(path):
+            os.unlink(path)  # a socket left behind by a previous run
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o660)
+
+
+class SentimentClient:
+    """Talks to the sidecar over one connection per thread."""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def classify(self, texts):
+        sock = getattr(self._local, 'sock', None)
+        for attempt in range(2):
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                send_message(sock, {'texts': texts})
+                response = recv_message(sock)
+                if response is None:
+                    raise InferenceError("Sentiment server closed the connection")
+                break
+            except (OSError, InferenceError):
+                self.close()
+                sock = None
+                # A kept-alive connection may have gone stale (server restart); retry once
+                if attempt:
+                    raise
+        if 'error' in response:
+            raise ClassificationError(response['error'])
+        return response['results']
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+
+@lru_cache(maxsize=None)
+def get_client(path):
+    return SentimentClient(path, timeout=getattr(settings, 'SENTIMENT_INFERENCE_TIMEOUT', 30.0))
+
+
+_unavailable_until = 0.0
+
+
+def classify(texts):
+    """
+    [{'label', 'score'}] for each text, from the sidecar when it is configured
+    and reachable, else from a model loaded in this process.
+    """
+    global _unavailable_until
+    path = getattr(settings, 'SENTIMENT_INFERENCE_SOCKET', '')
+    if path and time.monotonic() >= _unavailable_until:
+        try:
+            with span('sentiment.inference.remote'):
+                return get_client(path).classify(texts)
+        except ClassificationError:
+            # The sidecar is healthy; these texts would fail in-process too
+            raise
+        except (OSError, InferenceError) as e:
+            # Do not retry a dead sidecar on every request
+            _unavailable_until = time.monotonic() + getattr(settings, 'SENTIMENT_INFERENCE_RETRY', 30)
+            logger.warning(f"Sentiment server unavailable, classifying in-process: {str(e)}")
+
+    pipe = get_pipeline(getattr(settings, 'SENTIMENT_FALLBACK_THREADS', 1))
+    return [{'label': r['label'], 'score': float(r['score'])} for r in pipe(texts, truncation=True)]
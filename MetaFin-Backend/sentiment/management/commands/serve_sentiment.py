@@ -0,0 +1,61 @@
+import os
+import signal
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from sentiment.inference import Batcher, InferenceServer, get_pipeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the sentiment model once and classify texts for every worker over a Unix socket, "
+        "batching concurrent requests together."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.SENTIMENT_INFERENCE_SOCKET, help="Unix socket path")
+        parser.add_argument('--threads', type=int, default=settings.SENTIMENT_TORCH_THREADS,
+                            help="torch intra-op threads")
+        parser.add_argument('--batch-size', type=int, default=settings.SENTIMENT_BATCH_SIZE,
+                            help="Most texts classified in one forward pass")
+        parser.add_argument('--max-wait', type=float, default=settings.SENTIMENT_BATCH_WAIT,
+                            help="Seconds a request waits for others to join its batch")
+
+    def handle(self, *args, **options):
+        if not options['socket']:
+            raise CommandError("Set SENTIMENT_INFERENCE_SOCKET or pass --socket")
+
+        start = time.perf_counter()
+        pipe = get_pipeline(options['threads'])
+        pipe(["warm up"])
+        self.stdout.write(f"Loaded the model with {options['threads']} torch threads "
+                          f"in {time.perf_counter() - start:.1f}s")
+
+        batcher = Batcher(pipe, options['batch_size'], options['max_wait'])
+        stop = threading.Event()
+        worker = threading.Thread(target=batcher.run, args=(stop,), name='sentiment-batcher', daemon=True)
+        worker.start()
+
+        server = InferenceServer(options['socket'], batcher)
+
+        def shutdown(signum, frame):
+            # shutdown() blocks until serve_forever returns, so not from this thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(f"Serving sentiment on {options['socket']} (pid {os.getpid()}); Ctrl-C to stop")
+        try:
+            server.serve_forever()
+        finally:
+            stop.set()
+            server.server_close()
+            if os.path.exists(options['socket']):
+                os.unlink(options['socket'])
+            worker.join(timeout=5)
+
+        average = batcher.texts / batcher.batches if batcher.batches else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Classified {batcher.texts} texts in {batcher.batches} batches ({average:.1f} per batch)"
+        ))
@@ -0,0 +1,8 @@
+from jobs.registry import register
+
+
+@register('sentiment')
+def sentiment(ticker):
+    # Imported here so registering tasks does not load the sentiment model
+    from .views import get_sentiment
+    return get_sentiment(ticker.upper())
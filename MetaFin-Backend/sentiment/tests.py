@@ -1,3 +1,25 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from .inference import Batcher, _Request
 
-# Create your tests here.
+
+def fake_pipe(texts, batch_size=None, truncation=False):
+    if not truncation:
+        raise AssertionError("texts must be truncated to the model's limit")
+    if 'bad' in texts:
+        raise ValueError("could not classify 'bad'")
+    return [{'label': 'positive', 'score': 0.9} for _ in texts]
+
+
+class BatcherTest(SimpleTestCase):
+    def test_one_bad_request_does_not_fail_the_batch(self):
+        batcher = Batcher(fake_pipe)
+        good, bad, other = _Request(['up', 'down']), _Request(['bad']), _Request(['flat'])
+        batcher._classify([good, bad, other])
+
+        for request in (good, bad, other):
+            self.assertTrue(request.done.is_set())
+        self.assertEqual(good.results, [{'label': 'positive', 'score': 0.9}] * 2)
+        self.assertEqual(other.results, [{'label': 'positive', 'score': 0.9}])
+        self.assertIsInstance(bad.error, ValueError)
+        self.assertIsNone(good.error)
+        self.assertEqual((batcher.batches, batcher.texts), (2, 3))
@@ -2,12 +2,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import SentimentRequestSerializer, SentimentResponseSerializer
-import praw
-import pandas as pd
-import yfinance as yf
-from newspaper import Article
+from functools import lru_cache
+from marketdata.client import get_market_data
+from marketdata.articles import fetch_article
+from MetaFin.singleflight import get_flight
+from MetaFin.instrumentation import span, timed
+from jobs.views import enqueue_for, wants_async
 import tqdm
-from transformers import pipeline
+from .inference import classify
 from .text_clean import clean_text
 import os
 import logging
@@ -16,24 +18,26 @@ from dotenv import load_dotenv
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-client = os.getenv("REDDIT_CLIENT_ID")
-secret = os.getenv("REDDIT_CLIENT_SECRET")
-user_agent = os.getenv("REDDIT_USER_AGENT")
 
-reddit = praw.Reddit(
-    client_id=client,
-    client_secret=secret,
-    user_agent=user_agent
-)
 
-# Sentiment pipeline
-pipe = pipeline("text-classification", model="mrm8488/distilroberta-finetuned-financial-news-sentiment-analysis")
+# praw is slow to import, so the client is built on first use rather than at
+# URL loading time; the sentiment model is loaded by sentiment.inference
+@lru_cache(maxsize=None)
+def get_reddit():
+    import praw
+    return praw.Reddit(
+        client_id=os.getenv("REDDIT_CLIENT_ID"),
+        client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+        user_agent=os.getenv("REDDIT_USER_AGENT")
+    )
 
 
 # Helper functions
+@timed('sentiment.reddit')
 def fetch_stock_posts(subreddit_names, stock_ticker, limit=10):
     posts = []
     collected_ids = set()
+    reddit = get_reddit()
     for subreddit_name in subreddit_names:
         try:
             subreddit = reddit.subreddit(subreddit_name)
@@ -68,14 +72,12 @@ def fetch_stock_posts(subreddit_names, stock_ticker, limit=10):
 def get_news(ticker):
     articles = []
     try:
-        stock = yf.Ticker(ticker)
-        news_data = stock.news or []
-        for article_info in tqdm.tqdm(news_data[:10]):  # Limit to 10 articles
+        news_data = get_market_data().news_links([ticker], limit=10).get(ticker, [])
+        for article_info in tqdm.tqdm(news_data):
             try:
-                if 'link' in article_info:
-                    article = Article(article_info['link'])
-                    article.download()
-                    article.parse()
+                if article_info.get('link'):
+                    with span('sentiment.article_download'):
+                        article = fetch_article(article_info['link'])
                     articles.append(article.text[:300])  # Get first 300 characters
             except Exception as e:
                 logger.warning(f"Failed to process news article: {str(e)}")
@@ -86,6 +88,8 @@ def get_news(ticker):
 
 
 def analyze_sentiments(texts):
+    import pandas as pd
+
     if not texts:
         return pd.DataFrame({
             "text": [],
@@ -102,7 +106,8 @@ def analyze_sentiments(texts):
         })
 
     try:
-        results = [pipe(t)[0] for t in texts]
+        with span('sentiment.inference'):
+            results = classify(texts)
         df = pd.DataFrame({
             "text": texts,
             "sentiment": [r['label'] for r in results],
@@ -134,30 +139,34 @@ def get_percentages(df):
     }
 
 
+def get_sentiment(ticker):
+    # Fetch and analyze sentiment data
+    subreddits = ["stocks", "investing", "IndianStockMarket"]
+    reddit_posts = fetch_stock_posts(subreddits, ticker, limit=30)
+    reddit_texts = [f"Title: {p['title']} Body: {clean_text(p['selftext'])}" for p in reddit_posts]
+
+    news_articles = get_news(ticker)
+
+    df_reddit = analyze_sentiments(reddit_texts)
+    df_news = analyze_sentiments(news_articles)
+
+    return {
+        'reddit': get_percentages(df_reddit),
+        'news': get_percentages(df_news)
+    }
+
+
 class SentimentView(APIView):
     def post(self, request, format=None):
         serializer = SentimentRequestSerializer(data=request.data)
         if serializer.is_valid():
             ticker = serializer.validated_data['ticker'].upper()
 
-            try:
-                # Fetch and analyze sentiment data
-                subreddits = ["stocks", "investing", "IndianStockMarket"]
-                reddit_posts = fetch_stock_posts(subreddits, ticker, limit=30)
-                reddit_texts = [f"Title: {p['title']} Body: {clean_text(p['selftext'])}" for p in reddit_posts]
-
-                news_articles = get_news(ticker)
+            if wants_async(request.data.get('async')):
+                return enqueue_for(request, 'sentiment', {'ticker': ticker})
 
-                df_reddit = analyze_sentiments(reddit_texts)
-                df_news = analyze_sentiments(news_articles)
-
-                reddit_result = get_percentages(df_reddit)
-                news_result = get_percentages(df_news)
-
-                response_data = {
-                    'reddit': reddit_result,
-                    'news': news_result
-                }
+            try:
+                response_data = get_flight('sentiment').do(ticker, lambda: get_sentiment(ticker))
 
                 response_serializer = SentimentResponseSerializer(data=response_data)
                 if response_serializer.is_valid():
@@ -0,0 +1,109 @@
+import csv
+from datetime import datetime, time
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import TradeActivity
+
+EXPORT_FIELDS = [
+    'id', 'user_id', 'trade_type', 'asset_type', 'asset_name', 'quantity', 'price',
+    'total_amount', 'timestamp', 'status', 'order_type',
+]
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the value back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, chunk_size=2000):
+    """
+    Yield trade rows as tuples of EXPORT_FIELDS without caching the queryset.
+
+    iterator() fetches chunk_size rows at a time (a server-side cursor on
+    PostgreSQL), so memory stays flat no matter how many rows match.
+    """
+    return queryset.order_by('timestamp', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _buffered(pieces, buffer_size=64 * 1024):
+    # Group tiny per-row strings into larger chunks to cut per-chunk overhead
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+
+    def pieces():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return _buffered(pieces())
+
+
+def stream_ndjson(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+    def pieces():
+        for row in rows:
+            yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+    return _buffered(pieces())
+
+
+def stream_export(queryset, fmt):
+    rows = iter_export_rows(queryset)
+    return stream_csv(rows) if fmt == 'csv' else stream_ndjson(rows)
+
+
+def parse_bound(value):
+    """Parse an ISO date or datetime query param into an aware datetime."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_export(queryset, params):
+    """
+    Apply the export filters from query params.
+
+    Supports start/end (ISO date or datetime, inclusive start, exclusive end),
+    asset_name (comma separated) and asset_type.
+    """
+    if params.get('start'):
+        queryset = queryset.filter(timestamp__gte=parse_bound(params['start']))
+    if params.get('end'):
+        queryset = queryset.filter(timestamp__lt=parse_bound(params['end']))
+    if params.get('asset_name'):
+        queryset = queryset.filter(asset_name__in=params['asset_name'].split(','))
+    if params.get('asset_type'):
+        queryset = queryset.filter(asset_type=params['asset_type'])
+    return queryset
+
+
+def export_queryset(user):
+    queryset = TradeActivity.objects.all()
+    if not user.is_staff:
+        queryset = queryset.filter(user=user)
+    return queryset
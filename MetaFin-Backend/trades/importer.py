@@ -0,0 +1,191 @@
+import csv
+import json
+import logging
+import time
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from MetaFin.instrumentation import timed
+from .models import TradeActivity
+from .signals import trades_bulk_created
+
+IMPORT_FIELDS = ['trade_type', 'asset_type', 'asset_name', 'quantity', 'price', 'total_amount', 'status', 'order_type']
+DEFAULTS = {'status': 'Success', 'order_type': 'MARKET'}
+MAX_REPORTED_ERRORS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def iter_lines(stream, encoding='utf-8'):
+    """Decode a binary stream line by line without reading it all into memory."""
+    for line in iter(stream.readline, b''):
+        yield line.decode(encoding)
+
+
+def iter_csv_rows(lines):
+    yield from csv.DictReader(lines)
+
+
+def iter_ndjson_rows(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            row = ValueError(f"Invalid JSON: {str(e)}")
+        yield row
+
+
+def detect_format(content_type='', filename=''):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv') or filename.endswith('.csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl') \
+            or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def iter_rows(lines, fmt):
+    return iter_csv_rows(lines) if fmt == 'csv' else iter_ndjson_rows(lines)
+
+
+class TradeImporter:
+    """
+    Validate and insert trades in chunks.
+
+    Each chunk is written with one bulk_create inside its own transaction and then
+    trades_bulk_created is sent once, so derived aggregates are updated per chunk
+    rather than per trade. Invalid rows are reported and skipped; they never abort
+    the rest of the import. If the input itself becomes unreadable (bad encoding,
+    broken CSV quoting), the rows read so far are still imported and the report
+    says where reading stopped.
+    """
+
+    def __init__(self, user, chunk_size=1000):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.fields = {name: TradeActivity._meta.get_field(name) for name in IMPORT_FIELDS}
+        self.total = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.error = None
+
+    def run(self, rows):
+        start = time.perf_counter()
+        chunk = []
+        try:
+            for row in rows:
+                self.total += 1
+                chunk.append((self.total, row))
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            self.error = f"Could not read the upload after row {self.total}: {str(e)}"
+        if chunk:
+            self.import_chunk(chunk)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "total_rows": self.total,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "error": self.error,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.total / elapsed, 1) if elapsed else None,
+        }
+
+    def record_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "errors": errors})
+
+    def validate_row(self, row):
+        if isinstance(row, Exception):
+            raise ValidationError({"row": [str(row)]})
+        if not isinstance(row, dict):
+            raise ValidationError({"row": ["Expected an object"]})
+
+        values, errors = {}, {}
+        for name, field in self.fields.items():
+            raw = row.get(name)
+            if raw in (None, '') and name in DEFAULTS:
+                raw = DEFAULTS[name]
+            if raw in (None, '') and name == 'total_amount':
+                continue
+            try:
+                values[name] = field.clean(raw, None)
+            except ValidationError as e:
+                errors[name] = e.messages
+
+        if 'quantity' in values and values['quantity'] <= 0:
+            errors['quantity'] = ["Quantity must be greater than zero."]
+
+        if 'total_amount' not in values and not errors:
+            try:
+                values['total_amount'] = self.fields['total_amount'].clean(
+                    (values['quantity'] * values['price']).quantize(Decimal('0.01')), None
+                )
+            except ValidationError as e:
+                errors['total_amount'] = e.messages
+
+        raw_timestamp = row.get('timestamp')
+        if raw_timestamp:
+            timestamp = parse_datetime(str(raw_timestamp))
+            if timestamp is None:
+                errors['timestamp'] = ["Enter a valid ISO 8601 date/time."]
+            else:
+                if timezone.is_naive(timestamp):
+                    timestamp = timezone.make_aware(timestamp)
+                values['timestamp'] = timestamp
+
+        if errors:
+            raise ValidationError(errors)
+        return TradeActivity(user=self.user, **values)
+
+    @timed('trades.import_chunk')
+    def import_chunk(self, chunk):
+        trades = []
+        lines = []
+        for line, row in chunk:
+            try:
+                trades.append(self.validate_row(row))
+                lines.append(line)
+            except ValidationError as e:
+                self.record_error(line, e.message_dict)
+
+        if not trades:
+            return
+
+        try:
+            with transaction.atomic():
+                TradeActivity.objects.bulk_create(trades)
+                trades_bulk_created.send(sender=TradeActivity, trades=trades)
+            self.imported += len(trades)
+        except Exception:
+            # The database or a receiver rejected some row; the chunk was rolled back
+            self.import_rows(trades, lines)
+
+    def import_rows(self, trades, lines):
+        # Slow path: isolate the failing rows, one savepoint (insert and receivers) each
+        inserted = 0
+        with transaction.atomic():
+            for trade, line in zip(trades, lines):
+                try:
+                    with transaction.atomic():
+                        TradeActivity.objects.bulk_create([trade])
+                        trades_bulk_created.send(sender=TradeActivity, trades=[trade])
+                    inserted += 1
+                except Exception:
+                    # Database messages name tables and constraints; keep them in the log
+                    logger.exception(f"Error importing row {line}")
+                    self.record_error(line, {"row": ["Row could not be saved"]})
+        self.imported += inserted
@@ -0,0 +1,75 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from trades.models import TradeActivity
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run a benchmark inside a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def make_users(count, prefix='bench'):
+    User = get_user_model()
+    return [
+        User.objects.create_user(email=f'{prefix}-{i}@metafin.local', password=None, full_name='Benchmark')
+        for i in range(count)
+    ]
+
+
+def make_trades(users, count, assets=500, batch_size=10_000, seed=42):
+    """
+    Bulk insert synthetic trades with a skewed asset distribution, so a handful
+    of assets dominate like in real trading, spread over the past with a few
+    seconds between trades. Returns the elapsed seconds.
+    """
+    rng = random.Random(seed)
+    asset_names = [f"BENCH{i}" for i in range(assets)]
+    timestamp = timezone.now() - timedelta(seconds=2 * count)
+
+    start = time.perf_counter()
+    batch = []
+    for _ in range(count):
+        timestamp += timedelta(seconds=rng.random() * 2)
+        quantity = Decimal(rng.randint(1, 100))
+        price = Decimal(rng.randint(100, 100_000)) / 100
+        batch.append(TradeActivity(
+            user=rng.choice(users),
+            trade_type=rng.choice(('BUY', 'BUY', 'SELL')),
+            asset_type='STOCK',
+            asset_name=asset_names[min(int(rng.paretovariate(1.2)) - 1, assets - 1)],
+            quantity=quantity, price=price, total_amount=quantity * price,
+            timestamp=timestamp, status='Success', order_type='MARKET',
+        ))
+        if len(batch) == batch_size:
+            TradeActivity.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TradeActivity.objects.bulk_create(batch)
+    return time.perf_counter() - start
+
+
+def time_query(query, repeat):
+    """Median and max wall time of query() in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        query()
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1]
@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+import random
+import tempfile
+from django.core.management.base import BaseCommand
+from trades.importer import TradeImporter, iter_rows
+from ._bench import rolled_back, make_users
+
+FIELDS = ['trade_type', 'asset_type', 'asset_name', 'quantity', 'price', 'status', 'order_type', 'timestamp']
+
+
+def synthetic_rows(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            'trade_type': rng.choice(('BUY', 'SELL')),
+            'asset_type': 'STOCK',
+            'asset_name': f"BENCH{min(int(rng.paretovariate(1.2)) - 1, 499)}",
+            'quantity': rng.randint(1, 100),
+            'price': f"{rng.randint(100, 100_000) / 100:.2f}",
+            'status': 'Success',
+            'order_type': 'MARKET',
+            'timestamp': f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}+00:00",
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bulk import throughput (rows/s) for a generated CSV or NDJSON file. "
+        "Imported trades are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                if fmt == 'csv':
+                    writer = csv.DictWriter(f, fieldnames=FIELDS)
+                    writer.writeheader()
+                    writer.writerows(synthetic_rows(options['rows']))
+                else:
+                    for row in synthetic_rows(options['rows']):
+                        f.write(json.dumps(row) + '\n')
+            self.stdout.write(f"Generated {options['rows']} rows ({os.path.getsize(path) / 1e6:.1f} MB {fmt})")
+
+            with rolled_back():
+                user = make_users(1, prefix='bench-import')[0]
+                with open(path, newline='', encoding='utf-8') as f:
+                    report = TradeImporter(user, options['chunk_size']).run(iter_rows(f, fmt))
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Imported {report['imported']} rows ({report['failed']} failed) in "
+                f"{report['elapsed_seconds']}s: {report['rows_per_second']} rows/s"
+            ))
+        finally:
+            os.remove(path)
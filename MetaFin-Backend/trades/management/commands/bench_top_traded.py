@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from trades.models import TradeActivity, AssetTradeStats
+from ._bench import rolled_back, make_users, make_trades, time_query
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark top traded assets: full-table aggregate vs. materialised counters. "
+        "Synthetic trades are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trades', type=int, default=1_000_000)
+        parser.add_argument('--assets', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            users = make_users(1, prefix='bench-top-traded')
+            elapsed = make_trades(users, options['trades'], assets=options['assets'])
+            AssetTradeStats.rebuild()
+            self.stdout.write(f"Inserted {options['trades']} trades in {elapsed:.1f}s")
+
+            def aggregate():
+                return list(
+                    TradeActivity.objects.values('asset_name')
+                    .annotate(trade_count=Count('id')).order_by('-trade_count')[:5]
+                )
+
+            def counters():
+                return list(
+                    AssetTradeStats.objects.filter(trade_count__gt=0)
+                    .order_by('-trade_count', 'asset_name').values('asset_name', 'trade_count')[:5]
+                )
+
+            assert [r['trade_count'] for r in aggregate()] == [r['trade_count'] for r in counters()]
+
+            for label, query in (('aggregate', aggregate), ('counters', counters)):
+                median, worst = time_query(query, options['repeat'])
+                self.stdout.write(f"{label:>10}: median {median:.2f} ms, max {worst:.2f} ms")
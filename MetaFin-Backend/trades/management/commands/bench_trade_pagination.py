@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from trades.models import TradeActivity
+from trades.pagination import KeysetPagination
+from ._bench import rolled_back, make_users, make_trades, time_query
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark deep page fetches of a user's trades: OFFSET vs. keyset pagination. "
+        "Synthetic trades are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trades', type=int, default=2_000_000)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        factory = APIRequestFactory()
+
+        with rolled_back():
+            users = make_users(options['users'], prefix='bench-pagination')
+            elapsed = make_trades(users, options['trades'])
+            self.stdout.write(f"Inserted {options['trades']} trades in {elapsed:.1f}s")
+
+            user = users[0]
+            trades = TradeActivity.objects.filter(user=user).order_by('-timestamp', '-id')
+            total = trades.count()
+            self.stdout.write(f"Paging through {total} trades of one user, {page_size} per page")
+
+            depth = 0
+            while depth < total:
+                if depth:
+                    anchor = trades.values_list('timestamp', 'id')[depth - 1]
+                    cursor = KeysetPagination().encode_cursor(anchor)
+                    request = Request(factory.get('/trades/trade/', {'cursor': cursor, 'page_size': page_size}))
+                else:
+                    request = Request(factory.get('/trades/trade/', {'page_size': page_size}))
+
+                def offset_page():
+                    return list(trades[depth:depth + page_size])
+
+                def keyset_page():
+                    return KeysetPagination().paginate_queryset(trades, request)
+
+                assert [t.pk for t in offset_page()] == [t.pk for t in keyset_page()]
+
+                offset_ms, _ = time_query(offset_page, options['repeat'])
+                keyset_ms, _ = time_query(keyset_page, options['repeat'])
+                self.stdout.write(
+                    f"row {depth:>9}: offset {offset_ms:8.2f} ms, keyset {keyset_ms:8.2f} ms"
+                )
+                depth = depth * 10 if depth else 100
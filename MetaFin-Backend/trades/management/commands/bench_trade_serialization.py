@@ -0,0 +1,57 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from MetaFin.renderers import ORJSONRenderer
+from trades.models import TradeActivity
+from trades.serializers import TradeActivitySerializer, TradeActivityListSerializer
+from ._bench import rolled_back, make_users, make_trades
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark serializing a large trade listing: ModelSerializer vs. the values()-based "
+        "TradeActivityListSerializer, rendered with the stdlib json and orjson renderers. "
+        "Synthetic trades are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trades', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = make_users(1, prefix='bench-serialization')[0]
+            elapsed = make_trades([user], options['trades'])
+            self.stdout.write(f"Inserted {options['trades']} trades in {elapsed:.1f}s")
+            queryset = TradeActivity.objects.filter(user=user).order_by('-timestamp', '-id')
+
+            def model_serializer():
+                return TradeActivitySerializer(queryset, many=True).data
+
+            def list_serializer():
+                serializer = TradeActivityListSerializer()
+                return serializer.to_representation(list(serializer.values(queryset)))
+
+            expected = json.loads(JSONRenderer().render(model_serializer()))
+            assert json.loads(ORJSONRenderer().render(list_serializer())) == expected
+
+            for name, serialize in (('ModelSerializer', model_serializer), ('values()', list_serializer)):
+                for renderer in (JSONRenderer(), ORJSONRenderer()):
+                    serialize_ms, render_ms = self.measure(serialize, renderer, options['repeat'])
+                    self.stdout.write(
+                        f"{name:>15} + {type(renderer).__name__:<14}: fetch+serialize {serialize_ms:8.1f} ms, "
+                        f"render {render_ms:7.1f} ms, total {serialize_ms + render_ms:8.1f} ms"
+                    )
+
+    def measure(self, serialize, renderer, repeat):
+        """Serialize and render milliseconds of the fastest of repeat runs."""
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            data = serialize()
+            t1 = time.perf_counter()
+            renderer.render(data)
+            t2 = time.perf_counter()
+            runs.append(((t1 - t0) * 1000, (t2 - t1) * 1000))
+        return min(runs, key=sum)
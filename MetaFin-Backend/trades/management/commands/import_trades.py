@@ -0,0 +1,43 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from trades.importer import TradeImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Stream trades for one user from a CSV or NDJSON file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Email of the user the trades belong to")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+
+        fmt = options['format'] or detect_format(filename=options['path'])
+        if fmt is None:
+            raise CommandError("Could not infer the format from the file name; pass --format")
+
+        importer = TradeImporter(user, options['chunk_size'])
+        if options['path'] == '-':
+            report = importer.run(iter_rows(sys.stdin, fmt))
+        else:
+            with open(options['path'], newline='', encoding='utf-8') as f:
+                report = importer.run(iter_rows(f, fmt))
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if report['errors_truncated']:
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more errors not shown")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']} of {report['total_rows']} rows ({report['failed']} failed) "
+            f"in {report['elapsed_seconds']}s, {report['rows_per_second']} rows/s"
+        ))
+        if report['error']:
+            raise CommandError(report['error'])
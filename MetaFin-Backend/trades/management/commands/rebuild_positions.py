@@ -0,0 +1,24 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from trades.positions import rebuild_positions
+
+
+class Command(BaseCommand):
+    help = "Rebuild positions and realised P&L by replaying successful trades."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', help="Only rebuild this user's positions (email); repeatable")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            user_ids = list(get_user_model().objects.filter(email__in=options['user']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['user'])):
+                raise CommandError("One or more users were not found")
+
+        start = time.perf_counter()
+        written = rebuild_positions(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} positions in {time.perf_counter() - start:.1f}s"
+        ))
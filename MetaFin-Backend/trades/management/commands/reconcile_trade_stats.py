@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from trades.models import TradeActivity, AssetTradeStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-asset trade counters from TradeActivity."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Only report counters that have drifted, without rewriting them")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            actual = dict(
+                TradeActivity.objects.values('asset_name').annotate(n=Count('id')).order_by()
+                .values_list('asset_name', 'n')
+            )
+            stored = dict(AssetTradeStats.objects.values_list('asset_name', 'trade_count'))
+            drifted = sorted(
+                name for name in set(actual) | set(stored)
+                if actual.get(name, 0) != stored.get(name, 0)
+            )
+            for name in drifted:
+                self.stdout.write(f"{name}: stored {stored.get(name, 0)}, actual {actual.get(name, 0)}")
+            self.stdout.write(f"{len(drifted)} counters out of sync")
+            return
+
+        assets = AssetTradeStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt trade counters for {assets} assets"))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_trade_stats(apps, schema_editor):
+    TradeActivity = apps.get_model('trades', 'TradeActivity')
+    AssetTradeStats = apps.get_model('trades', 'AssetTradeStats')
+    counts = TradeActivity.objects.values('asset_name').annotate(trade_count=Count('id')).order_by()
+    AssetTradeStats.objects.bulk_create(
+        [AssetTradeStats(asset_name=c['asset_name'], trade_count=c['trade_count']) for c in counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetTradeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_name', models.CharField(max_length=100, unique=True)),
+                ('trade_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-trade_count', 'asset_name'], name='asset_trade_count_idx')],
+            },
+        ),
+        migrations.RunPython(populate_trade_stats, migrations.RunPython.noop),
+    ]
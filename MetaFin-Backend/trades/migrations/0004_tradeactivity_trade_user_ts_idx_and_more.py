@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0003_assettradestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tradeactivity',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='trade_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tradeactivity',
+            index=models.Index(fields=['asset_name', 'timestamp', 'id'], name='trade_asset_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0004_tradeactivity_trade_user_ts_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tradeactivity',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trades', '0005_tradeactivity_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Position',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_name', models.CharField(max_length=100)),
+                ('asset_type', models.CharField(choices=[('STOCK', 'Stock'), ('MF', 'Mutual Fund'), ('CRYPTO', 'Cryptocurrency')], max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('average_cost', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+                ('realised_pnl', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('trade_count', models.PositiveIntegerField(default=0)),
+                ('last_trade_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='position',
+            constraint=models.UniqueConstraint(fields=('user', 'asset_name'), name='unique_user_position'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0006_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('asset_name', models.CharField(max_length=100)),
+                ('asset_type', models.CharField(choices=[('STOCK', 'Stock'), ('MF', 'Mutual Fund'), ('CRYPTO', 'Cryptocurrency')], max_length=20)),
+                ('trade_count', models.BigIntegerField(default=0)),
+                ('buy_count', models.BigIntegerField(default=0)),
+                ('sell_count', models.BigIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('notional', models.DecimalField(decimal_places=2, default=0, max_digits=28)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'asset_name', 'bucket_start'], name='rollup_asset_idx'), models.Index(fields=['granularity', 'asset_type', 'bucket_start'], name='rollup_asset_type_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='traderollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'bucket_start', 'asset_name', 'asset_type'), name='unique_trade_rollup_bucket'),
+        ),
+    ]
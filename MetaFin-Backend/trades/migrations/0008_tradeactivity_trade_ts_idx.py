@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0007_traderollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tradeactivity',
+            index=models.Index(fields=['timestamp', 'id'], name='trade_ts_idx'),
+        ),
+    ]
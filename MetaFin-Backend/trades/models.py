@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
 from django.conf import settings
+from django.utils import timezone
 
 class TradeActivity(models.Model):
     TRADE_TYPES = [
@@ -32,9 +34,137 @@ class TradeActivity(models.Model):
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     price = models.DecimalField(max_digits=15, decimal_places=2)
     total_amount = models.DecimalField(max_digits=20, decimal_places=2)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add so bulk imports can keep the broker's execution time
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     status = models.CharField(max_length=20, choices=STATUS)
     order_type = models.CharField(max_length=10, choices=ORDER_TYPES)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp', 'id'], name='trade_user_ts_idx'),
+            models.Index(fields=['asset_name', 'timestamp', 'id'], name='trade_asset_ts_idx'),
+            # Staff listings across all users page on (timestamp, id) alone
+            models.Index(fields=['timestamp', 'id'], name='trade_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.trade_type} {self.quantity} {self.asset_name} at {self.price}"
+
+    # Fields whose stored values the post_save handlers compare against
+    TRACKED_FIELDS = ('asset_name', 'asset_type', 'trade_type', 'quantity', 'price', 'total_amount', 'status',
+                      'timestamp')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {f: instance.__dict__.get(f) for f in cls.TRACKED_FIELDS}
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_values = {f: self.__dict__.get(f) for f in self.TRACKED_FIELDS}
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class AssetTradeStats(models.Model):
+    asset_name = models.CharField(max_length=100, unique=True)
+    trade_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-trade_count', 'asset_name'], name='asset_trade_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_name}: {self.trade_count} trades"
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Add per-asset trade count deltas, creating counter rows as needed.
+
+        Args:
+            deltas: Mapping of asset_name -> change in trade count.
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(asset_name=name) for name in deltas],
+                ignore_conflicts=True,
+            )
+            for name, delta in deltas.items():
+                cls.objects.filter(asset_name=name).update(trade_count=F('trade_count') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every asset from TradeActivity and replace the stored counters."""
+        counts = (
+            TradeActivity.objects
+            .values('asset_name')
+            .annotate(trade_count=Count('id'))
+            .order_by()
+        )
+
+        with transaction.atomic():
+            rows = [cls(asset_name=c['asset_name'], trade_count=c['trade_count']) for c in counts]
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class Position(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='positions')
+    asset_name = models.CharField(max_length=100)
+    asset_type = models.CharField(max_length=20, choices=TradeActivity.ASSET_TYPE)
+    quantity = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    average_cost = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    realised_pnl = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    trade_count = models.PositiveIntegerField(default=0)
+    last_trade_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'asset_name'], name='unique_user_position'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.quantity} {self.asset_name} @ {self.average_cost}"
+
+
+class TradeRollup(models.Model):
+    GRANULARITY = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY)
+    bucket_start = models.DateTimeField()
+    asset_name = models.CharField(max_length=100)
+    asset_type = models.CharField(max_length=20, choices=TradeActivity.ASSET_TYPE)
+    trade_count = models.BigIntegerField(default=0)
+    buy_count = models.BigIntegerField(default=0)
+    sell_count = models.BigIntegerField(default=0)
+    volume = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    notional = models.DecimalField(max_digits=28, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket_start', 'asset_name', 'asset_type'],
+                                    name='unique_trade_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'asset_name', 'bucket_start'], name='rollup_asset_idx'),
+            models.Index(fields=['granularity', 'asset_type', 'bucket_start'], name='rollup_asset_type_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.user} - {self.trade_type} {self.quantity} {self.asset_name} at {self.price}"
\ No newline at end of file
+        return f"{self.granularity} {self.bucket_start} {self.asset_name}: {self.trade_count} trades"
\ No newline at end of file
@@ -0,0 +1,97 @@
+import base64
+from collections import OrderedDict
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination on (timestamp, id), newest first.
+
+    Each page is a range scan that starts right after the last row of the previous
+    page, so fetching page 10,000 costs the same as fetching page 1, unlike OFFSET.
+
+    Responses are {"next": <url or null>, "results": [...]} rather than a bare
+    list; clients follow `next` until it is null.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        queryset = queryset.order_by('-timestamp', '-id')
+        if cursor is not None:
+            timestamp, pk = cursor
+            # timestamp__lte bounds the index range scan; the OR breaks ties on id
+            queryset = queryset.filter(
+                Q(timestamp__lte=timestamp) & (Q(timestamp__lt=timestamp) | Q(id__lt=pk))
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_position(self, row):
+        # Model instances, or dicts from queryset.values()
+        if isinstance(row, dict):
+            return row['timestamp'], row['id']
+        return row.timestamp, row.pk
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            timestamp, pk = raw.rsplit('|', 1)
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None:
+                raise ValueError
+            return timestamp, int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        timestamp, pk = position
+        raw = f"{timestamp.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
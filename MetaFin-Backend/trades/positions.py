@@ -0,0 +1,220 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+import numpy as np
+from django.db import transaction
+from marketdata.client import get_market_data
+from MetaFin.instrumentation import timed
+from .models import TradeActivity, Position
+
+logger = logging.getLogger(__name__)
+
+COST_PLACES = Decimal('0.000001')
+AMOUNT_PLACES = Decimal('0.01')
+
+
+def apply_trade(position, trade_type, quantity, price):
+    """
+    Fold one successful trade into a position using average cost.
+
+    Trades that add to the position move the average cost; trades that reduce it
+    realise P&L against the average cost. A sell beyond the held quantity opens
+    a short at the trade price (and a buy beyond a short, a long). A trade of
+    zero quantity leaves the position untouched.
+    """
+    quantity = Decimal(quantity)
+    price = Decimal(price)
+    if quantity == 0:
+        return
+    delta = quantity if trade_type == 'BUY' else -quantity
+    held = position.quantity
+
+    if held == 0 or (held > 0) == (delta > 0):
+        new_quantity = held + delta
+        position.average_cost = ((abs(held) * position.average_cost + abs(delta) * price)
+                                 / abs(new_quantity)).quantize(COST_PLACES)
+        position.quantity = new_quantity
+    else:
+        closed = min(abs(delta), abs(held))
+        direction = 1 if held > 0 else -1
+        position.realised_pnl = (position.realised_pnl
+                                 + closed * (price - position.average_cost) * direction).quantize(AMOUNT_PLACES)
+        position.quantity = held + delta
+        if position.quantity == 0:
+            position.average_cost = Decimal(0)
+        elif (position.quantity > 0) != (held > 0):
+            position.average_cost = price.quantize(COST_PLACES)
+
+    position.trade_count += 1
+
+
+def reset(position):
+    position.quantity = Decimal(0)
+    position.average_cost = Decimal(0)
+    position.realised_pnl = Decimal(0)
+    position.trade_count = 0
+    position.last_trade_at = None
+
+
+@timed('trades.positions.rebuild')
+def rebuild_position(user_id, asset_name):
+    """Replay one (user, asset) history from scratch; used when history is edited."""
+    with transaction.atomic():
+        trades = list(
+            TradeActivity.objects
+            .filter(user_id=user_id, asset_name=asset_name, status='Success')
+            .order_by('timestamp', 'id')
+            .values_list('asset_type', 'trade_type', 'quantity', 'price', 'timestamp')
+        )
+        if not trades:
+            Position.objects.filter(user_id=user_id, asset_name=asset_name).delete()
+            return None
+
+        position, _ = Position.objects.select_for_update().get_or_create(
+            user_id=user_id, asset_name=asset_name, defaults={'asset_type': trades[0][0]}
+        )
+        reset(position)
+        for asset_type, trade_type, quantity, price, timestamp in trades:
+            apply_trade(position, trade_type, quantity, price)
+            position.asset_type = asset_type
+            position.last_trade_at = timestamp
+        position.save()
+        return position
+
+
+@timed('trades.positions.record')
+def record_trades(trades):
+    """
+    Incrementally apply newly created trades to their positions.
+
+    Only Success trades count. A group of trades older than the position's last
+    applied trade would change the replay order, so that position is rebuilt
+    instead of updated.
+    """
+    groups = defaultdict(list)
+    for trade in trades:
+        if trade.status == 'Success':
+            groups[(trade.user_id, trade.asset_name)].append(trade)
+
+    with transaction.atomic():
+        for (user_id, asset_name), group in groups.items():
+            group.sort(key=lambda t: (t.timestamp, t.pk or 0))
+            position, _ = Position.objects.select_for_update().get_or_create(
+                user_id=user_id, asset_name=asset_name, defaults={'asset_type': group[0].asset_type}
+            )
+            if position.last_trade_at is not None and group[0].timestamp < position.last_trade_at:
+                rebuild_position(user_id, asset_name)
+                continue
+
+            for trade in group:
+                apply_trade(position, trade.trade_type, trade.quantity, trade.price)
+                position.asset_type = trade.asset_type
+                position.last_trade_at = trade.timestamp
+            position.save()
+
+
+def rebuild_positions(user_ids=None, batch_size=1000):
+    """
+    Replay all successful trades into positions in one ordered pass.
+
+    Trades are streamed ordered by (user, asset, time) so only one position is
+    folded at a time, and positions are written with bulk_create.
+    """
+    trades = TradeActivity.objects.filter(status='Success')
+    existing = Position.objects.all()
+    if user_ids is not None:
+        trades = trades.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    rows = (
+        trades.order_by('user_id', 'asset_name', 'timestamp', 'id')
+        .values_list('user_id', 'asset_name', 'asset_type', 'trade_type', 'quantity', 'price', 'timestamp')
+        .iterator(chunk_size=5000)
+    )
+
+    written = 0
+    with transaction.atomic():
+        existing.delete()
+        batch = []
+        position = None
+        for user_id, asset_name, asset_type, trade_type, quantity, price, timestamp in rows:
+            if position is None or (position.user_id, position.asset_name) != (user_id, asset_name):
+                if position is not None:
+                    batch.append(position)
+                position = Position(user_id=user_id, asset_name=asset_name, asset_type=asset_type)
+                reset(position)
+            apply_trade(position, trade_type, quantity, price)
+            position.asset_type = asset_type
+            position.last_trade_at = timestamp
+
+            if len(batch) >= batch_size:
+                Position.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+
+        if position is not None:
+            batch.append(position)
+        Position.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def get_latest_prices(symbols):
+    """
+    Latest close per symbol from the shared market-data cache.
+
+    Symbols missing from the cache are fetched together in one request.
+    """
+    try:
+        return get_market_data().latest_prices(sorted(set(symbols)))
+    except Exception as e:
+        logger.error(f"Error fetching latest prices: {str(e)}")
+        return {}
+
+
+@timed('trades.positions.value')
+def value_positions(positions, prices):
+    """
+    Value open positions against latest prices in one vectorised pass.
+
+    Returns one dict per position plus portfolio totals; positions without a
+    price get null market value and unrealised P&L.
+    """
+    quantity = np.array([float(p.quantity) for p in positions], dtype=float)
+    cost = np.array([float(p.average_cost) for p in positions], dtype=float)
+    price = np.array([prices.get(p.asset_name, np.nan) for p in positions], dtype=float)
+    realised = np.array([float(p.realised_pnl) for p in positions], dtype=float)
+
+    cost_basis = quantity * cost
+    market_value = quantity * price
+    unrealised = market_value - cost_basis
+    unrealised_pct = np.divide(unrealised, np.abs(cost_basis), out=np.full_like(unrealised, np.nan),
+                               where=cost_basis != 0)
+
+    def _clean(value, digits=2):
+        return None if not np.isfinite(value) else round(float(value), digits)
+
+    rows = [
+        {
+            "asset_name": p.asset_name,
+            "asset_type": p.asset_type,
+            "quantity": float(p.quantity),
+            "average_cost": float(p.average_cost),
+            "cost_basis": _clean(cost_basis[i]),
+            "latest_price": _clean(price[i], 4),
+            "market_value": _clean(market_value[i]),
+            "unrealised_pnl": _clean(unrealised[i]),
+            "unrealised_pnl_pct": _clean(unrealised_pct[i] * 100),
+            "realised_pnl": float(p.realised_pnl),
+            "last_trade_at": p.last_trade_at,
+        }
+        for i, p in enumerate(positions)
+    ]
+    totals = {
+        "cost_basis": _clean(cost_basis.sum()),
+        "market_value": _clean(np.nansum(market_value)),
+        "unrealised_pnl": _clean(np.nansum(unrealised)),
+        "realised_pnl": _clean(realised.sum()),
+        "unpriced_positions": int(np.isnan(price).sum()),
+    }
+    return rows, totals
@@ -0,0 +1,175 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Min, Max
+from django.db.models.functions import TruncHour, TruncDay
+from django.utils import timezone
+from MetaFin.instrumentation import timed
+from .models import TradeActivity, TradeRollup
+
+# Only executed trades count towards volume and notional
+ROLLUP_STATUS = 'Success'
+METRICS = ('trade_count', 'buy_count', 'sell_count', 'volume', 'notional')
+TRUNC = {'hour': TruncHour, 'day': TruncDay}
+
+
+def bucket_starts(timestamp):
+    """Hour and day bucket starts in the project time zone."""
+    local = timezone.localtime(timestamp)
+    return {
+        'hour': local.replace(minute=0, second=0, microsecond=0),
+        'day': local_midnight(local.date()),
+    }
+
+
+def contribution(values, sign=1):
+    """Rollup deltas for one trade given its field values, or {} if it does not count."""
+    if values.get('status') != ROLLUP_STATUS or values.get('timestamp') is None:
+        return {}
+
+    is_buy = values['trade_type'] == 'BUY'
+    metrics = (sign, sign if is_buy else 0, 0 if is_buy else sign,
+               sign * Decimal(values['quantity']), sign * Decimal(values['total_amount']))
+    return {
+        (granularity, bucket, values['asset_name'], values['asset_type']): metrics
+        for granularity, bucket in bucket_starts(values['timestamp']).items()
+    }
+
+
+def merge(deltas, other):
+    for key, metrics in other.items():
+        current = deltas.get(key)
+        deltas[key] = metrics if current is None else tuple(a + b for a, b in zip(current, metrics))
+    return deltas
+
+
+def trade_values(trade):
+    return {f: getattr(trade, f) for f in TradeActivity.TRACKED_FIELDS}
+
+
+@timed('trades.rollups.apply')
+def apply_rollup_deltas(deltas):
+    """Add metric deltas to their rollup buckets, creating buckets as needed."""
+    deltas = {k: v for k, v in deltas.items() if any(v)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        TradeRollup.objects.bulk_create(
+            [TradeRollup(granularity=g, bucket_start=b, asset_name=n, asset_type=t) for g, b, n, t in deltas],
+            ignore_conflicts=True,
+        )
+        for (granularity, bucket, asset_name, asset_type), metrics in deltas.items():
+            TradeRollup.objects.filter(
+                granularity=granularity, bucket_start=bucket, asset_name=asset_name, asset_type=asset_type
+            ).update(**{m: F(m) + d for m, d in zip(METRICS, metrics)})
+
+
+def record_trades(trades):
+    deltas = {}
+    for trade in trades:
+        merge(deltas, contribution(trade_values(trade)))
+    apply_rollup_deltas(deltas)
+
+
+def record_change(previous, trade):
+    """Move a trade's contribution from its previous values to its current ones."""
+    deltas = merge(contribution(previous, sign=-1), contribution(trade_values(trade)))
+    apply_rollup_deltas(deltas)
+
+
+def local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def backfill(start=None, end=None, window_days=7):
+    """
+    Rebuild rollups from TradeActivity in windows of window_days local days.
+
+    Each window is aggregated by the database (hourly and daily) and replaces
+    the rollups in that range inside one transaction. Windows are whole local
+    days so no day bucket is split across two windows.
+
+    Returns the number of windows processed.
+    """
+    if window_days < 1:
+        raise ValueError("window_days must be at least 1")
+    trades = TradeActivity.objects.filter(status=ROLLUP_STATUS)
+    bounds = trades.aggregate(first=Min('timestamp'), last=Max('timestamp'))
+    if bounds['first'] is None:
+        return 0
+
+    day = timezone.localtime(start or bounds['first']).date()
+    last_day = timezone.localtime(end or bounds['last']).date()
+
+    windows = 0
+    while day <= last_day:
+        next_day = min(day + timedelta(days=window_days), last_day + timedelta(days=1))
+        backfill_window(trades, local_midnight(day), local_midnight(next_day))
+        day = next_day
+        windows += 1
+    return windows
+
+
+def backfill_window(trades, start, stop):
+    trades = trades.filter(timestamp__gte=start, timestamp__lt=stop)
+    rows = []
+    for granularity, trunc in TRUNC.items():
+        buckets = (
+            trades
+            .annotate(bucket=trunc('timestamp'))
+            .values('bucket', 'asset_name', 'asset_type')
+            .annotate(
+                trade_count=Count('id'),
+                buy_count=Count('id', filter=Q(trade_type='BUY')),
+                sell_count=Count('id', filter=Q(trade_type='SELL')),
+                volume=Sum('quantity'),
+                notional=Sum('total_amount'),
+            )
+            .order_by()
+        )
+        rows.extend(
+            TradeRollup(granularity=granularity, bucket_start=b['bucket'], asset_name=b['asset_name'],
+                        asset_type=b['asset_type'], **{m: b[m] for m in METRICS})
+            for b in buckets
+        )
+
+    with transaction.atomic():
+        TradeRollup.objects.filter(bucket_start__gte=start, bucket_start__lt=stop).delete()
+        TradeRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+@timed('trades.rollups.query')
+def query_rollups(granularity, start=None, end=None, group_by='asset', asset_names=None, asset_type=None):
+    """
+    Time series from the rollup table only; never touches TradeActivity.
+
+    group_by is 'asset' (per asset_name), 'asset_type', or 'total'.
+    """
+    rollups = TradeRollup.objects.filter(granularity=granularity)
+    if start is not None:
+        rollups = rollups.filter(bucket_start__gte=start)
+    if end is not None:
+        rollups = rollups.filter(bucket_start__lt=end)
+    if asset_names:
+        rollups = rollups.filter(asset_name__in=asset_names)
+    if asset_type:
+        rollups = rollups.filter(asset_type=asset_type)
+
+    keys = {'asset': ['asset_name'], 'asset_type': ['asset_type'], 'total': []}[group_by]
+    rows = (
+        rollups
+        .values('bucket_start', *keys)
+        .annotate(**{m: Sum(m) for m in METRICS})
+        .order_by('bucket_start', *keys)
+    )
+
+    series = defaultdict(list)
+    for row in rows:
+        name = row[keys[0]] if keys else 'total'
+        series[name].append({
+            'bucket_start': row['bucket_start'],
+            **{m: row[m] for m in METRICS},
+        })
+    return series
@@ -1,7 +1,46 @@
+from django.utils import timezone
 from rest_framework import serializers
 from .models import TradeActivity
 
 class TradeActivitySerializer(serializers.ModelSerializer):
     class Meta:
         model = TradeActivity
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be greater than zero.")
+        return value
+
+
+class TradeActivityListSerializer:
+    """
+    Read-only trade listings straight from queryset.values(), producing the
+    same output as TradeActivitySerializer without building model instances
+    or running per-field DRF machinery. Decimals and datetimes are formatted
+    like DecimalField/DateTimeField; everything else is passed through.
+    """
+
+    def __init__(self):
+        fields = TradeActivitySerializer().fields
+        self.fields = list(fields)
+        self.decimals = {name: f.decimal_places for name, f in fields.items()
+                         if isinstance(f, serializers.DecimalField)}
+        self.datetimes = [name for name, f in fields.items() if isinstance(f, serializers.DateTimeField)]
+
+    def values(self, queryset):
+        return queryset.values(*self.fields)
+
+    def to_representation(self, rows):
+        tz = timezone.get_current_timezone()
+        decimals = list(self.decimals.items())
+        for row in rows:
+            for name, places in decimals:
+                value = row[name]
+                row[name] = '' if value is None else f"{value:.{places}f}"
+            for name in self.datetimes:
+                value = row[name]
+                if value:
+                    value = value.astimezone(tz).isoformat()
+                    row[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return rows
@@ -0,0 +1,91 @@
+from collections import Counter
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+from .models import TradeActivity, AssetTradeStats
+from .positions import record_trades, rebuild_position
+from . import rollups
+
+# Sent once per bulk_create of trades (which skips post_save), with trades=[...].
+# Receivers run inside the inserting transaction.
+trades_bulk_created = Signal()
+
+
+@receiver(post_save, sender=TradeActivity)
+def update_trade_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_loaded_values', {}).get('asset_name')
+    if created:
+        AssetTradeStats.apply_deltas({instance.asset_name: 1})
+    elif previous is not None and previous != instance.asset_name:
+        AssetTradeStats.apply_deltas({previous: -1, instance.asset_name: 1})
+
+
+@receiver(post_delete, sender=TradeActivity)
+def update_trade_stats_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_values', {}).get('asset_name')
+    AssetTradeStats.apply_deltas({previous or instance.asset_name: -1})
+
+
+@receiver(trades_bulk_created, sender=TradeActivity)
+def update_trade_stats_on_bulk_create(sender, trades, **kwargs):
+    AssetTradeStats.apply_deltas(Counter(t.asset_name for t in trades))
+
+
+
+@receiver(post_save, sender=TradeActivity)
+def update_position_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        record_trades([instance])
+        return
+
+    previous = getattr(instance, '_loaded_values', None)
+    if previous is None:
+        # Saved without being loaded first; we cannot tell what changed
+        rebuild_position(instance.user_id, instance.asset_name)
+        return
+
+    changed = any(previous[f] != getattr(instance, f) for f in TradeActivity.TRACKED_FIELDS)
+    if changed and 'Success' in (previous['status'], instance.status):
+        rebuild_position(instance.user_id, instance.asset_name)
+        if previous['asset_name'] != instance.asset_name:
+            rebuild_position(instance.user_id, previous['asset_name'])
+
+
+@receiver(post_delete, sender=TradeActivity)
+def update_position_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_values', {})
+    if 'Success' in (previous.get('status'), instance.status):
+        rebuild_position(instance.user_id, previous.get('asset_name') or instance.asset_name)
+
+
+@receiver(trades_bulk_created, sender=TradeActivity)
+def update_positions_on_bulk_create(sender, trades, **kwargs):
+    record_trades(trades)
+
+
+@receiver(post_save, sender=TradeActivity)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_loaded_values', None)
+    if created or previous is None:
+        rollups.record_trades([instance])
+    else:
+        rollups.record_change(previous, instance)
+
+
+@receiver(post_delete, sender=TradeActivity)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_values', None) or rollups.trade_values(instance)
+    rollups.apply_rollup_deltas(rollups.contribution(previous, sign=-1))
+
+
+@receiver(trades_bulk_created, sender=TradeActivity)
+def update_rollups_on_bulk_create(sender, trades, **kwargs):
+    rollups.record_trades(trades)
\ No newline at end of file
@@ -1,3 +1,349 @@
-from django.test import TestCase
+import io
+import os
+import threading
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction, IntegrityError, OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .exporter import stream_export
+from .importer import TradeImporter, iter_lines, iter_rows
+from .models import AssetTradeStats, TradeActivity, TradeRollup, Position
+from .positions import apply_trade, reset
+from .rollups import backfill, query_rollups
+from .serializers import TradeActivitySerializer
+from .signals import trades_bulk_created
 
-# Create your tests here.
+# Set TRADE_EXPORT_TEST_ROWS=2000000 for a full-size run; the default already
+# puts a materialised export (about 18 MiB) well over MAX_EXPORT_PEAK
+EXPORT_ROWS = int(os.getenv('TRADE_EXPORT_TEST_ROWS', 20_000))
+MAX_EXPORT_PEAK = 8 * 1024 * 1024
+
+
+class TradeExportMemoryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='export@metafin.local', password=None,
+                                                        full_name='Export')
+        # Raw executemany: building millions of model instances would dominate the test
+        table = TradeActivity._meta.db_table
+        sql = (
+            f"INSERT INTO {table} (user_id, trade_type, asset_type, asset_name, quantity, price, "
+            f"total_amount, timestamp, status, order_type) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+        )
+        start = timezone.now() - timedelta(seconds=EXPORT_ROWS)
+        with connection.cursor() as cursor:
+            for offset in range(0, EXPORT_ROWS, 50_000):
+                cursor.executemany(sql, [
+                    (cls.user.id, 'BUY', 'STOCK', f"ASSET{i % 100}", '1.00', '10.00', '10.00',
+                     start + timedelta(seconds=i), 'Success', 'MARKET')
+                    for i in range(offset, min(offset + 50_000, EXPORT_ROWS))
+                ])
+
+    def export_peak(self, fmt):
+        """Rows exported and the peak Python memory allocated meanwhile, in bytes."""
+        lines = 0
+        tracemalloc.start()
+        try:
+            for chunk in stream_export(TradeActivity.objects.filter(user=self.user), fmt):
+                lines += chunk.count('\n')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return lines, peak
+
+    def test_csv_export_memory_is_constant(self):
+        lines, peak = self.export_peak('csv')
+        self.assertEqual(lines, EXPORT_ROWS + 1)
+        self.assertLess(peak, MAX_EXPORT_PEAK)
+
+    def test_ndjson_export_memory_is_constant(self):
+        lines, peak = self.export_peak('ndjson')
+        self.assertEqual(lines, EXPORT_ROWS)
+        self.assertLess(peak, MAX_EXPORT_PEAK)
+
+
+class ConcurrentTradeWritesTest(TransactionTestCase):
+    """
+    Parallel writers each recording trades in their own transactions.
+
+    Each transaction reads the user's positions before recording a trade, the
+    pattern that made SQLite's deferred transactions fail with "database is
+    locked". With BEGIN IMMEDIATE and a busy timeout they queue instead.
+    """
+    WRITERS = 8
+    TRADES_PER_WRITER = 25
+
+    def test_parallel_writers_do_not_hit_lock_errors(self):
+        user = get_user_model().objects.create_user(email='writers@metafin.local', password=None,
+                                                    full_name='Writers')
+        errors = []
+        barrier = threading.Barrier(self.WRITERS)
+
+        def writer(n):
+            try:
+                barrier.wait()
+                for i in range(self.TRADES_PER_WRITER):
+                    with transaction.atomic():
+                        # Read before write, e.g. checking the holding before trading
+                        list(Position.objects.filter(user=user))
+                        TradeActivity.objects.create(
+                            user=user, trade_type='BUY', asset_type='STOCK', asset_name=f"LOCK{i % 3}",
+                            quantity=1, price=10, total_amount=10, status='Success', order_type='MARKET',
+                        )
+            except OperationalError as e:
+                errors.append(str(e))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(self.WRITERS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(TradeActivity.objects.count(), self.WRITERS * self.TRADES_PER_WRITER)
+        self.assertEqual(
+            sum(p.trade_count for p in Position.objects.filter(user=user)),
+            self.WRITERS * self.TRADES_PER_WRITER,
+        )
+
+
+class TradeImportTest(TestCase):
+    HEADER = b"trade_type,asset_type,asset_name,quantity,price\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='import@metafin.local', password=None,
+                                                        full_name='Import')
+
+    def run_import(self, body, chunk_size=1000):
+        return TradeImporter(self.user, chunk_size).run(iter_rows(iter_lines(io.BytesIO(body)), 'csv'))
+
+    def test_bad_rows_are_reported_not_fatal(self):
+        report = self.run_import(self.HEADER + b"BUY,STOCK,AAA,2,10\nBUY,STOCK,BBB,0,10\nHOLD,STOCK,AAA,1,10\n"
+                                 b"SELL,STOCK,AAA,1,12\n")
+        self.assertEqual((report['imported'], report['failed']), (2, 2))
+        self.assertEqual(sorted(e['row'] for e in report['errors']), [2, 3])
+        self.assertIsNone(report['error'])
+        self.assertEqual(Position.objects.get(user=self.user, asset_name='AAA').quantity, 1)
+
+    def test_database_errors_are_logged_not_returned(self):
+        def reject(sender, trades, **kwargs):
+            if any(t.asset_name == 'BAD' for t in trades):
+                raise IntegrityError("CHECK constraint failed: trades_tradeactivity.secret")
+
+        trades_bulk_created.connect(reject)
+        self.addCleanup(trades_bulk_created.disconnect, reject)
+        with self.assertLogs('trades.importer', 'ERROR'):
+            report = self.run_import(self.HEADER + b"BUY,STOCK,AAA,1,10\nBUY,STOCK,BAD,1,10\n")
+        self.assertEqual((report['imported'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['errors'], {"row": ["Row could not be saved"]})
+
+    def test_unreadable_upload_keeps_rows_read_so_far(self):
+        rows = b"".join(b"BUY,STOCK,AAA,1,10\n" for _ in range(5))
+        report = self.run_import(self.HEADER + rows + b"BUY,STOCK,\xff\xfe,1,10\n", chunk_size=2)
+        self.assertEqual((report['total_rows'], report['imported']), (5, 5))
+        self.assertIn("after row 5", report['error'])
+        self.assertEqual(TradeActivity.objects.filter(user=self.user).count(), 5)
+
+
+class ApplyTradeTest(SimpleTestCase):
+    def position(self, *trades):
+        position = Position(asset_name='AAA', asset_type='STOCK')
+        reset(position)
+        for trade_type, quantity, price in trades:
+            apply_trade(position, trade_type, quantity, price)
+        return position
+
+    def assertPosition(self, position, quantity, average_cost, realised_pnl, trade_count):
+        self.assertEqual(
+            (position.quantity, position.average_cost, position.realised_pnl, position.trade_count),
+            (Decimal(quantity), Decimal(average_cost), Decimal(realised_pnl), trade_count),
+        )
+
+    def test_buys_average_the_cost(self):
+        position = self.position(('BUY', '10', '100'), ('BUY', '30', '120'))
+        self.assertPosition(position, '40', '115', '0', 2)
+
+    def test_sell_realises_against_average_cost(self):
+        position = self.position(('BUY', '10', '100'), ('BUY', '10', '110'), ('SELL', '5', '120'))
+        self.assertPosition(position, '15', '105', '75', 3)
+
+    def test_selling_everything_closes_the_position(self):
+        position = self.position(('BUY', '10', '100'), ('SELL', '10', '90'))
+        self.assertPosition(position, '0', '0', '-100', 2)
+
+    def test_sell_beyond_holding_flips_to_short(self):
+        position = self.position(('BUY', '10', '100'), ('SELL', '15', '120'))
+        self.assertPosition(position, '-5', '120', '200', 2)
+
+        # Covering part of the short realises against the short's entry price
+        apply_trade(position, 'BUY', '2', '110')
+        self.assertPosition(position, '-3', '120', '220', 3)
+
+    def test_zero_quantity_leaves_position_untouched(self):
+        flat = self.position(('BUY', '0', '100'))
+        self.assertPosition(flat, '0', '0', '0', 0)
+
+        held = self.position(('BUY', '10', '100'), ('SELL', '0', '150'))
+        self.assertPosition(held, '10', '100', '0', 1)
+
+    def test_serializer_rejects_non_positive_quantity(self):
+        for quantity in ('0', '-1'):
+            serializer = TradeActivitySerializer(data={
+                'trade_type': 'BUY', 'asset_type': 'STOCK', 'asset_name': 'AAA', 'quantity': quantity,
+                'price': '10', 'total_amount': '0', 'status': 'Success', 'order_type': 'MARKET',
+            })
+            self.assertFalse(serializer.is_valid())
+            self.assertIn('quantity', serializer.errors)
+
+
+class TradeRollupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='rollups@metafin.local', password=None,
+                                                        full_name='Rollups')
+        cls.day = timezone.make_aware(datetime(2024, 3, 4, 10, 30))
+
+    def trade(self, asset_name='AAA', trade_type='BUY', quantity=2, days=0, status='Success'):
+        return TradeActivity.objects.create(
+            user=self.user, trade_type=trade_type, asset_type='STOCK', asset_name=asset_name,
+            quantity=Decimal(quantity), price=Decimal('10'), total_amount=Decimal(quantity) * 10,
+            status=status, order_type='MARKET', timestamp=self.day + timedelta(days=days),
+        )
+
+    def daily(self):
+        """{(asset, day): (trade_count, buy_count, sell_count, volume)} of the non-empty day buckets."""
+        return {
+            (asset, timezone.localtime(row['bucket_start']).date()):
+                (row['trade_count'], row['buy_count'], row['sell_count'], row['volume'])
+            for asset, rows in query_rollups('day').items()
+            for row in rows if row['trade_count']
+        }
+
+    def test_creates_updates_and_deletes_move_the_rollups(self):
+        first = self.trade()
+        self.trade(trade_type='SELL', quantity=1)
+        self.trade(status='Pending')
+        monday = self.day.date()
+        self.assertEqual(self.daily(), {('AAA', monday): (2, 1, 1, Decimal(3))})
+
+        trade = TradeActivity.objects.get(pk=first.pk)
+        trade.quantity, trade.asset_name = Decimal(5), 'BBB'
+        trade.save()
+        self.assertEqual(self.daily(), {('AAA', monday): (1, 0, 1, Decimal(1)),
+                                        ('BBB', monday): (1, 1, 0, Decimal(5))})
+
+        trade.status = 'Failed'
+        trade.save()
+        self.assertEqual(self.daily(), {('AAA', monday): (1, 0, 1, Decimal(1))})
+
+        TradeActivity.objects.get(asset_name='AAA', trade_type='SELL').delete()
+        self.assertEqual(self.daily(), {})
+
+    def test_backfill_rebuilds_the_rollups(self):
+        for days in range(5):
+            self.trade(days=days)
+        self.trade(asset_name='BBB', trade_type='SELL', days=3)
+        expected = self.daily()
+        self.assertEqual(len(expected), 6)
+
+        TradeRollup.objects.all().delete()
+        self.assertEqual(backfill(window_days=2), 3)
+        self.assertEqual(self.daily(), expected)
+        self.assertEqual(TradeRollup.objects.filter(granularity='hour').count(), 6)
+
+    def test_window_days_must_be_positive(self):
+        self.trade()
+        with self.assertRaises(ValueError):
+            backfill(window_days=0)
+        with self.assertRaisesMessage(CommandError, "--window-days"):
+            call_command('backfill_trade_rollups', '--window-days', '0', skip_checks=True)
+
+
+class AssetTradeStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='stats@metafin.local', password=None,
+                                                        full_name='Stats')
+
+    def trade(self, asset_name):
+        return TradeActivity(user=self.user, trade_type='BUY', asset_type='STOCK', asset_name=asset_name,
+                             quantity=Decimal(1), price=Decimal(10), total_amount=Decimal(10),
+                             status='Success', order_type='MARKET')
+
+    def assertCountsMatchTrades(self, expected):
+        counters = dict(AssetTradeStats.objects.exclude(trade_count=0).values_list('asset_name', 'trade_count'))
+        actual = {}
+        for name in TradeActivity.objects.values_list('asset_name', flat=True):
+            actual[name] = actual.get(name, 0) + 1
+        self.assertEqual(counters, expected)
+        self.assertEqual(counters, actual)
+
+    def test_counters_follow_creates_bulk_creates_and_deletes(self):
+        self.trade('AAA').save()
+        self.trade('BBB').save()
+        self.assertCountsMatchTrades({'AAA': 1, 'BBB': 1})
+
+        with transaction.atomic():
+            trades = TradeActivity.objects.bulk_create([self.trade('AAA'), self.trade('AAA'), self.trade('CCC')])
+            trades_bulk_created.send(sender=TradeActivity, trades=trades)
+        self.assertCountsMatchTrades({'AAA': 3, 'BBB': 1, 'CCC': 1})
+
+        renamed = TradeActivity.objects.get(asset_name='BBB')
+        renamed.asset_name = 'CCC'
+        renamed.save()
+        self.assertCountsMatchTrades({'AAA': 3, 'CCC': 2})
+
+        TradeActivity.objects.filter(asset_name='AAA').first().delete()
+        TradeActivity.objects.filter(asset_name='CCC').delete()
+        self.assertCountsMatchTrades({'AAA': 2})
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='pages@metafin.local', password=None,
+                                                        full_name='Pages')
+        tie = timezone.now().replace(microsecond=0)
+        # Seven trades share one timestamp, so pages of three split the tie twice
+        offsets = [0] * 7 + [1] * 3 + [-1] * 2
+        TradeActivity.objects.bulk_create([
+            TradeActivity(user=cls.user, trade_type='BUY', asset_type='STOCK', asset_name='AAA',
+                          quantity=Decimal(1), price=Decimal(10), total_amount=Decimal(10), status='Success',
+                          order_type='MARKET', timestamp=tie + timedelta(seconds=offset))
+            for offset in offsets
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def follow(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.json()['results'])
+            url = response.json()['next']
+            pages += 1
+        return ids, pages
+
+    def test_pages_neither_skip_nor_repeat_tied_rows(self):
+        expected = list(TradeActivity.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        for page_size in (1, 3, 5, 12, 50):
+            ids, pages = self.follow(f'/trades/trade/?page_size={page_size}')
+            self.assertEqual(ids, expected, page_size)
+            # No trailing empty page: `next` is only set when another row exists
+            self.assertEqual(pages, -(-len(expected) // page_size))
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/trades/trade/?cursor=not-a-cursor').status_code, 404)
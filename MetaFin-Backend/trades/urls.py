@@ -1,5 +1,7 @@
 from django.urls import path, include
-from .views import TradeActivityViewSet, TradeViewSet
+from .views import (
+    TradeActivityViewSet, TradeViewSet, TradeImportView, TradeExportView, PositionsView, TradeAnalyticsView
+)
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -8,4 +10,8 @@ router.register('trade', TradeActivityViewSet, basename='trade-activity')
 urlpatterns = [
     path('', include(router.urls)),
     path('alltrades/', TradeViewSet.as_view(), name='all-trades'),
+    path('import/', TradeImportView.as_view(), name='trade-import'),
+    path('export/<str:export_format>/', TradeExportView.as_view(), name='trade-export'),
+    path('positions/', PositionsView.as_view(), name='positions'),
+    path('analytics/', TradeAnalyticsView.as_view(), name='trade-analytics'),
 ]
\ No newline at end of file
@@ -1,26 +1,63 @@
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, generics
-from django.db.models import Count
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import TradeActivity
-from .serializers import TradeActivitySerializer
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework import status
+from .models import TradeActivity, AssetTradeStats, Position
+from .serializers import TradeActivitySerializer, TradeActivityListSerializer
+from .pagination import KeysetPagination
+from .importer import TradeImporter, detect_format, iter_lines, iter_rows
+from .exporter import CONTENT_TYPES, export_queryset, filter_export, stream_export, parse_bound
+from .positions import get_latest_prices, value_positions
+from .rollups import query_rollups
 
-class TradeActivityViewSet(viewsets.ModelViewSet):
-    queryset = TradeActivity.objects.all().order_by('-timestamp')
+
+list_serializer = TradeActivityListSerializer()
+
+
+class TradeListMixin:
+    """Serve list() from queryset.values(); retrieve and writes keep the ModelSerializer."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = list_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(list_serializer.to_representation(page))
+        return Response(list_serializer.to_representation(list(queryset)))
+
+
+def filter_trades(queryset, request):
+    asset_name = request.query_params.get('asset_name')
+    if asset_name:
+        queryset = queryset.filter(asset_name=asset_name)
+    return queryset
+
+
+class TradeActivityViewSet(TradeListMixin, viewsets.ModelViewSet):
     serializer_class = TradeActivitySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = TradeActivity.objects.filter(user=self.request.user).order_by('-timestamp', '-id')
+        return filter_trades(queryset, self.request)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class TradeViewSet(generics.ListAPIView):
+class TradeViewSet(TradeListMixin, generics.ListAPIView):
     serializer_class = TradeActivitySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return TradeActivity.objects.all()
+        queryset = TradeActivity.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return filter_trades(queryset, self.request)
 
 
 class TopTradedAssetsView(APIView):
@@ -28,9 +65,102 @@ class TopTradedAssetsView(APIView):
 
     def get(self, request):
         top_assets = (
-            TradeActivity.objects
-            .values('asset_name')
-            .annotate(trade_count=Count('id'))
-            .order_by('-trade_count')[:5]
+            AssetTradeStats.objects
+            .filter(trade_count__gt=0)
+            .order_by('-trade_count', 'asset_name')
+            .values('asset_name', 'trade_count')[:5]
         )
-        return Response(top_assets)
\ No newline at end of file
+        return Response(top_assets)
+
+
+class TradeImportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Read the raw body as a stream; touching request.data would buffer it all
+        fmt = detect_format(request.content_type)
+        if fmt is None:
+            return Response(
+                {"error": "Send the trades as text/csv or application/x-ndjson"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        if request.stream is None:
+            return Response({"error": "Request body is empty"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            chunk_size = min(max(int(request.query_params.get('chunk_size', 1000)), 1), 10000)
+        except ValueError:
+            return Response({"error": "chunk_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = TradeImporter(request.user, chunk_size).run(iter_rows(iter_lines(request.stream), fmt))
+        # An unreadable upload still reports the rows imported before reading stopped
+        if report['error']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class TradeExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, export_format):
+        if export_format not in CONTENT_TYPES:
+            return Response({"error": "Export format must be csv or ndjson"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            queryset = filter_export(export_queryset(request.user), request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(stream_export(queryset, export_format),
+                                         content_type=CONTENT_TYPES[export_format])
+        filename = f"trades-{timezone.now():%Y%m%d%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class PositionsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        positions = Position.objects.filter(user=request.user).order_by('asset_name')
+        if request.query_params.get('include_closed') not in ('1', 'true'):
+            positions = positions.exclude(quantity=0)
+        positions = list(positions)
+
+        if request.query_params.get('prices') in ('0', 'false'):
+            prices = {}
+        else:
+            prices = get_latest_prices([p.asset_name for p in positions if p.quantity != 0])
+
+        rows, totals = value_positions(positions, prices)
+        return Response({"positions": rows, "totals": totals}, status=status.HTTP_200_OK)
+
+
+class TradeAnalyticsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        granularity = params.get('granularity', 'day')
+        group_by = params.get('group_by', 'asset')
+
+        if granularity not in ('hour', 'day'):
+            return Response({"error": "granularity must be hour or day"}, status=status.HTTP_400_BAD_REQUEST)
+        if group_by not in ('asset', 'asset_type', 'total'):
+            return Response({"error": "group_by must be asset, asset_type or total"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = parse_bound(params['start']) if params.get('start') else None
+            end = parse_bound(params['end']) if params.get('end') else None
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        asset_names = params['asset_name'].split(',') if params.get('asset_name') else None
+        series = query_rollups(granularity, start, end, group_by, asset_names, params.get('asset_type'))
+
+        return Response({
+            "granularity": granularity,
+            "group_by": group_by,
+            "series": series,
+        }, status=status.HTTP_200_OK)
\ No newline at end of file
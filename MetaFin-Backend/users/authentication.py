@@ -0,0 +1,66 @@
+import copy
+import threading
+import time
+from django.conf import settings
+from rest_framework_simplejwt import authentication as simplejwt
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """Users by id, kept in process for ttl seconds."""
+
+    def __init__(self, ttl, max_size=10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._users[user_id]
+                return None
+        # A copy, so one request setting attributes on request.user can't leak into another
+        return copy.copy(entry[1])
+
+    def set(self, user_id, user):
+        with self._lock:
+            if len(self._users) >= self.max_size:
+                now = time.monotonic()
+                self._users = {k: v for k, v in self._users.items() if v[0] > now}
+                if len(self._users) >= self.max_size:
+                    self._users.clear()
+            self._users[user_id] = (time.monotonic() + self.ttl, user)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(getattr(settings, 'AUTH_USER_CACHE_TTL', 30))
+
+
+class JWTAuthentication(simplejwt.JWTAuthentication):
+    """
+    Default authenticator. The user named by the token is looked up (and
+    checked to be active) on every request, through a cache kept for
+    AUTH_USER_CACHE_TTL seconds. Saving or deleting a user drops its entry in
+    this process; other workers see the change within the TTL. Nothing about
+    the user beyond its id is taken from the token, so demoting, deactivating
+    or deleting a user is never outlived by the tokens it holds.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, copy.copy(user))
+        return user
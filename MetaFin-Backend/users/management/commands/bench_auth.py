@@ -0,0 +1,79 @@
+import base64
+import time
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication as PlainJWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from trades.management.commands._bench import rolled_back, make_trades
+from trades.views import TradeActivityViewSet
+from users.authentication import JWTAuthentication, user_cache
+
+PASSWORD = 'bench-auth-password'
+
+# name: (authentication classes, Authorization header kind)
+MODES = {
+    'basic': ([SessionAuthentication, BasicAuthentication], 'basic'),
+    'jwt': ([PlainJWTAuthentication], 'jwt'),
+    'jwt-cached': ([JWTAuthentication], 'jwt'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark authenticated GET /trades/trade/ throughput with the old Session/Basic defaults "
+        "and with JWT (plain, cached user). Runs inside a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per mode")
+        parser.add_argument('--trades', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--modes', default=','.join(MODES), help="Comma separated modes to run")
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip() in MODES]
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), rolled_back():
+            user = get_user_model().objects.create_user(email='bench-auth@metafin.local', password=PASSWORD,
+                                                        full_name='Benchmark')
+            make_trades([user], options['trades'])
+            headers = {
+                'basic': 'Basic ' + base64.b64encode(f"{user.email}:{PASSWORD}".encode()).decode(),
+                'jwt': f"Bearer {RefreshToken.for_user(user).access_token}",
+            }
+
+            for mode in modes:
+                classes, kind = MODES[mode]
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=headers[kind])
+                user_cache.clear()
+                with mock.patch.object(TradeActivityViewSet, 'authentication_classes', classes):
+                    self.run_mode(mode, client, options['requests'], options['page_size'])
+
+    def run_mode(self, mode, client, requests, page_size):
+        def get():
+            response = client.get('/trades/trade/', {'page_size': page_size})
+            assert response.status_code == 200, response.status_code
+            return response
+
+        get()  # warm up
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                get()
+                timings.append((time.perf_counter() - t0) * 1000)
+            elapsed = time.perf_counter() - start
+
+        timings.sort()
+        self.stdout.write(
+            f"{mode:>14}: {requests / elapsed:8.1f} req/s, p50 {timings[len(timings) // 2]:7.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95)]:7.2f} ms, {len(queries) / requests:.1f} queries/request"
+        )
@@ -1,4 +1,8 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
 from .models import CustomUser
 
 class UserSerializer(serializers.ModelSerializer):
@@ -9,4 +13,15 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = CustomUser.objects.create_user(**validated_data)
-        return user
\ No newline at end of file
+        return user
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refuses to refresh tokens of users who were deactivated or deleted since login."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed("No active account found for this token", code='user_inactive')
+        return super().validate(attrs)
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import user_cache
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    # Only this process; other workers catch up within AUTH_USER_CACHE_TTL
+    user_cache.discard(instance.pk)
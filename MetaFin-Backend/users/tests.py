@@ -1,3 +1,63 @@
-from django.test import TestCase
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from .authentication import user_cache
 
-# Create your tests here.
+PASSWORD = 'revocation-test-password'
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TokenRevocationTest(TestCase):
+    """Permission changes apply to tokens issued before them."""
+
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = get_user_model().objects.create_user(email='staff@metafin.local', password=PASSWORD,
+                                                         full_name='Staff', is_staff=True)
+        tokens = APIClient().post('/users/token/', {'email': self.user.email, 'password': PASSWORD},
+                                  format='json').json()
+        self.refresh = tokens['refresh']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def refresh_status(self):
+        return APIClient().post('/users/token/refresh/', {'refresh': self.refresh}, format='json').status_code
+
+    def test_demoted_staff_loses_staff_views(self):
+        self.assertEqual(self.get('/trades/analytics/'), 200)
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.get('/trades/analytics/'), 403)
+        # Still a valid user for their own data
+        self.assertEqual(self.get('/trades/trade/'), 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.get('/trades/trade/'), 200)
+        self.assertEqual(self.refresh_status(), 200)
+        self.user.is_active = False
+        self.user.save()
+        for path in ('/trades/trade/', '/trades/alltrades/', '/trades/analytics/', '/trades/export/csv/'):
+            self.assertEqual(self.get(path), 401, path)
+        self.assertEqual(self.refresh_status(), 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.assertEqual(self.get('/trades/alltrades/'), 200)
+        self.user.delete()
+        for path in ('/trades/trade/', '/trades/alltrades/', '/trades/analytics/', '/trades/export/csv/'):
+            self.assertEqual(self.get(path), 401, path)
+        self.assertEqual(self.refresh_status(), 401)
+
+    def test_changes_without_signals_apply_after_the_cache_ttl(self):
+        # queryset.update() skips post_save, like a change made in another worker
+        with mock.patch.object(user_cache, 'ttl', 0.2):
+            self.assertEqual(self.get('/trades/analytics/'), 200)
+            get_user_model().objects.filter(pk=self.user.pk).update(is_staff=False)
+            self.assertEqual(self.get('/trades/analytics/'), 200)
+            time.sleep(0.3)
+            self.assertEqual(self.get('/trades/analytics/'), 403)
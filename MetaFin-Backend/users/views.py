@@ -2,8 +2,14 @@ from rest_framework import generics
 from .serializers import UserSerializer
 from .models import CustomUser
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from MetaFin.instrumentation import timed
 
 class CreateUserView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
-    permission_classes = [AllowAny]
\ No newline at end of file
+    permission_classes = [AllowAny]
+
+    @timed('users.create')
+    def perform_create(self, serializer):
+        # Dominated by password hashing
+        serializer.save()